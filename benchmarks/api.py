@@ -0,0 +1,331 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# This adds the parent directory of the current file to the Python path
+
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import time
+import uuid
+from datetime import date, datetime
+from pathlib import Path
+
+RESULTS_DIR = Path(__file__).parent / "results"
+SEED = 2023
+USER = {
+    "username": "benchmark",
+    "email": "benchmark@example.com",
+    "password": "benchmark",
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the API endpoints")
+    parser.add_argument(
+        "--database-url",
+        default="sqlite:///./benchmark.db?check_same_thread=false",
+        help="SQLite is recreated on every run, other databases are seeded once",
+    )
+    parser.add_argument(
+        "--redis",
+        default="fake",
+        help="'fake' for fakeredis or host:port of a local Redis",
+    )
+    parser.add_argument("--contacts", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--scenarios", nargs="*", help="Run only these scenarios")
+    parser.add_argument("--output", type=Path, help="Path of the JSON results")
+    parser.add_argument("--compare", type=Path, help="JSON results to compare with")
+    return parser.parse_args()
+
+
+args = parse_args()
+
+# The settings are read when the application is imported
+os.environ["SQLALCHEMY_DATABASE_URL"] = args.database_url
+if args.redis != "fake":
+    host, _, port = args.redis.partition(":")
+    os.environ["REDIS_HOST"] = host
+    os.environ["REDIS_PORT"] = port or "6379"
+
+import httpx
+from fastapi_limiter import FastAPILimiter
+from fastapi_limiter.depends import RateLimiter
+
+from main import app
+from benchmarks.datasets import make_image, make_pdf
+from src.database.db import DBSession, engine
+from src.database.models import Base, Contact, Role, User
+from src.seed.contacts_to_db import create_contact_person
+from src.services import metrics
+from src.services.auth import auth_service
+from src.services.documents import cache, jobs
+from src.services.email import mail
+
+
+async def unique_identifier(request):
+    # Every request gets its own rate limit, so the limits never reject the benchmark
+    return uuid.uuid4().hex
+
+
+async def setup_redis():
+    """
+    The setup_redis function connects the Redis clients of the application to
+    fakeredis or to the local Redis. fakeredis cannot run the Lua script of
+    fastapi-limiter, so with fakeredis the rate limits are not checked.
+
+    :return: str: The Redis that is used
+    :doc-author: Ihor Voitiuk
+    """
+    if args.redis != "fake":
+        import redis.asyncio as redis
+
+        client = redis.Redis(
+            host=os.environ["REDIS_HOST"],
+            port=int(os.environ["REDIS_PORT"]),
+            encoding="utf-8",
+            decode_responses=True,
+        )
+        await FastAPILimiter.init(client, identifier=unique_identifier)
+        auth_service.redis = metrics.instrument_sync_redis(
+            auth_service.redis.__class__(
+                host=os.environ["REDIS_HOST"], port=int(os.environ["REDIS_PORT"]), db=1
+            )
+        )
+        return args.redis
+
+    import fakeredis
+    import fakeredis.aioredis
+
+    server = fakeredis.FakeServer()
+    auth_service.redis = metrics.instrument_sync_redis(
+        fakeredis.FakeRedis(server=server)
+    )
+    async_client = metrics.instrument_redis(fakeredis.aioredis.FakeRedis(server=server))
+    cache.redis_client = jobs.redis_client = async_client
+    for route in app.routes:
+        for dependency in getattr(route, "dependencies", []):
+            if isinstance(dependency.dependency, RateLimiter):
+                app.dependency_overrides[dependency.dependency] = lambda: None
+    return "fakeredis"
+
+
+def setup_database():
+    """
+    The setup_database function creates the tables, the benchmark user and
+    a fixed dataset of contacts generated by the seed script.
+
+    :return: None
+    :doc-author: Ihor Voitiuk
+    """
+    engine.echo = False
+    if engine.dialect.name == "sqlite":
+        Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with DBSession() as db:
+        user = db.query(User).filter_by(email=USER["email"]).first()
+        if user is None:
+            user = User(
+                username=USER["username"],
+                email=USER["email"],
+                password=auth_service.get_password_hash(USER["password"]),
+                avatar="",
+                confirmed=True,
+                role=Role.admin,
+            )
+            db.add(user)
+            db.commit()
+        if db.query(Contact).count() < args.contacts:
+            create_contact_person(
+                args.contacts - db.query(Contact).count(), seed=SEED, db=db
+            )
+        return db.query(Contact.last_name).order_by(Contact.id).limit(10).all()
+
+
+def scenarios(last_names: list) -> dict:
+    """
+    The scenarios function returns the request of every scenario for a request number.
+    Uploads and created contacts are unique per request, so the document cache
+    and the unique constraints do not change the measured work.
+
+    :param last_names: list: Last names of the dataset to search for
+    :return: dict: Functions that take the request number and return the request kwargs
+    :doc-author: Ihor Voitiuk
+    """
+    today = date.today().isoformat()
+    run = uuid.uuid4().int % 1_000_000
+    return {
+        "login": lambda n: {
+            "method": "POST",
+            "url": "/api/auth/login",
+            "data": {"username": USER["email"], "password": USER["password"]},
+        },
+        "users_me": lambda n: {"method": "GET", "url": "/api/users/me"},
+        "contacts_list": lambda n: {
+            "method": "GET",
+            "url": "/api/contacts/",
+            "params": {"limit": 20, "offset": n * 20 % args.contacts},
+        },
+        "contacts_search": lambda n: {
+            "method": "GET",
+            "url": "/api/contacts/search",
+            "params": {"last_name": last_names[n % len(last_names)]},
+        },
+        "contacts_birthday": lambda n: {"method": "GET", "url": "/api/contacts/birthday"},
+        "contacts_export_json": lambda n: {
+            "method": "GET",
+            "url": "/api/contacts/export",
+            "params": {"format": "json", "limit": 200},
+        },
+        "contacts_export_csv": lambda n: {
+            "method": "GET",
+            "url": "/api/contacts/export",
+            "params": {"format": "csv", "limit": 200},
+        },
+        "contacts_create": lambda n: {
+            "method": "POST",
+            "url": "/api/contacts/",
+            "json": {
+                "first_name": "Benchmark",
+                "last_name": "Contact",
+                "email": f"benchmark-{run}-{n}@example.com",
+                "phone_number": f"+38{run:06d}{n:06d}",
+                "birthday": today,
+                "description": "Created by the API benchmark",
+            },
+        },
+        "compress_pdf": lambda n: {
+            "method": "POST",
+            "url": "/api/documents/compress_pdf",
+            "params": {"compression": "lossless compression"},
+            "files": {"file": ("document.pdf", make_pdf(n, pages=2), "application/pdf")},
+        },
+        "convert_images_to_pdf": lambda n: {
+            "method": "POST",
+            "url": "/api/documents/convert_images_to_pdf",
+            "files": [
+                ("file", (f"image{index}.jpg", make_image(n * 3 + index), "image/jpeg"))
+                for index in range(3)
+            ],
+        },
+    }
+
+
+async def run_scenario(client, make_request, count: int, concurrency: int) -> dict:
+    """
+    The run_scenario function sends count requests from concurrency workers.
+    The uploads are built before the clock starts.
+
+    :param client: httpx.AsyncClient: The client of the application
+    :param make_request: The function that returns the request kwargs
+    :param count: int: Number of requests
+    :param concurrency: int: Number of concurrent workers
+    :return: dict: Throughput and latency percentiles in milliseconds
+    :doc-author: Ihor Voitiuk
+    """
+    requests = [make_request(number) for number in range(count)]
+    latencies = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        while requests:
+            request = requests.pop()
+            started = time.perf_counter()
+            response = await client.request(**request)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies = sorted(latency * 1000 for latency in latencies)
+    percentiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "requests": count,
+        "errors": errors,
+        "throughput_rps": round(count / elapsed, 1),
+        "mean_ms": round(statistics.fmean(latencies), 2),
+        "p50_ms": round(percentiles[49], 2),
+        "p95_ms": round(percentiles[94], 2),
+        "p99_ms": round(percentiles[98], 2),
+        "max_ms": round(latencies[-1], 2),
+    }
+
+
+def compare(results: dict, previous: dict):
+    """
+    The compare function prints the change of throughput and p95 latency
+    against earlier results.
+
+    :param results: dict: The results of this run
+    :param previous: dict: Earlier results
+    :return: None
+    :doc-author: Ihor Voitiuk
+    """
+    print(f"\n{'compared with ' + previous['started_at']:<45} {'rps':>9} {'p95':>9}")
+    for name, result in results["scenarios"].items():
+        before = previous["scenarios"].get(name)
+        if before is None:
+            continue
+        rps = (result["throughput_rps"] / before["throughput_rps"] - 1) * 100
+        p95 = (result["p95_ms"] / before["p95_ms"] - 1) * 100
+        print(f"{name:<45} {rps:+8.1f}% {p95:+8.1f}%")
+
+
+async def run():
+    last_names = [row.last_name for row in setup_database()]
+    redis_used = await setup_redis()
+    mail.load_templates()
+
+    async with httpx.AsyncClient(app=app, base_url="http://benchmark") as client:
+        response = await client.post(
+            "/api/auth/login",
+            data={"username": USER["email"], "password": USER["password"]},
+        )
+        response.raise_for_status()
+        client.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+
+        results = {
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "database": engine.dialect.name,
+            "redis": redis_used,
+            "contacts": args.contacts,
+            "concurrency": args.concurrency,
+            "scenarios": {},
+        }
+        print(f"{'scenario':<24} {'rps':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'errors':>7}")
+        for name, make_request in scenarios(last_names).items():
+            if args.scenarios and name not in args.scenarios:
+                continue
+            result = await run_scenario(
+                client, make_request, args.requests, args.concurrency
+            )
+            results["scenarios"][name] = result
+            print(
+                f"{name:<24} {result['throughput_rps']:>9} {result['p50_ms']:>9} "
+                f"{result['p95_ms']:>9} {result['p99_ms']:>9} {result['errors']:>7}"
+            )
+    return results
+
+
+def main():
+    results = asyncio.run(run())
+    output = args.output or RESULTS_DIR / f"api-{results['started_at'].replace(':', '')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(f"\nResults written to {output}")
+    if args.compare:
+        compare(results, json.loads(args.compare.read_text()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# This adds the parent directory of the current file to the Python path
+
+import argparse
+import asyncio
+import time
+import tracemalloc
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import parse_obj_as
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.database.models import Base
+from src.repository import contacts as repository_contacts
+from src.routes.contacts import rows_response
+from src.services.export import export_contacts_to_csv
+from src.schemas import ContactResponse
+from src.seed.contacts_to_db import create_contact_person
+
+
+def make_session(count: int):
+    """
+    The make_session function returns a session of an in-memory database
+    with the fixed contacts of the seed script.
+
+    :param count: int: Number of contacts
+    :return: A database session
+    :doc-author: Ihor Voitiuk
+    """
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    create_contact_person(count, seed=2023, db=db)
+    return db
+
+
+def entities_json(db, count: int) -> bytes:
+    """
+    The entities_json function builds the response like FastAPI does for a response
+    model: it loads the entities, validates them with ContactResponse and encodes
+    them with jsonable_encoder and the standard json module.
+
+    :param db: Session: The database session
+    :param count: int: Number of contacts
+    :return: bytes: The response body
+    :doc-author: Ihor Voitiuk
+    """
+    contacts = asyncio.run(repository_contacts.get_contacts(count, 0, db))
+    content = jsonable_encoder(parse_obj_as(List[ContactResponse], contacts))
+    db.expunge_all()
+    return JSONResponse(content).body
+
+
+def entities_orjson(db, count: int) -> bytes:
+    """
+    The entities_orjson function builds the response for a response model with
+    ORJSONResponse as the default response class.
+
+    :param db: Session: The database session
+    :param count: int: Number of contacts
+    :return: bytes: The response body
+    :doc-author: Ihor Voitiuk
+    """
+    contacts = asyncio.run(repository_contacts.get_contacts(count, 0, db))
+    content = jsonable_encoder(parse_obj_as(List[ContactResponse], contacts))
+    db.expunge_all()
+    return ORJSONResponse(content).body
+
+
+def rows_orjson(db, count: int) -> bytes:
+    """
+    The rows_orjson function builds the response of the list endpoints:
+    column rows serialized directly by orjson.
+
+    :param db: Session: The database session
+    :param count: int: Number of contacts
+    :return: bytes: The response body
+    :doc-author: Ihor Voitiuk
+    """
+    rows = asyncio.run(
+        repository_contacts.get_contacts(
+            count, 0, db, columns=repository_contacts.RESPONSE_COLUMNS
+        )
+    )
+    return rows_response(rows).body
+
+
+def export_entities(db, count: int) -> str:
+    """
+    The export_entities function exports contacts loaded as entities.
+
+    :param db: Session: The database session
+    :param count: int: Number of contacts
+    :return: str: The CSV
+    :doc-author: Ihor Voitiuk
+    """
+    contacts = asyncio.run(repository_contacts.get_contacts(count, 0, db))
+    result = export_contacts_to_csv(contacts)
+    db.expunge_all()
+    return result
+
+
+def export_rows(db, count: int) -> str:
+    """
+    The export_rows function exports contacts loaded as rows of the exported columns.
+
+    :param db: Session: The database session
+    :param count: int: Number of contacts
+    :return: str: The CSV
+    :doc-author: Ihor Voitiuk
+    """
+    contacts = asyncio.run(
+        repository_contacts.get_contacts(
+            count, 0, db, columns=repository_contacts.EXPORT_COLUMNS
+        )
+    )
+    return export_contacts_to_csv(contacts)
+
+
+def peak_memory(function, db, count: int) -> float:
+    """
+    The peak_memory function returns the memory allocated at the peak of one run.
+
+    :param function: The benchmark function
+    :param db: Session: The database session
+    :param count: int: Number of rows
+    :return: float: Kilobytes
+    :doc-author: Ihor Voitiuk
+    """
+    tracemalloc.start()
+    try:
+        function(db, count)
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def measure(function, db, count: int, repeat: int):
+    """
+    The measure function returns the best time per row of several runs.
+
+    :param function: The benchmark function
+    :param db: Session: The database session
+    :param count: int: Number of rows per response
+    :param repeat: int: Number of runs
+    :return: float: Microseconds per row
+    :doc-author: Ihor Voitiuk
+    """
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function(db, count)
+        timings.append(time.perf_counter() - started)
+    return min(timings) / count * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark contact list responses")
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    db = make_session(args.count)
+    for name, function in (
+        ("entities + json", entities_json),
+        ("entities + orjson", entities_orjson),
+        ("rows + orjson", rows_orjson),
+    ):
+        print(f"{name:<20} {measure(function, db, args.count, args.repeat):10.1f} us/row")
+    for name, function in (
+        ("export entities", export_entities),
+        ("export rows", export_rows),
+    ):
+        print(
+            f"{name:<20} {measure(function, db, args.count, args.repeat):10.1f} us/row"
+            f" {peak_memory(function, db, args.count):10.1f} KiB peak"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import io
+import random
+
+from PIL import Image
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+
+
+def make_image(number: int, size: tuple = (800, 600), seed: int = 0) -> bytes:
+    """
+    The make_image function returns a JPEG with noise, so it compresses like a photo.
+    Images with different numbers have different content and digests.
+
+    :param number: int: The number of the image
+    :param size: tuple: Width and height in pixels
+    :param seed: int: Seed of the noise
+    :return: bytes: The JPEG
+    :doc-author: Ihor Voitiuk
+    """
+    random.seed(seed * 1_000_003 + number)
+    noise = Image.effect_noise(size, random.randint(20, 80)).convert("RGB")
+    noise.putpixel((0, 0), (number % 256, number // 256 % 256, 0))
+    output = io.BytesIO()
+    noise.save(output, format="JPEG", quality=90)
+    return output.getvalue()
+
+
+def make_pdf(number: int, pages: int = 1, shared_image: bool = False) -> bytes:
+    """
+    The make_pdf function returns a PDF with text and an image on every page.
+    With a shared image the same image is drawn on every page.
+
+    :param number: int: The number of the PDF, written on every page
+    :param pages: int: Number of pages
+    :param shared_image: bool: Draw the same image on every page
+    :return: bytes: The PDF
+    :doc-author: Ihor Voitiuk
+    """
+    output = io.BytesIO()
+    pdf = canvas.Canvas(output, pagesize=A4)
+    for page in range(pages):
+        image_number = number if shared_image else number * 10_000 + page
+        image = ImageReader(io.BytesIO(make_image(image_number, (600, 400))))
+        pdf.drawString(50, 800, f"Benchmark document {number}, page {page + 1}")
+        pdf.drawImage(image, 50, 450, width=300, height=200)
+        pdf.showPage()
+    pdf.save()
+    return output.getvalue()
+
+
+def pad_pdf(data: bytes, size: int) -> bytes:
+    """
+    The pad_pdf function fills a PDF up to size bytes with a comment placed before
+    its startxref line, so the offsets of the cross-reference table stay valid.
+
+    :param data: bytes: The PDF
+    :param size: int: The size of the padded PDF in bytes
+    :return: bytes: The padded PDF
+    :doc-author: Ihor Voitiuk
+    """
+    missing = size - len(data)
+    if missing < 2:
+        return data
+    position = data.rindex(b"startxref")
+    return data[:position] + b"%" + b"0" * (missing - 2) + b"\n" + data[position:]
+
+
+def make_pdf_of_size(number: int, size: int) -> bytes:
+    """
+    The make_pdf_of_size function returns a PDF of about size bytes. Small sizes
+    are text only, larger ones get pages with images and are padded to exactly
+    size bytes.
+
+    :param number: int: The number of the PDF
+    :param size: int: The size of the PDF in bytes
+    :return: bytes: The PDF
+    :doc-author: Ihor Voitiuk
+    """
+    if size < 64 * 1024:
+        output = io.BytesIO()
+        pdf = canvas.Canvas(output, pagesize=A4, pageCompression=0)
+        text = f"Benchmark document {number} " * 4
+        for line in range(size // len(text)):
+            if line and line % 80 == 0:
+                pdf.showPage()
+            pdf.drawString(20, 820 - line % 80 * 10, text)
+        pdf.save()
+        return output.getvalue()
+    page_size = len(make_pdf(number))
+    pages = max(1, size // page_size)
+    data = make_pdf(number, pages=pages)
+    while len(data) > size and pages > 1:
+        pages -= 1
+        data = make_pdf(number, pages=pages)
+    return pad_pdf(data, size)
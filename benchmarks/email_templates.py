@@ -0,0 +1,125 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# This adds the parent directory of the current file to the Python path
+
+import argparse
+import asyncio
+import time
+from datetime import datetime
+
+from fastapi_mail import MessageSchema, MessageType
+
+from src.services.email import mail
+from src.services.email.outbox import conf
+
+
+def contact_form_message(number: int):
+    """
+    The contact_form_message function returns a contact form message for the benchmark.
+
+    :param number: int: The number of the message
+    :return: A MessageSchema
+    :doc-author: Ihor Voitiuk
+    """
+    return MessageSchema(
+        subject="Contact form",
+        recipients=["admin@example.com"],
+        template_body={
+            "name": f"User {number}",
+            "email": f"user{number}@example.com",
+            "phone": "+380639249861",
+            "message": "Hello, I would like to know more about the application.",
+            "time": datetime.now(),
+        },
+        subtype=MessageType.html,
+    )
+
+
+def render_per_message(count: int):
+    """
+    The render_per_message function renders like fastapi-mail: a new environment
+    and a template lookup for every message.
+
+    :param count: int: Number of messages
+    :return: None
+    :doc-author: Ihor Voitiuk
+    """
+    for number in range(count):
+        message = contact_form_message(number)
+        template = conf.template_engine().get_template(
+            "email_template_contact_form.html"
+        )
+        template.render(**message.template_body)
+
+
+def render_compiled(count: int):
+    """
+    The render_compiled function renders with the compiled templates of the registry.
+
+    :param count: int: Number of messages
+    :return: None
+    :doc-author: Ihor Voitiuk
+    """
+    for number in range(count):
+        message = contact_form_message(number)
+        mail.get_template("email_template_contact_form.html").render(
+            **message.template_body
+        )
+
+
+def prepare_messages(count: int):
+    """
+    The prepare_messages function renders and builds the MIME messages like the outbox does.
+
+    :param count: int: Number of messages
+    :return: None
+    :doc-author: Ihor Voitiuk
+    """
+
+    async def prepare():
+        for number in range(count):
+            await mail.prepare_message(
+                contact_form_message(number), "email_template_contact_form.html"
+            )
+
+    asyncio.run(prepare())
+
+
+def measure(function, count: int, repeat: int):
+    """
+    The measure function returns the best time per message of several runs.
+
+    :param function: The benchmark function
+    :param count: int: Number of messages per run
+    :param repeat: int: Number of runs
+    :return: float: Microseconds per message
+    :doc-author: Ihor Voitiuk
+    """
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function(count)
+        timings.append(time.perf_counter() - started)
+    return min(timings) / count * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark bulk email rendering")
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    mail.load_templates()
+    for name, function in (
+        ("render per message", render_per_message),
+        ("render compiled", render_compiled),
+        ("prepare message", prepare_messages),
+    ):
+        print(f"{name:<20} {measure(function, args.count, args.repeat):10.1f} us/message")
+
+
+if __name__ == "__main__":
+    main()
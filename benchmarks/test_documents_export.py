@@ -0,0 +1,113 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# This adds the parent directory of the current file to the Python path
+
+# Run with:
+#   pytest benchmarks --benchmark-autosave
+# and gate a change against the saved run with:
+#   pytest benchmarks --benchmark-compare --benchmark-compare-fail=median:10%
+# Select sizes with -k, e.g. -k "images-10 or contacts-10000".
+
+import asyncio
+import io
+from functools import lru_cache
+from types import SimpleNamespace
+
+import pytest
+from starlette.datastructures import UploadFile
+
+from benchmarks.datasets import make_image, make_pdf_of_size
+from src.services.documents import pdf_utils
+from src.services.export import export_contacts_to_csv, export_contacts_to_json
+
+pytest.importorskip("pytest_benchmark")
+
+IMAGE_COUNTS = (1, 10, 100, 500)
+PDF_SIZES = {
+    "1KB": 1024,
+    "100KB": 100 * 1024,
+    "1MB": 1024 * 1024,
+    "max": pdf_utils.MAX_PDF_SIZE - 1,
+}
+CONTACT_COUNTS = (10, 1_000, 100_000, 1_000_000)
+COMPRESSION_MODES = (
+    "lossless compression",
+    "lossy compression",
+    "remove images",
+    "remove duplication",
+)
+
+
+@lru_cache
+def images(count: int) -> list:
+    return [make_image(number, (640, 480)) for number in range(count)]
+
+
+@lru_cache
+def pdf(size: int) -> bytes:
+    return make_pdf_of_size(1, size)
+
+
+@lru_cache
+def contacts(count: int) -> list:
+    return [
+        SimpleNamespace(
+            first_name=f"First{number}",
+            last_name=f"Last{number}",
+            email=f"contact{number}@example.com",
+            phone_number=f"+380{number:09d}",
+        )
+        for number in range(count)
+    ]
+
+
+def upload(content: bytes, filename: str) -> UploadFile:
+    return UploadFile(io.BytesIO(content), size=len(content), filename=filename)
+
+
+def rounds(size: int, large: int) -> int:
+    # Large inputs take seconds per call, a few rounds are enough
+    return 3 if size >= large else 10
+
+
+@pytest.mark.parametrize("count", IMAGE_COUNTS, ids=lambda count: f"images-{count}")
+def test_convert_images_to_pdf(benchmark, count):
+    content = images(count)
+
+    def convert():
+        files = [upload(image, f"{number}.jpg") for number, image in enumerate(content)]
+        return asyncio.run(pdf_utils.convert_images_to_pdf(files))
+
+    result = benchmark.pedantic(convert, rounds=rounds(count, 100))
+    assert result.getvalue().startswith(b"%PDF-")
+
+
+@pytest.mark.parametrize("compression", COMPRESSION_MODES)
+@pytest.mark.parametrize("size", PDF_SIZES, ids=lambda size: f"pdf-{size}")
+def test_compress_pdf(benchmark, size, compression):
+    content = pdf(PDF_SIZES[size])
+
+    def compress():
+        return asyncio.run(pdf_utils.compress_pdf(upload(content, "file.pdf"), compression))
+
+    result, *_ = benchmark.pedantic(compress, rounds=rounds(len(content), 1024 * 1024))
+    assert result.startswith(b"%PDF-")
+
+
+@pytest.mark.parametrize("count", CONTACT_COUNTS, ids=lambda count: f"contacts-{count}")
+def test_export_contacts_to_csv(benchmark, count):
+    result = benchmark.pedantic(
+        export_contacts_to_csv, args=(contacts(count),), rounds=rounds(count, 100_000)
+    )
+    assert result.count("\n") == count - 1
+
+
+@pytest.mark.parametrize("count", CONTACT_COUNTS, ids=lambda count: f"contacts-{count}")
+def test_export_contacts_to_json(benchmark, count):
+    result = benchmark.pedantic(
+        export_contacts_to_json, args=(contacts(count),), rounds=rounds(count, 100_000)
+    )
+    assert result.startswith('[{"first_name": "First0"')
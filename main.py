@@ -1,4 +1,4 @@
-import time
+import logging
 import redis.asyncio as redis
 
 from pathlib import Path
@@ -15,24 +15,35 @@ from fastapi import (
 )
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi_limiter import FastAPILimiter
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, ORJSONResponse, PlainTextResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 
 from src.database.db import get_db
-from src.routes import contacts, auth, users, documents, sms
+from src.routes import contacts, auth, users, documents, sms, usage, profiler, health
+from src.services import health as health_service, log, metering, metrics
+from src.services import sms_outbox, watchdog
+from src.services.profiler import ProfilerMiddleware
+from src.services.documents import jobs
+from src.services.documents.pdf_utils import MAX_IMAGE_SIZE, MAX_PDF_SIZE
+from src.services.documents.uploads import UploadLimitMiddleware
 from src.conf.config import settings
+from src.services.email import contact_form, mail, outbox
 from src.services.email.mail import send_email_contact_form as send_email
 
 
-app = FastAPI()
+logger = logging.getLogger(__name__)
+
+app = FastAPI(default_response_class=ORJSONResponse)
 
 
 @app.on_event("startup")
 async def startup():
-    print("------------- STARTUP --------------")
+    log.setup()
+    logger.info("Startup")
+    await watchdog.start()
     r = await redis.Redis(
         host=settings.redis_host,
         port=settings.redis_port,
@@ -40,7 +51,24 @@ async def startup():
         encoding="utf-8",
         decode_responses=True,
     )
-    await FastAPILimiter.init(r)
+    await FastAPILimiter.init(metrics.instrument_redis(r))
+    await jobs.start_workers()
+    await metering.start()
+    await sms_outbox.start()
+    mail.load_templates()
+    await outbox.start()
+    await health_service.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await health_service.stop()
+    await jobs.stop_workers()
+    await metering.stop()
+    await sms_outbox.stop()
+    await outbox.stop()
+    await watchdog.stop()
+    log.shutdown()
 
 
 origins = ["http://localhost:8000"]
@@ -55,13 +83,36 @@ app.add_middleware(
 )
 
 
-@app.middleware("http")
-async def custom_middleware(request: Request, call_next):
-    start_time = time.time()
-    response = await call_next(request)
-    during = time.time() - start_time
-    response.headers["performance"] = str(during)
-    return response
+# Room for multipart boundaries and part headers
+MULTIPART_OVERHEAD = 64 * 1024
+IMAGES_UPLOAD_LIMIT = settings.document_max_images * MAX_IMAGE_SIZE + MULTIPART_OVERHEAD
+PDF_UPLOAD_LIMIT = MAX_PDF_SIZE + MULTIPART_OVERHEAD
+
+app.add_middleware(
+    UploadLimitMiddleware,
+    limits={
+        "/api/documents/convert_images_to_pdf": IMAGES_UPLOAD_LIMIT,
+        "/api/documents/jobs/convert_images_to_pdf": IMAGES_UPLOAD_LIMIT,
+        "/api/documents/compress_pdf": PDF_UPLOAD_LIMIT,
+        "/api/documents/jobs/compress_pdf": PDF_UPLOAD_LIMIT,
+    },
+)
+
+app.add_middleware(ProfilerMiddleware)
+app.add_middleware(metrics.MetricsMiddleware)
+app.add_middleware(log.RequestIdMiddleware)
+
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics():
+    """
+    The get_metrics function returns the metrics of the application in the
+    Prometheus text format.
+
+    :return: The metrics
+    :doc-author: Ihor Voitiuk
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 
 @app.get("/api/healthchecker")
@@ -84,7 +135,7 @@ def healthchecker(db: Session = Depends(get_db)):
             )
         return {"message": "Welcome to FastAPI!"}
     except Exception as e:
-        print(e)
+        logger.error("Healthchecker failed: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Error connecting to the database",
@@ -123,7 +174,9 @@ async def submit_form(
 ):
     """
     The submit_form function is a POST endpoint that accepts the form
-    data and sends an email to the configured address.
+    data and adds an email to the configured address to the outbox.
+    Submissions are throttled per IP address and email, and a repeated
+    message is answered as sent without sending it again.
 
     :param request: Request: Get the request object for the current http request
     :param name: str: Get the name from the form
@@ -148,7 +201,21 @@ async def submit_form(
                 "error_message": "All fields are required.",
             },
         )
-    await send_email(email, name, phone, message, subj="Contact form")
+    new_message = await contact_form.check_submission(
+        request, email, name, phone, message
+    )
+    if new_message and not await send_email(
+        email, name, phone, message, subj="Contact form"
+    ):
+        await contact_form.forget_submission(email, name, phone, message)
+        return templates.TemplateResponse(
+            "index.html",
+            {
+                "request": request,
+                "context": context,
+                "error_message": "The message could not be sent, try again later.",
+            },
+        )
 
     return templates.TemplateResponse(
         "index.html",
@@ -165,6 +232,9 @@ app.include_router(users.router, prefix="/api")
 app.include_router(contacts.router, prefix="/api")
 app.include_router(documents.router, prefix="/api")
 app.include_router(sms.router, prefix="/api")
+app.include_router(usage.router, prefix="/api")
+app.include_router(profiler.router, prefix="/api")
+app.include_router(health.router, prefix="/api")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,27 @@
+"""Added messages sms user created index
+
+Revision ID: a1e5b8c3f7d2
+Revises: 9c4d7e2b1a60
+Create Date: 2026-10-19 12:48:51.902317
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a1e5b8c3f7d2'
+down_revision = '9c4d7e2b1a60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Built concurrently, so writes to messages_sms are not blocked on large tables
+    with op.get_context().autocommit_block():
+        op.create_index('ix_messages_sms_user_id_created_at', 'messages_sms', ['user_id', 'created_at'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_messages_sms_user_id_created_at', table_name='messages_sms', postgresql_concurrently=True)
@@ -1,14 +1,16 @@
 from fastapi import HTTPException, status
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy.exc import SQLAlchemyError
 
 from src.conf.config import settings
+from src.services import metrics
 
 
 URI = settings.sqlalchemy_database_url
 
-engine = create_engine(URI, echo=True)
+engine = metrics.instrument_engine(create_engine(URI))
 DBSession = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 
 
@@ -31,3 +33,17 @@ def get_db():
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(err))
     finally:
         db.close()
+
+
+def dialect_insert(db: Session):
+    """
+    The dialect_insert function returns the insert construct of the session's database,
+    which supports ON CONFLICT clauses on both PostgreSQL and SQLite.
+
+    :param db: Session: The database session
+    :return: The dialect specific insert function
+    :doc-author: Ihor Voitiuk
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql.insert
+    return sqlite.insert
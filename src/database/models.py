@@ -10,8 +10,10 @@ from sqlalchemy import (
     func,
     ForeignKey,
     Enum,
+    Index,
+    UniqueConstraint,
 )
-from sqlalchemy.orm import relationship, declarative_base
+from sqlalchemy.orm import backref, relationship, declarative_base
 
 Base = declarative_base()
 
@@ -52,19 +54,62 @@ class TotalSMS(Base):
     total_send_sms = Column(Integer, nullable=True, default=0)
 
 
+class UserTotalSMS(Base):
+    __tablename__ = "user_total_sms"
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), unique=True)
+    day = Column(Date, nullable=False, server_default=func.current_date())
+    total_send_sms = Column(Integer, nullable=False, default=0)
+
+
+class SMSBroadcast(Base):
+    __tablename__ = "sms_broadcasts"
+    id = Column(Integer, primary_key=True)
+    message = Column(String(250), nullable=True)
+    from_phone = Column(String, nullable=False)
+    total = Column(Integer, nullable=False, default=0)
+    created_at = Column("created_at", DateTime, default=func.now())
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), default=None)
+
+
 class MessageSMS(Base):
     __tablename__ = "messages_sms"
+    __table_args__ = (
+        Index("ix_messages_sms_status", "status", "next_attempt_at"),
+        Index("ix_messages_sms_user_id_created_at", "user_id", "created_at"),
+    )
     id = Column(Integer, primary_key=True)
     message = Column(String(250), nullable=True)
     from_phone = Column(String, nullable=False)
     to_phone = Column(String, nullable=False)
     created_at = Column("created_at", DateTime, default=func.now())
+    status = Column(String(20), nullable=False, default="queued")
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=True)
+    provider_sid = Column(String(64), nullable=True)
+    error = Column(String(255), nullable=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), default=None)
     total_sms_id = Column(
         Integer, ForeignKey("total_sms.id", ondelete="CASCADE"), default=None
     )
-    total_sms = relationship("TotalSMS", backref="message")
-    user = relationship("User", backref="messagesms")
+    broadcast_id = Column(
+        Integer,
+        ForeignKey("sms_broadcasts.id", ondelete="CASCADE"),
+        nullable=True,
+        index=True,
+    )
+    total_sms = relationship("TotalSMS", backref=backref("message", lazy="noload"))
+    user = relationship("User", backref=backref("messagesms", lazy="dynamic"))
+
+
+class UsageDaily(Base):
+    __tablename__ = "usage_daily"
+    __table_args__ = (UniqueConstraint("user_id", "day", "kind"),)
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    day = Column(Date, nullable=False)
+    kind = Column(String(20), nullable=False)
+    count = Column(Integer, nullable=False, default=0)
 
 
 class User(Base):
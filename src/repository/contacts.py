@@ -6,6 +6,36 @@ from src.database.models import Contact
 from src.schemas import ContactModel
 
 
+def contact_columns(*fields: str) -> tuple:
+    """
+    The contact_columns function returns the columns of the contact fields a caller needs,
+    for the columns parameter of the read functions. Selecting columns returns lightweight
+    rows with these fields as attributes instead of Contact entities, so no other column
+    is loaded and the rows are not tracked by the session.
+
+    :param fields: str: Names of the Contact columns
+    :return: tuple: The columns
+    :doc-author: Ihor Voitiuk
+    """
+    return tuple(Contact.__table__.c[field] for field in fields)
+
+
+# The columns of ContactResponse, for responses that are built from rows
+RESPONSE_COLUMNS = contact_columns(
+    "id",
+    "first_name",
+    "last_name",
+    "email",
+    "phone_number",
+    "birthday",
+    "description",
+    "created_at",
+    "updated_at",
+)
+# The columns of the exported contacts
+EXPORT_COLUMNS = contact_columns("first_name", "last_name", "email", "phone_number")
+
+
 async def get_contact_by_id(contact_id: int, db: Session):
     """
     The get_contact_by_id function takes in a contact_id and returns the corresponding Contact object.
@@ -23,7 +53,7 @@ async def get_contact_by_id(contact_id: int, db: Session):
     return contact
 
 
-async def get_contacts(limit: int, offset: int, db: Session):
+async def get_contacts(limit: int, offset: int, db: Session, columns: tuple = None):
     """
     The get_contacts function returns a list of contacts from the database.
 
@@ -34,11 +64,13 @@ async def get_contacts(limit: int, offset: int, db: Session):
     :param limit: int: Limit the number of contacts returned
     :param offset: int: Specify the number of records to skip
     :param db: Session: Pass the database session to the function
+    :param columns: tuple: Select only these columns and return rows instead of contacts
     :return: A list of contact objects
     :doc-author: Ihor Voitiuk
     """
 
-    contacts = db.query(Contact).limit(limit).offset(offset).all()
+    query = db.query(*columns) if columns else db.query(Contact)
+    contacts = query.limit(limit).offset(offset).all()
     return contacts
 
 
@@ -111,7 +143,11 @@ async def remove_contact(contact_id: int, db: Session):
 
 
 async def search_contacts(
-    db: Session, first_name: str = None, last_name: str = None, email: str = None
+    db: Session,
+    first_name: str = None,
+    last_name: str = None,
+    email: str = None,
+    columns: tuple = None,
 ):
     """
     The search_contacts function searches the database for contacts that match the given parameters.
@@ -122,79 +158,49 @@ async def search_contacts(
     :param first_name: str: Search for a contact by first name
     :param last_name: str: Filter the results by last name
     :param email: str: Search for a contact by email
+    :param columns: tuple: Select only these columns and return rows instead of contacts
     :return: A list of contact objects or None if no seach contacts
     :doc-author: Ihor Voitiuk
     """
 
-    if first_name and last_name and email:
-        return (
-            db.query(Contact)
-            .filter(
-                Contact.first_name == first_name.capitalize(),
-                Contact.last_name == last_name.capitalize(),
-                Contact.email == email.lower(),
-            )
-            .all()
-        )
-    elif first_name and last_name:
-        return (
-            db.query(Contact)
-            .filter(
-                Contact.first_name == first_name.capitalize(),
-                Contact.last_name == last_name.capitalize(),
-            )
-            .all()
-        )
-    elif last_name and email:
-        return (
-            db.query(Contact)
-            .filter(
-                Contact.last_name == last_name.capitalize(),
-                Contact.email == email.lower(),
-            )
-            .all()
-        )
-    elif first_name and email:
-        return (
-            db.query(Contact)
-            .filter(
-                Contact.first_name == first_name.capitalize(),
-                Contact.email == email.lower(),
-            )
-            .all()
-        )
-    elif first_name:
-        return (
-            db.query(Contact)
-            .filter(Contact.first_name == first_name.capitalize())
-            .all()
-        )
-    elif last_name:
-        return (
-            db.query(Contact).filter(Contact.last_name == last_name.capitalize()).all()
-        )
-    elif email:
-        return db.query(Contact).filter(Contact.email == email.lower()).all()
-
-    return None
-
-
-async def birthday_contacts(db: Session):
+    conditions = []
+    if first_name:
+        conditions.append(Contact.first_name == first_name.capitalize())
+    if last_name:
+        conditions.append(Contact.last_name == last_name.capitalize())
+    if email:
+        conditions.append(Contact.email == email.lower())
+    if not conditions:
+        return None
+
+    query = db.query(*columns) if columns else db.query(Contact)
+    return query.filter(*conditions).all()
+
+
+def birthday_filter():
+    """
+    The birthday_filter function returns the condition for contacts whose birthday is within the next week.
+
+    :return: A filter condition for the Contact model
+    :doc-author: Ihor Voitiuk
+    """
+    start_day = datetime.date.today() + datetime.timedelta(days=1)
+    end_day = datetime.date.today() + datetime.timedelta(days=8)
+    return Contact.birthday.between(start_day, end_day)
+
+
+async def birthday_contacts(db: Session, columns: tuple = None):
     """
     The birthday_contacts function returns a list of contacts whose birthday is within the next week.
 
     :param db: Session: Pass the database session to the function
+    :param columns: tuple: Select only these columns and return rows instead of contacts
     :return: A list of contacts that have a birthday within the next 7 days
     :doc-author: Ihor Voitiuk
     """
     
-    start_day = datetime.date.today() + datetime.timedelta(days=1)
-    end_day = datetime.date.today() + datetime.timedelta(days=8)
-    contacts = (
-        db.query(Contact)
-        .filter(Contact.birthday >= start_day, Contact.birthday <= end_day)
-        .all()
-    )
+    query = db.query(*columns) if columns else db.query(Contact)
+    contacts = query.filter(birthday_filter()).all()
 
     return contacts
 
@@ -1,5 +1,7 @@
+from sqlalchemy import func, literal, select
 from sqlalchemy.orm import Session
 
+from src.database.db import dialect_insert
 from src.database.models import Document, User
 from src.schemas import DocumentModel
 
@@ -21,6 +23,8 @@ async def get_user_by_email(email: str, db: Session) -> User:
 async def update_documents_count(user_email: str, count_files: int, db: Session):
     """
     The update_documents_count function updates the number of documents a user has.
+    The counter is changed with a single INSERT ... ON CONFLICT DO UPDATE ... RETURNING
+    statement, so concurrent uploads can not overwrite each other's increments.
 
         Args:
             email (str): The email address of the user to update.
@@ -32,18 +36,21 @@ async def update_documents_count(user_email: str, count_files: int, db: Session)
     :return: The number of documents a user has
     :doc-author: Ihor Voitiuk
     """
-    user = await get_user_by_email(user_email, db)
-    if user:
-        if user.document is None:
-            document = Document(total_count=count_files, user=user)
-            db.add(document)
-            db.commit()
-            db.refresh(document)
-            return document.total_count
-        else:
-            user.document.total_count += count_files
-            db.commit()
-            db.refresh(user.document)
-            return user.document.total_count
-    else:
+    insert = dialect_insert(db)
+    statement = insert(Document).from_select(
+        ["user_id", "total_count"],
+        select(User.id, literal(count_files)).where(User.email == user_email),
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=[Document.user_id],
+        set_={
+            "total_count": func.coalesce(Document.total_count, 0)
+            + statement.excluded.total_count
+        },
+    ).returning(Document.total_count)
+
+    total_count = db.execute(statement).scalar_one_or_none()
+    db.commit()
+    if total_count is None:
         return "You must authorize!"
+    return total_count
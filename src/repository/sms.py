@@ -1,8 +1,19 @@
 import datetime
+from sqlalchemy import case, func, or_, select, tuple_, update
 from sqlalchemy.orm import Session
 
-from src.database.models import User, TotalSMS, MessageSMS
-from src.schemas import SendSMSModel, SendSMSResponse
+from src.conf.config import settings
+from src.database.db import dialect_insert
+from src.database.models import (
+    Contact,
+    User,
+    TotalSMS,
+    UserTotalSMS,
+    MessageSMS,
+    SMSBroadcast,
+)
+from src.repository.contacts import birthday_filter
+from src.schemas import SendSMSModel, SendSMSResponse, SMSBroadcastModel
 
 
 async def get_user_by_email(email: str, db: Session) -> User:
@@ -19,61 +30,398 @@ async def get_user_by_email(email: str, db: Session) -> User:
     return db.query(User).filter(User.email == email).first()
 
 
-async def create_sms(body: SendSMSModel, user_email: str, db: Session):
+async def reserve_sms(user_id: int, db: Session, count: int = 1):
     """
-    The create_sms function creates a new sms message.
+    The reserve_sms function reserves count messages of the global and of the user's daily
+    quota before the messages are sent. Each counter is incremented by a single conditional
+    statement, so concurrent requests can not overshoot the limits. The user's counter
+    starts again from zero on the first reservation of a new day. If either limit
+    would be exceeded nothing is reserved.
+    The reservation is not committed, the caller commits it together with the messages,
+    so a failed insert gives the quota back.
+
+    :param user_id: int: Identify the user who sends the message
+    :param db: Session: Access the database
+    :param count: int: Number of messages to reserve
+    :return: The reserved TotalSMS row (id, total_send_sms) or a message if a limit has been reached
+    :doc-author: Ihor Voitiuk
+    """
+    reserve_total = (
+        update(TotalSMS)
+        .where(
+            TotalSMS.id == select(func.min(TotalSMS.id)).scalar_subquery(),
+            func.coalesce(TotalSMS.total_send_sms, 0) + count <= settings.sms_limit,
+        )
+        .values(total_send_sms=func.coalesce(TotalSMS.total_send_sms, 0) + count)
+        .returning(TotalSMS.id, TotalSMS.total_send_sms)
+    )
+    total_sms = db.execute(reserve_total).first()
+    if total_sms is None and db.query(TotalSMS.id).first() is None:
+        insert = dialect_insert(db)
+        db.execute(insert(TotalSMS).values(id=1, total_send_sms=0).on_conflict_do_nothing())
+        total_sms = db.execute(reserve_total).first()
+    if total_sms is None:
+        db.rollback()
+        return "The limit for sending messages has been reached!"
+
+    if count > settings.sms_user_limit:
+        db.rollback()
+        return "Your limit for sending messages has been reached!"
+    today = datetime.date.today()
+    user_total = case(
+        (UserTotalSMS.day == today, UserTotalSMS.total_send_sms + count),
+        else_=count,
+    )
+    insert = dialect_insert(db)
+    reserve_user = insert(UserTotalSMS).values(
+        user_id=user_id, day=today, total_send_sms=count
+    )
+    reserve_user = reserve_user.on_conflict_do_update(
+        index_elements=[UserTotalSMS.user_id],
+        set_={"total_send_sms": user_total, "day": today},
+        where=user_total <= settings.sms_user_limit,
+    ).returning(UserTotalSMS.total_send_sms)
+    if db.execute(reserve_user).first() is None:
+        db.rollback()
+        return "Your limit for sending messages has been reached!"
+
+    return total_sms
+
+
+async def release_sms(user_id: int, total_sms_id: int, db: Session, count: int = 1):
+    """
+    The release_sms function gives back reserved messages when they could not be sent.
+    The user's counter is only lowered while it counts the current day.
+
+    :param user_id: int: Identify the user who sends the message
+    :param total_sms_id: int: The id of the reserved TotalSMS row
+    :param db: Session: Access the database
+    :param count: int: Number of messages to give back
+    :return: None
+    :doc-author: Ihor Voitiuk
+    """
+    db.execute(
+        update(TotalSMS)
+        .where(TotalSMS.id == total_sms_id)
+        .values(total_send_sms=TotalSMS.total_send_sms - count)
+    )
+    db.execute(
+        update(UserTotalSMS)
+        .where(
+            UserTotalSMS.user_id == user_id,
+            UserTotalSMS.day == datetime.date.today(),
+            UserTotalSMS.total_send_sms >= count,
+        )
+        .values(total_send_sms=UserTotalSMS.total_send_sms - count)
+    )
+    db.commit()
+
+
+async def create_sms(body: SendSMSModel, user_email: str, total_sms, db: Session):
+    """
+    The create_sms function creates a new sms message in the outbox.
+    The message must already be reserved with reserve_sms, it is sent by the dispatcher.
+    The row is inserted directly, so the cost does not depend on the user's history.
+    The message and its reservation are committed together.
     
         Args:
             body (SendSMSModel): The request body, in this case containing the message to send.
             user_email (str): The email of the user sending the SMS message.
+            total_sms: The TotalSMS row (id, total_send_sms) returned by reserve_sms.
     
     :param body: SendSMSModel: Pass the data from the request body
     :param user_email: str: Get the user by email
+    :param total_sms: Link the message to the reserved quota
     :param db: Session: Access the database
     :return: An object of type sendsmsresponse
     :doc-author: Ihor Voitiuk
     """
-    total_sms = db.query(TotalSMS).first()
-    if total_sms is None:
-        total_sms = TotalSMS(total_send_sms=0)
-        db.add(total_sms)
-        db.commit()
-    if total_sms.total_send_sms >= 100:
-        return "The limit for sending messages has been reached!"
-
-    user = await get_user_by_email(user_email, db)
-    if user:
-        if user.messagesms is None:
-            message = MessageSMS(
+    user_id = db.query(User.id).filter(User.email == user_email).scalar()
+    if user_id:
+        message = db.execute(
+            MessageSMS.__table__.insert()
+            .values(
                 message=body.message,
                 from_phone=body.from_phone,
                 to_phone=body.to_phone,
-                user_id=user.id,
+                user_id=user_id,
                 total_sms_id=total_sms.id,
             )
-            db.add(message)
-        else:
-            message = MessageSMS(
-                message=body.message,
-                from_phone=body.from_phone,
-                to_phone=body.to_phone,
-                user_id=user.id,
-                total_sms_id=total_sms.id,
-            )
-            user.messagesms.append(message)
-        total_sms.total_send_sms += 1
+            .returning(MessageSMS.id, MessageSMS.created_at, MessageSMS.status)
+        ).first()
         db.commit()
-        db.refresh(user)
         response = SendSMSResponse(
             id=message.id,
-            message=message.message,
-            from_phone=message.from_phone,
-            to_phone=message.to_phone,
+            message=body.message,
+            from_phone=body.from_phone,
+            to_phone=body.to_phone,
             created_at=message.created_at,
-            user_id=message.user_id,
+            user_id=user_id,
             total_sms=total_sms.total_send_sms,
+            status=message.status,
         )
         return response
 
     else:
+        db.rollback()
         return "You must authorize!"
+
+
+async def create_broadcast(body: SMSBroadcastModel, user_id: int, db: Session):
+    """
+    The create_broadcast function adds a message for every selected contact to the outbox.
+    The contacts are selected by id or by segment, the quota for all of them is reserved
+    at once and the messages are inserted with a single bulk statement.
+
+    :param body: SMSBroadcastModel: The message and the contacts to send it to
+    :param user_id: int: Identify the user who sends the messages
+    :param db: Session: Access the database
+    :return: The created SMSBroadcast or a message if there is nothing to send or a limit has been reached
+    :doc-author: Ihor Voitiuk
+    """
+    query = select(Contact.phone_number).distinct()
+    if body.contact_ids is not None:
+        query = query.where(Contact.id.in_(body.contact_ids))
+    elif body.segment == "birthdays":
+        query = query.where(birthday_filter())
+    phones = db.execute(query).scalars().all()
+    if not phones:
+        return "No contacts found!"
+
+    total_sms = await reserve_sms(user_id, db, count=len(phones))
+    if isinstance(total_sms, str):
+        return total_sms
+
+    broadcast = SMSBroadcast(
+        message=body.message,
+        from_phone=body.from_phone,
+        total=len(phones),
+        user_id=user_id,
+    )
+    db.add(broadcast)
+    db.flush()
+    db.execute(
+        MessageSMS.__table__.insert(),
+        [
+            {
+                "message": body.message,
+                "from_phone": body.from_phone,
+                "to_phone": phone,
+                "user_id": user_id,
+                "total_sms_id": total_sms.id,
+                "broadcast_id": broadcast.id,
+            }
+            for phone in phones
+        ],
+    )
+    db.commit()
+    db.refresh(broadcast)
+    return broadcast
+
+
+async def get_broadcast_progress(broadcast_id: int, user_id: int, db: Session):
+    """
+    The get_broadcast_progress function counts the messages of a broadcast by status.
+
+    :param broadcast_id: int: The id of the broadcast
+    :param user_id: int: Only broadcasts of this user are returned
+    :param db: Session: Access the database
+    :return: The SMSBroadcast and a dict of counts by status, or None if it is not found
+    :doc-author: Ihor Voitiuk
+    """
+    broadcast = (
+        db.query(SMSBroadcast)
+        .filter(SMSBroadcast.id == broadcast_id, SMSBroadcast.user_id == user_id)
+        .first()
+    )
+    if broadcast is None:
+        return None
+
+    rows = db.execute(
+        select(MessageSMS.status, func.count())
+        .where(MessageSMS.broadcast_id == broadcast_id)
+        .group_by(MessageSMS.status)
+    ).all()
+    return broadcast, dict(rows)
+
+
+async def get_sms_history(
+    user_id: int,
+    limit: int,
+    date_from: datetime.datetime,
+    date_to: datetime.datetime,
+    before,
+    db: Session,
+):
+    """
+    The get_sms_history function returns a page of the user's messages, newest first.
+    Pages are read with keyset pagination: the next page starts after the
+    (created_at, id) of the last message, so it is served from the
+    (user_id, created_at) index however deep the page is.
+
+    :param user_id: int: Identify the user
+    :param limit: int: Maximum number of messages
+    :param date_from: datetime: Only messages created at or after this time, if given
+    :param date_to: datetime: Only messages created before this time, if given
+    :param before: The (created_at, id) of the last message of the previous page or None
+    :param db: Session: Access the database
+    :return: A list of messages
+    :doc-author: Ihor Voitiuk
+    """
+    query = select(
+        MessageSMS.id,
+        MessageSMS.message,
+        MessageSMS.from_phone,
+        MessageSMS.to_phone,
+        MessageSMS.created_at,
+        MessageSMS.status,
+        MessageSMS.error,
+        MessageSMS.broadcast_id,
+    ).where(MessageSMS.user_id == user_id)
+    if date_from is not None:
+        query = query.where(MessageSMS.created_at >= date_from)
+    if date_to is not None:
+        query = query.where(MessageSMS.created_at < date_to)
+    if before is not None:
+        query = query.where(tuple_(MessageSMS.created_at, MessageSMS.id) < before)
+    query = query.order_by(MessageSMS.created_at.desc(), MessageSMS.id.desc())
+    return db.execute(query.limit(limit)).all()
+
+
+async def claim_sms(limit: int, lease: int, db: Session):
+    """
+    The claim_sms function takes up to limit due messages from the outbox and marks them
+    as sending. A claimed message is due again after lease seconds, so messages of a
+    dispatcher that stopped are picked up by another one. Locked rows are skipped,
+    so several dispatchers can claim messages at the same time on PostgreSQL.
+
+    :param limit: int: Maximum number of messages to claim
+    :param lease: int: Seconds before a claimed message may be claimed again
+    :param db: Session: Access the database
+    :return: A list of claimed messages
+    :doc-author: Ihor Voitiuk
+    """
+    now = datetime.datetime.now()
+    due = (
+        select(MessageSMS.id)
+        .where(
+            MessageSMS.status.in_(("queued", "sending")),
+            or_(
+                MessageSMS.next_attempt_at.is_(None),
+                MessageSMS.next_attempt_at <= now,
+            ),
+        )
+        .order_by(MessageSMS.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    statement = (
+        update(MessageSMS)
+        .where(MessageSMS.id.in_(due))
+        .values(
+            status="sending",
+            attempts=MessageSMS.attempts + 1,
+            next_attempt_at=now + datetime.timedelta(seconds=lease),
+        )
+        .returning(
+            MessageSMS.id,
+            MessageSMS.message,
+            MessageSMS.from_phone,
+            MessageSMS.to_phone,
+            MessageSMS.user_id,
+            MessageSMS.total_sms_id,
+            MessageSMS.attempts,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    messages = db.execute(statement).all()
+    db.commit()
+    return messages
+
+
+async def mark_sms_sent(message_id: int, provider_sid: str, db: Session):
+    """
+    The mark_sms_sent function marks a message of the outbox as sent.
+
+    :param message_id: int: The id of the message
+    :param provider_sid: str: The id of the message at the provider
+    :param db: Session: Access the database
+    :return: None
+    :doc-author: Ihor Voitiuk
+    """
+    db.execute(
+        update(MessageSMS)
+        .where(MessageSMS.id == message_id)
+        .values(status="sent", provider_sid=provider_sid, error=None)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+
+async def retry_sms(message_id: int, delay: float, error: str, db: Session):
+    """
+    The retry_sms function puts a message back in the outbox to be sent after delay seconds.
+
+    :param message_id: int: The id of the message
+    :param delay: float: Seconds to wait before the next attempt
+    :param error: str: The error of the last attempt
+    :param db: Session: Access the database
+    :return: None
+    :doc-author: Ihor Voitiuk
+    """
+    db.execute(
+        update(MessageSMS)
+        .where(MessageSMS.id == message_id)
+        .values(
+            status="queued",
+            next_attempt_at=datetime.datetime.now()
+            + datetime.timedelta(seconds=delay),
+            error=error[:255],
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+
+async def defer_sms(message_id: int, delay: float, db: Session):
+    """
+    The defer_sms function puts a message back in the outbox without counting the attempt.
+    It is used when the provider rejects a request because of its rate limit.
+
+    :param message_id: int: The id of the message
+    :param delay: float: Seconds to wait before the next attempt
+    :param db: Session: Access the database
+    :return: None
+    :doc-author: Ihor Voitiuk
+    """
+    db.execute(
+        update(MessageSMS)
+        .where(MessageSMS.id == message_id)
+        .values(
+            status="queued",
+            attempts=MessageSMS.attempts - 1,
+            next_attempt_at=datetime.datetime.now()
+            + datetime.timedelta(seconds=delay),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+
+async def fail_sms(message, error: str, db: Session):
+    """
+    The fail_sms function marks a message as failed and gives its quota back.
+
+    :param message: The claimed message
+    :param error: str: The error of the last attempt
+    :param db: Session: Access the database
+    :return: None
+    :doc-author: Ihor Voitiuk
+    """
+    db.execute(
+        update(MessageSMS)
+        .where(MessageSMS.id == message.id)
+        .values(status="failed", error=error[:255])
+        .execution_options(synchronize_session=False)
+    )
+    await release_sms(message.user_id, message.total_sms_id, db)
@@ -0,0 +1,55 @@
+from datetime import date
+
+from sqlalchemy.orm import Session
+
+from src.database.db import dialect_insert
+from src.database.models import UsageDaily
+
+
+async def add_usage(rows: list, db: Session):
+    """
+    The add_usage function adds aggregated usage deltas to the daily rollups.
+    All rows are written with one INSERT ... ON CONFLICT DO UPDATE statement.
+
+        Args:
+            rows (list): Dictionaries with user_id, day, kind and count keys.
+
+    :param rows: list: The aggregated usage deltas
+    :param db: Session: Pass the database session to the function
+    :return: None
+    :doc-author: Ihor Voitiuk
+    """
+    if not rows:
+        return
+
+    insert = dialect_insert(db)
+    statement = insert(UsageDaily).values(rows)
+    statement = statement.on_conflict_do_update(
+        index_elements=[UsageDaily.user_id, UsageDaily.day, UsageDaily.kind],
+        set_={"count": UsageDaily.count + statement.excluded.count},
+    )
+    db.execute(statement)
+    db.commit()
+
+
+async def get_usage(user_id: int, date_from: date, date_to: date, db: Session):
+    """
+    The get_usage function returns the daily usage rollups of a user for a date range.
+
+    :param user_id: int: Identify the user
+    :param date_from: date: First day of the range
+    :param date_to: date: Last day of the range
+    :param db: Session: Pass the database session to the function
+    :return: A list of usage rows ordered by day
+    :doc-author: Ihor Voitiuk
+    """
+    return (
+        db.query(UsageDaily)
+        .filter(
+            UsageDaily.user_id == user_id,
+            UsageDaily.day >= date_from,
+            UsageDaily.day <= date_to,
+        )
+        .order_by(UsageDaily.day, UsageDaily.kind)
+        .all()
+    )
@@ -1,3 +1,5 @@
+import logging
+
 from libgravatar import Gravatar
 from sqlalchemy.orm import Session
 
@@ -5,6 +7,9 @@ from src.database.models import User
 from src.schemas import UserModel
 
 
+logger = logging.getLogger(__name__)
+
+
 async def get_user_by_email(email: str, db: Session) -> User:
     """
     The get_user_by_email function takes an email and a database session as arguments.
@@ -36,7 +41,7 @@ async def create_user(body: UserModel, db: Session) -> User:
         g = Gravatar(body.email)
         avatar = g.get_image()
     except Exception as err:
-        print(err)
+        logger.warning("Gravatar is unavailable for %s: %s", body.email, err)
     new_user = User(**body.dict(), avatar=avatar)
     db.add(new_user)
     db.commit()
@@ -1,6 +1,7 @@
 from typing import List
 
 from fastapi import APIRouter, Depends, HTTPException, status, Path, Query
+from fastapi.responses import ORJSONResponse
 from fastapi_limiter.depends import RateLimiter
 from sqlalchemy.orm import Session
 
@@ -21,6 +22,19 @@ access_update = RolesAccess([Role.admin, Role.moderator])
 access_delete = RolesAccess([Role.admin])
 
 
+def rows_response(rows) -> ORJSONResponse:
+    """
+    The rows_response function serializes contact rows straight to JSON with orjson.
+    The rows come from the columns of ContactResponse, so validating every row
+    with the response model is skipped.
+
+    :param rows: The rows of repository_contacts.RESPONSE_COLUMNS
+    :return: An ORJSONResponse with the list of contacts
+    :doc-author: Ihor Voitiuk
+    """
+    return ORJSONResponse([row._asdict() for row in rows])
+
+
 @router.get(
     "/export",
     description="No more than 10 requests per minute.",
@@ -46,7 +60,9 @@ async def export_contacts(
     :return: A dictionary with the exported contacts
     :doc-author: Ihor Voitiuk
     """
-    contacts = await respository_contacts.get_contacts(limit, offset, db)
+    contacts = await respository_contacts.get_contacts(
+        limit, offset, db, columns=respository_contacts.EXPORT_COLUMNS
+    )
 
     if format == "csv":
         exported_data = export_contacts_to_csv(contacts)
@@ -101,11 +117,11 @@ async def search_contacts(
     """
 
     contacts = await respository_contacts.search_contacts(
-        db, first_name, last_name, email
+        db, first_name, last_name, email, columns=respository_contacts.RESPONSE_COLUMNS
     )
     if contacts is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
-    return contacts
+    return rows_response(contacts)
 
 
 @router.get(
@@ -129,10 +145,12 @@ async def birthday_contacts(
     :doc-author: Ihor Voitiuk
     """
 
-    contacts = await respository_contacts.birthday_contacts(db)
+    contacts = await respository_contacts.birthday_contacts(
+        db, columns=respository_contacts.RESPONSE_COLUMNS
+    )
     if contacts is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
-    return contacts
+    return rows_response(contacts)
 
 
 @router.get(
@@ -188,8 +206,10 @@ async def get_contacts(
     :doc-author: Ihor Voitiuk
     """
 
-    contacts = await respository_contacts.get_contacts(limit, offset, db)
-    return contacts
+    contacts = await respository_contacts.get_contacts(
+        limit, offset, db, columns=respository_contacts.RESPONSE_COLUMNS
+    )
+    return rows_response(contacts)
 
 
 @router.post(
@@ -1,17 +1,29 @@
+import io
+
 from typing import List
 
-from fastapi import APIRouter, Depends, UploadFile
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    UploadFile,
+    status,
+)
 from fastapi.responses import StreamingResponse, Response
 from fastapi_limiter.depends import RateLimiter
 from sqlalchemy.orm import Session
 
+from src.conf.config import settings
 from src.database.db import get_db
 from src.database.models import Document, Role, User
 from src.services.auth import auth_service
 from src.services.roles import RolesAccess
+from src.services import metering
 from src.repository import documents as respository_documents
-from src.services.documents import pdf_utils
-from src.schemas import CompressionRequest
+from src.services.documents import cache, jobs, pdf_utils
+from src.schemas import CompressionRequest, DocumentCacheResponse, DocumentJobResponse
 
 
 router = APIRouter(prefix="/documents", tags=["documents"])
@@ -21,6 +33,63 @@ access_create = RolesAccess([Role.admin, Role.moderator])
 access_update = RolesAccess([Role.admin, Role.moderator])
 access_delete = RolesAccess([Role.admin])
 
+COMPRESSION_MODES = [
+    "lossless compression",
+    "lossy compression",
+    "remove images",
+    "remove duplication",
+]
+
+
+def compression_options(compression: str, dpi: int, quality: int) -> dict:
+    """
+    The compression_options function returns the options of a compression.
+    The image options only take part for lossy compression, so other modes
+    share one cache entry whatever dpi and quality were sent.
+
+    :param compression: str: The compression mode
+    :param dpi: int: Target resolution of embedded images
+    :param quality: int: JPEG quality of re-encoded images
+    :return: The keyword arguments of pdf_utils.compress_pdf
+    :doc-author: Ihor Voitiuk
+    """
+    if compression == "lossy compression":
+        return {"compression": compression, "dpi": dpi, "quality": quality}
+    return {"compression": compression}
+
+
+def check_images_count(files: list):
+    """
+    The check_images_count function rejects a conversion of more than
+    document_max_images images.
+
+    :param files: list: The uploaded images
+    :return: None
+    :doc-author: Ihor Voitiuk
+    """
+    if len(files) > settings.document_max_images:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"No more than {settings.document_max_images} images per document",
+        )
+
+
+def indicator_headers(response_data: dict) -> dict:
+    """
+    The indicator_headers function turns the indicators of a document operation
+    into response headers, e.g. total_count becomes X-Total-Count, so clients
+    receive them together with the file.
+
+    :param response_data: dict: The indicators of the operation
+    :return: A dictionary of headers
+    :doc-author: Ihor Voitiuk
+    """
+    return {
+        "X-" + key.replace("_", "-").title(): str(value)
+        for key, value in response_data.items()
+        if key != "message"
+    }
+
 
 @router.post(
     "/convert_images_to_pdf",
@@ -34,6 +103,8 @@ async def convert_images_to_pdf_route(
 ):
     """
     The convert_images_to_pdf_route function converts images to a PDF file.
+    The number of converted images and the user's total count are returned
+    in the X-Attempt-Count and X-Total-Count headers.
 
     :param file: list[UploadFile] | None: Accept a list of files
     :param db: Session: Get the database session
@@ -44,13 +115,24 @@ async def convert_images_to_pdf_route(
     """
     if not file:
         return {"message": "No upload file sent"}
+    check_images_count(file)
 
-    pdf_data = await pdf_utils.convert_images_to_pdf(file)
+    for image in file:
+        await pdf_utils.check_valid_file(image, "image")
+    digests = [await cache.load_file(image) for image in file]
+    cache_key = cache.make_key("convert_images_to_pdf", digests, {})
+    result = await cache.get_result(cache_key)
+    if result is None:
+        pdf_data = await pdf_utils.convert_images_to_pdf(file)
+        await cache.put_result(cache_key, pdf_data.getvalue())
+    else:
+        pdf_data = io.BytesIO(result)
     count_files = len(file)
 
     total_count = await respository_documents.update_documents_count(
         get_current_user.email, count_files, db
     )
+    metering.record(get_current_user.id, "documents", count_files)
 
     response_data = {
         "message": "Conversion successful",
@@ -61,29 +143,39 @@ async def convert_images_to_pdf_route(
     return StreamingResponse(
         pdf_data,
         media_type="application/pdf",
-        headers={f"Content-Disposition": "attachment; filename=converted_images.pdf"},
+        headers={
+            "Content-Disposition": "attachment; filename=converted_images.pdf",
+            **indicator_headers(response_data),
+        },
     )
 
 
 @router.post(
     "/compress_pdf",
-    description="No more than 10 requests per minute. Compression: lossless compression, remove images, remove duplication",
+    description="No more than 10 requests per minute. Compression: lossless compression, lossy compression, remove images, remove duplication",
     dependencies=[Depends(RateLimiter(times=10, seconds=60)), Depends(access_get)],
 )
 async def compress_pdf_route(
     compression: str = "lossless compression",
+    dpi: int = Query(150, ge=36, le=600),
+    quality: int = Query(75, ge=10, le=95),
     file: UploadFile | None = None,
     db: Session = Depends(get_db),
     get_current_user: User = Depends(auth_service.get_current_user),
 ):
     """
     The compress_pdf_route function is a route that allows the user to compress PDF files.
-    The function takes in an optional compression parameter, which can be one of three values:
+    The function takes in an optional compression parameter, which can be one of four values:
         - lossless compression (default)
+        - lossy compression (images are downsampled to dpi and re-encoded as JPEG)
         - remove images
         - remove duplication
+    The file sizes and the percentage reduction are returned in the X-Initial-File-Size,
+    X-Final-File-Size and X-Percentage-Reduction headers (in Mb and percent).
 
     :param compression: str: Determine the type of compression to be applied on the pdf file
+    :param dpi: int: Target resolution of embedded images for lossy compression
+    :param quality: int: JPEG quality of re-encoded images for lossy compression
     :param file: UploadFile | None: Receive the file sent by the user
     :param db: Session: Pass the database session to the function
     :param get_current_user: User: Get the current user's email
@@ -94,25 +186,34 @@ async def compress_pdf_route(
 
     if not file:
         return {"message": "No upload file sent"}
-    elif compression not in [
-        "lossless compression",
-        "remove images",
-        "remove duplication",
-    ]:
+    elif compression not in COMPRESSION_MODES:
         return {
             "message": "No supported compression quality. Choose the folowing \
-                        compression quality: lossless compression, remove images, remove duplication"
+                        compression quality: lossless compression, lossy compression, remove images, remove duplication"
         }
 
-    (
-        pdf_data,
-        initial_file_size,
-        final_file_size,
-        percentage_reduction,
-    ) = await pdf_utils.compress_pdf(file, compression)
+    options = compression_options(compression, dpi, quality)
+    await pdf_utils.check_valid_file(file, "pdf")
+    cache_key = cache.make_key("compress_pdf", [await cache.load_file(file)], options)
+    pdf_data = await cache.get_result(cache_key)
+    if pdf_data is None:
+        (
+            pdf_data,
+            initial_file_size,
+            final_file_size,
+            percentage_reduction,
+        ) = await pdf_utils.compress_pdf(file, **options)
+        await cache.put_result(cache_key, pdf_data)
+    else:
+        (
+            initial_file_size,
+            final_file_size,
+            percentage_reduction,
+        ) = await pdf_utils.operation_with_file_indicators(file, pdf_data)
     total_count = await respository_documents.update_documents_count(
         get_current_user.email, 1, db
     )
+    metering.record(get_current_user.id, "documents")
 
     response_data = {
         "message": "Conversion successful",
@@ -127,5 +228,175 @@ async def compress_pdf_route(
     return Response(
         pdf_data,
         media_type="application/pdf",
-        headers={f"Content-Disposition": "attachment; filename=compression.pdf"},
+        headers={
+            "Content-Disposition": "attachment; filename=compression.pdf",
+            **indicator_headers(response_data),
+        },
+    )
+
+
+@router.post(
+    "/jobs/convert_images_to_pdf",
+    response_model=DocumentJobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    description="No more than 10 requests per minute. The conversion runs in the background.",
+    dependencies=[Depends(RateLimiter(times=10, seconds=60)), Depends(access_get)],
+)
+async def submit_convert_images_to_pdf_job(
+    request: Request,
+    file: list[UploadFile],
+    get_current_user: User = Depends(auth_service.get_current_user),
+):
+    """
+    The submit_convert_images_to_pdf_job function puts a conversion of images
+    to a PDF file in the document queue and returns the job immediately.
+
+    :param request: Request: Build the url of the job result
+    :param file: list[UploadFile]: Accept a list of files
+    :param get_current_user: User: Get the current user's email address
+    :return: The queued job
+    :doc-author: Ihor Voitiuk
+    """
+    check_images_count(file)
+    for image in file:
+        await pdf_utils.check_valid_file(image, "image")
+
+    job_id = await jobs.submit_job(
+        "convert_images_to_pdf",
+        file,
+        {},
+        get_current_user.email,
+        get_current_user.id,
     )
+    return await get_document_job(request, job_id, get_current_user)
+
+
+@router.post(
+    "/jobs/compress_pdf",
+    response_model=DocumentJobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    description="No more than 10 requests per minute. The compression runs in the background. \
+        Compression: lossless compression, lossy compression, remove images, remove duplication",
+    dependencies=[Depends(RateLimiter(times=10, seconds=60)), Depends(access_get)],
+)
+async def submit_compress_pdf_job(
+    request: Request,
+    file: UploadFile,
+    compression: str = "lossless compression",
+    dpi: int = Query(150, ge=36, le=600),
+    quality: int = Query(75, ge=10, le=95),
+    get_current_user: User = Depends(auth_service.get_current_user),
+):
+    """
+    The submit_compress_pdf_job function puts a PDF compression in the document queue
+    and returns the job immediately. The options are the same as for compress_pdf_route.
+
+    :param request: Request: Build the url of the job result
+    :param file: UploadFile: Receive the file sent by the user
+    :param compression: str: Determine the type of compression to be applied on the pdf file
+    :param dpi: int: Target resolution of embedded images for lossy compression
+    :param quality: int: JPEG quality of re-encoded images for lossy compression
+    :param get_current_user: User: Get the current user's email
+    :return: The queued job
+    :doc-author: Ihor Voitiuk
+    """
+    if compression not in COMPRESSION_MODES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid compression option",
+        )
+    await pdf_utils.check_valid_file(file, "pdf")
+
+    options = compression_options(compression, dpi, quality)
+    job_id = await jobs.submit_job(
+        "compress_pdf", [file], options, get_current_user.email, get_current_user.id
+    )
+    return await get_document_job(request, job_id, get_current_user)
+
+
+@router.get(
+    "/jobs/{job_id}",
+    response_model=DocumentJobResponse,
+    dependencies=[Depends(access_get)],
+)
+async def get_document_job(
+    request: Request,
+    job_id: str,
+    get_current_user: User = Depends(auth_service.get_current_user),
+):
+    """
+    The get_document_job function returns the status and progress of a document job.
+    Once the job is done, result_url points to the resulting PDF.
+
+    :param request: Request: Build the url of the job result
+    :param job_id: str: The id of the job
+    :param get_current_user: User: Get the current user
+    :return: The job
+    :doc-author: Ihor Voitiuk
+    """
+    job = await jobs.get_job(job_id)
+    if job is None or job["user"] != get_current_user.email:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
+    if job["status"] == "done":
+        job["result_url"] = str(
+            request.url_for("get_document_job_result", job_id=job_id)
+        )
+    return job
+
+
+@router.get(
+    "/jobs/{job_id}/result",
+    dependencies=[Depends(access_get)],
+)
+async def get_document_job_result(
+    job_id: str,
+    get_current_user: User = Depends(auth_service.get_current_user),
+):
+    """
+    The get_document_job_result function downloads the PDF produced by a finished job.
+
+    :param job_id: str: The id of the job
+    :param get_current_user: User: Get the current user
+    :return: A response object
+    :doc-author: Ihor Voitiuk
+    """
+    job = await jobs.get_job(job_id)
+    if job is None or job["user"] != get_current_user.email:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
+
+    pdf_data = await jobs.get_job_result(job_id)
+    if pdf_data is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail=f"Job is {job['status']}"
+        )
+
+    response_data = {
+        key: job[key]
+        for key in ("initial_file_size", "final_file_size", "percentage_reduction")
+        if key in job
+    }
+    return Response(
+        pdf_data,
+        media_type="application/pdf",
+        headers={
+            "Content-Disposition": f"attachment; filename={job['kind']}.pdf",
+            **indicator_headers(response_data),
+        },
+    )
+
+
+@router.get(
+    "/cache",
+    response_model=DocumentCacheResponse,
+    description="Hit ratio and size of the document result cache.",
+    dependencies=[Depends(access_delete)],
+)
+async def get_document_cache_stats():
+    """
+    The get_document_cache_stats function returns the hit ratio and the size
+    of the document result cache.
+
+    :return: A dictionary with cache indicators
+    :doc-author: Ihor Voitiuk
+    """
+    return await cache.get_stats()
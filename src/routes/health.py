@@ -0,0 +1,32 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from src.services import health
+
+
+router = APIRouter(prefix="/health", tags=["health"])
+
+
+@router.get("/live")
+async def liveness():
+    """
+    The liveness function answers as long as the worker serves requests. It does no I/O.
+
+    :return: A dictionary with the status
+    :doc-author: Ihor Voitiuk
+    """
+    return {"status": "ok"}
+
+
+@router.get("/ready")
+async def readiness():
+    """
+    The readiness function returns the last result of the dependency probes,
+    which run in the background. It answers 503 while the worker is not ready.
+
+    :return: The status of the database, Redis, mail and SMS, the database pool,
+        the event loop lag and the email outbox depth
+    :doc-author: Ihor Voitiuk
+    """
+    result = health.readiness()
+    return JSONResponse(result, status_code=200 if result["ready"] else 503)
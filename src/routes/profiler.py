@@ -0,0 +1,63 @@
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, status
+from fastapi.responses import PlainTextResponse
+
+from src.database.models import Role
+from src.services import profiler
+from src.services.roles import RolesAccess
+
+
+router = APIRouter(prefix="/profiler", tags=["profiler"])
+
+access_profile = RolesAccess([Role.admin])
+
+
+@router.get(
+    "/",
+    response_class=PlainTextResponse,
+    description="Samples this worker and returns collapsed stacks for flamegraph.pl or speedscope.",
+    dependencies=[Depends(access_profile)],
+)
+async def profile_worker(
+    seconds: float = Query(10, gt=0, le=60),
+    interval_ms: float = Query(5, ge=1, le=100),
+):
+    """
+    The profile_worker function samples the stacks of all threads of the worker
+    that serves the request for a number of seconds.
+
+    :param seconds: float: Duration of the profile
+    :param interval_ms: float: Milliseconds between the samples
+    :return: The collapsed stacks
+    :doc-author: Ihor Voitiuk
+    """
+    stacks = await profiler.profile(seconds, interval_ms / 1000)
+    if stacks is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A profile is already running on this worker",
+        )
+    return PlainTextResponse(stacks)
+
+
+@router.get(
+    "/requests/{profile_id}",
+    response_class=PlainTextResponse,
+    description="Returns the profile of a request sent with the X-Profile header, \
+        by the X-Profile-ID of its response.",
+    dependencies=[Depends(access_profile)],
+)
+async def read_request_profile(profile_id: str = Path(max_length=64)):
+    """
+    The read_request_profile function returns the collapsed stacks of a profiled request.
+    Only the last profiles of the worker that served the request are kept.
+
+    :param profile_id: str: The X-Profile-ID of the response
+    :return: The collapsed stacks
+    :doc-author: Ihor Voitiuk
+    """
+    stacks = profiler.request_profiles.get(profile_id)
+    if stacks is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found"
+        )
+    return PlainTextResponse(stacks)
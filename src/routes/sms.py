@@ -1,3 +1,4 @@
+from datetime import date, datetime, time, timedelta
 from typing import List
 
 from fastapi import APIRouter, Depends, HTTPException, status, Path, Query
@@ -8,14 +9,42 @@ from src.database.db import get_db
 from src.database.models import User, Role
 from src.services.auth import auth_service
 from src.services.roles import RolesAccess
-from src.services.send_sms import send_sms
-from src.schemas import SendSMSModel, SendSMSResponse
+from src.services import metering, sms_outbox
+from src.schemas import (
+    SendSMSModel,
+    SendSMSResponse,
+    SMSBroadcastModel,
+    SMSBroadcastResponse,
+    SMSHistoryResponse,
+)
 from src.repository import sms as respository_sms
 
 
 router = APIRouter(prefix="/send_sms", tags=["send_sms"])
 
 access_post = RolesAccess([Role.admin, Role.moderator, Role.user])
+access_broadcast = RolesAccess([Role.admin, Role.moderator])
+
+
+def broadcast_response(broadcast, progress: dict):
+    """
+    The broadcast_response function builds the response of a broadcast from its message counts.
+
+    :param broadcast: The SMSBroadcast
+    :param progress: dict: Number of messages by status
+    :return: An SMSBroadcastResponse
+    :doc-author: Ihor Voitiuk
+    """
+    finished = progress.get("sent", 0) + progress.get("failed", 0)
+    return SMSBroadcastResponse(
+        id=broadcast.id,
+        message=broadcast.message,
+        from_phone=broadcast.from_phone,
+        total=broadcast.total,
+        created_at=broadcast.created_at,
+        progress=progress,
+        done=finished >= broadcast.total,
+    )
 
 
 @router.post(
@@ -32,7 +61,10 @@ async def create_sms(
     get_current_user: User = Depends(auth_service.get_current_user),
 ):
     """
-    The create_sms function creates a new sms in the database.
+    The create_sms function adds a new sms to the outbox and returns immediately.
+    One message of the global and of the user's daily quota is reserved in the same
+    transaction as the message, the message is sent by the dispatcher and the quota
+    is given back if it cannot be delivered.
 
     :param body: SendSMSModel: Get the data from the request body
     :param db: Session: Get the database session
@@ -41,7 +73,163 @@ async def create_sms(
     :return: A new sms object
     :doc-author: Ihor Voitiuk
     """
-    send_sms_message = await send_sms(body.message, body.from_phone, body.to_phone)
-    sms = await respository_sms.create_sms(body, get_current_user.email, db)
+    total_sms = await respository_sms.reserve_sms(get_current_user.id, db)
+    if isinstance(total_sms, str):
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=total_sms
+        )
+
+    try:
+        sms = await respository_sms.create_sms(
+            body, get_current_user.email, total_sms, db
+        )
+    except Exception:
+        db.rollback()
+        raise
+    if isinstance(sms, SendSMSResponse):
+        sms_outbox.notify()
+        metering.record(get_current_user.id, "sms")
 
     return sms
+
+
+def encode_cursor(message) -> str:
+    """
+    The encode_cursor function returns the cursor of the page after the given message.
+
+    :param message: The last message of a page
+    :return: str: The cursor
+    :doc-author: Ihor Voitiuk
+    """
+    return f"{message.created_at.isoformat()}_{message.id}"
+
+
+def decode_cursor(cursor: str):
+    """
+    The decode_cursor function returns the (created_at, id) encoded by encode_cursor.
+
+    :param cursor: str: The cursor
+    :return: A tuple of created_at and id
+    :doc-author: Ihor Voitiuk
+    """
+    try:
+        created_at, message_id = cursor.rsplit("_", 1)
+        return datetime.fromisoformat(created_at), int(message_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
+
+
+@router.get(
+    "/history",
+    response_model=SMSHistoryResponse,
+    description="No more than 10 requests per minute. Pass next_cursor \
+        of a page as cursor to get the next page.",
+    dependencies=[Depends(RateLimiter(times=10, seconds=60))],
+)
+async def get_sms_history(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str = Query(None),
+    date_from: date = Query(None),
+    date_to: date = Query(None),
+    db: Session = Depends(get_db),
+    get_current_user: User = Depends(auth_service.get_current_user),
+):
+    """
+    The get_sms_history function returns the current user's messages, newest first.
+
+    :param limit: int: Number of messages per page
+    :param cursor: str: The next_cursor of the previous page
+    :param date_from: date: First day of the range
+    :param date_to: date: Last day of the range
+    :param db: Session: Get the database session
+    :param get_current_user: User: Get the current user
+    :return: A page of messages and the cursor of the next page
+    :doc-author: Ihor Voitiuk
+    """
+    if date_from and date_to and date_from > date_to:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="date_from must not be after date_to",
+        )
+    before = decode_cursor(cursor) if cursor else None
+    messages = await respository_sms.get_sms_history(
+        get_current_user.id,
+        limit + 1,
+        datetime.combine(date_from, time.min) if date_from else None,
+        datetime.combine(date_to + timedelta(days=1), time.min) if date_to else None,
+        before,
+        db,
+    )
+    next_cursor = encode_cursor(messages[limit - 1]) if len(messages) > limit else None
+    return {"items": messages[:limit], "next_cursor": next_cursor}
+
+
+@router.post(
+    "/broadcast",
+    response_model=SMSBroadcastResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    description="Send one message to the selected contacts or to a segment, \
+        e.g. the contacts with a birthday next week.\n\
+            No more than 2 requests per minute.",
+    dependencies=[
+        Depends(access_broadcast),
+        Depends(RateLimiter(times=2, seconds=60)),
+    ],
+)
+async def create_broadcast(
+    body: SMSBroadcastModel,
+    db: Session = Depends(get_db),
+    get_current_user: User = Depends(auth_service.get_current_user),
+):
+    """
+    The create_broadcast function adds a message for every selected contact to the outbox
+    and returns immediately. The messages are sent by the dispatcher, the progress
+    is available at GET /send_sms/broadcast/{broadcast_id}.
+
+    :param body: SMSBroadcastModel: The message and the contacts to send it to
+    :param db: Session: Get the database session
+    :param get_current_user: User: Get the current user
+    :return: The created broadcast
+    :doc-author: Ihor Voitiuk
+    """
+    broadcast = await respository_sms.create_broadcast(body, get_current_user.id, db)
+    if broadcast == "No contacts found!":
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=broadcast)
+    if isinstance(broadcast, str):
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=broadcast
+        )
+
+    sms_outbox.notify()
+    metering.record(get_current_user.id, "sms", broadcast.total)
+    return broadcast_response(broadcast, {"queued": broadcast.total})
+
+
+@router.get(
+    "/broadcast/{broadcast_id}",
+    response_model=SMSBroadcastResponse,
+    dependencies=[Depends(access_broadcast)],
+)
+async def get_broadcast(
+    broadcast_id: int = Path(ge=1),
+    db: Session = Depends(get_db),
+    get_current_user: User = Depends(auth_service.get_current_user),
+):
+    """
+    The get_broadcast function returns the progress of a broadcast of the current user.
+
+    :param broadcast_id: int: The id of the broadcast
+    :param db: Session: Get the database session
+    :param get_current_user: User: Get the current user
+    :return: The broadcast with the number of messages by status
+    :doc-author: Ihor Voitiuk
+    """
+    result = await respository_sms.get_broadcast_progress(
+        broadcast_id, get_current_user.id, db
+    )
+    if result is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
+
+    return broadcast_response(*result)
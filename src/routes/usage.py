@@ -0,0 +1,50 @@
+from datetime import date, timedelta
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi_limiter.depends import RateLimiter
+from sqlalchemy.orm import Session
+
+from src.database.db import get_db
+from src.database.models import User
+from src.services.auth import auth_service
+from src.schemas import UsageResponse
+from src.repository import usage as repository_usage
+
+
+router = APIRouter(prefix="/usage", tags=["usage"])
+
+
+@router.get(
+    "/",
+    response_model=List[UsageResponse],
+    description="No more than 10 requests per minute. Usage is written every few seconds.",
+    dependencies=[Depends(RateLimiter(times=10, seconds=60))],
+)
+async def get_usage(
+    date_from: date = Query(None),
+    date_to: date = Query(None),
+    db: Session = Depends(get_db),
+    get_current_user: User = Depends(auth_service.get_current_user),
+):
+    """
+    The get_usage function returns the current user's documents and SMS usage per day.
+    Without a range the last 30 days are returned.
+
+    :param date_from: date: First day of the range
+    :param date_to: date: Last day of the range
+    :param db: Session: Get the database session
+    :param get_current_user: User: Get the current user
+    :return: A list of daily usage rows
+    :doc-author: Ihor Voitiuk
+    """
+    date_to = date_to or date.today()
+    date_from = date_from or date_to - timedelta(days=30)
+    if date_from > date_to:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="date_from must not be after date_to",
+        )
+    return await repository_usage.get_usage(
+        get_current_user.id, date_from, date_to, db
+    )
@@ -1,6 +1,7 @@
 from datetime import datetime, date
+from typing import Dict, List, Literal, Optional
 
-from pydantic import BaseModel, Field, EmailStr
+from pydantic import BaseModel, Field, EmailStr, root_validator
 
 
 class ContactModel(BaseModel):
@@ -79,10 +80,41 @@ class DocumentModel(BaseModel):
 class CompressionRequest(BaseModel):
     compression_quality: str = Field(
         "lossless compression",
-        description="Compression quality. Supported formats: lossless compression, remove images, remove duplication",
+        description="Compression quality. Supported formats: lossless compression, lossy compression, remove images, remove duplication",
     )
 
 
+class DocumentJobResponse(BaseModel):
+    job_id: str
+    kind: str
+    status: str
+    progress: int = 0
+    created_at: datetime
+    error: str | None = None
+    result_url: str | None = None
+    initial_file_size: float | None = None
+    final_file_size: float | None = None
+    percentage_reduction: int | None = None
+
+
+class DocumentCacheResponse(BaseModel):
+    hits: int
+    misses: int
+    hit_ratio: float
+    entries: int
+    size_bytes: int
+    max_bytes: int
+
+
+class UsageResponse(BaseModel):
+    day: date
+    kind: str
+    count: int
+
+    class Config:
+        orm_mode = True
+
+
 class SendSMSModel(BaseModel):
     message: str = Field(
         "Hello, thank you for using our application.\nGood day!",
@@ -98,11 +130,58 @@ class SendSMSResponse(SendSMSModel):
     created_at: datetime
     user_id: int
     total_sms: int
+    status: str = "queued"
 
     class Config:
         orm_mode = True
 
 
+class SMSHistoryItem(BaseModel):
+    id: int
+    message: Optional[str]
+    from_phone: str
+    to_phone: str
+    created_at: datetime
+    status: str
+    error: Optional[str]
+    broadcast_id: Optional[int]
+
+    class Config:
+        orm_mode = True
+
+
+class SMSHistoryResponse(BaseModel):
+    items: List[SMSHistoryItem]
+    next_cursor: Optional[str]
+
+
+class SMSBroadcastModel(BaseModel):
+    message: str = Field(
+        "Happy birthday! Best wishes from our application.",
+        min_length=2,
+        max_length=240,
+    )
+    from_phone: str = Field("+14302335529", min_length=2, max_length=20)
+    contact_ids: Optional[List[int]] = Field(None, min_items=1, max_items=1000)
+    segment: Optional[Literal["birthdays"]] = None
+
+    @root_validator(skip_on_failure=True)
+    def check_recipients(cls, values):
+        if (values.get("contact_ids") is None) == (values.get("segment") is None):
+            raise ValueError("Specify either contact_ids or segment")
+        return values
+
+
+class SMSBroadcastResponse(BaseModel):
+    id: int
+    message: str
+    from_phone: str
+    total: int
+    created_at: datetime
+    progress: Dict[str, int] = {}
+    done: bool = False
+
+
 class ContactForm(BaseModel):
     name: str
     email: EmailStr
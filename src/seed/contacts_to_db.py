@@ -8,28 +8,48 @@ session = DBSession()
 DEFAULT_CONTACTS = 50
 
 
-def create_contact_person(quantity):
+def fake_contact(user_id: int = None):
+    """
+    The fake_contact function creates a contact person with the following attributes:
+    first_name, last_name, email, phone_number, birthday and description.
+    Emails and phone numbers are unique among the contacts of one Faker instance.
+
+    :param user_id: int: The owner of the contact
+    :return: A Contact that is not added to a session
+    :doc-author: Ihor Voitiuk
+    """
+    return Contact(
+        first_name=fake.first_name(),
+        last_name=fake.last_name(),
+        email=fake.unique.ascii_free_email(),
+        phone_number=fake.unique.phone_number(),
+        birthday=fake.date_of_birth(),
+        description=fake.text(max_nb_chars=200),
+        user_id=user_id,
+    )
+
+
+def create_contact_person(quantity, seed: int = None, user_id: int = None, db=None):
     """
     The create_contact_person function creates a contact person with the following attributes:
     first_name, last_name, email, phone_number, birthday and description.
     The function takes one argument which is the quantity of contacts to be created.
+    With a seed the same contacts are created on every run, e.g. for benchmarks.
 
     :param quantity: Determine how many contact persons are created
+    :param seed: int: Seed of the generated data
+    :param user_id: int: The owner of the contacts
+    :param db: Session: The database session, the module session by default
     :return: None
     :doc-author: Ihor Voitiuk
     """
-    
+    if seed is not None:
+        fake.seed_instance(seed)
+        fake.unique.clear()
+    db = db or session
     for _ in range(quantity):
-        contact = Contact(
-            first_name=fake.first_name(),
-            last_name=fake.last_name(),
-            email=fake.ascii_free_email(),
-            phone_number=fake.phone_number(),
-            birthday=fake.date_of_birth(),
-            description=fake.text(),
-        )
-        session.add(contact)
-    session.commit()
+        db.add(fake_contact(user_id))
+    db.commit()
 
 
 if __name__ == "__main__":
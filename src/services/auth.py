@@ -1,3 +1,4 @@
+import logging
 import pickle
 
 from typing import Optional
@@ -13,6 +14,10 @@ from sqlalchemy.orm import Session
 from src.database.db import get_db
 from src.repository import users as repository_users
 from src.conf.config import settings
+from src.services import metrics
+
+
+logger = logging.getLogger(__name__)
 
 
 class Auth:
@@ -33,7 +38,9 @@ class Auth:
     SECRET_KEY = settings.secret_key_jwt
     ALGORITHM = settings.algorithm
     oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
-    redis = redis_db.Redis(host="localhost", port=6379, db=1)
+    redis = metrics.instrument_sync_redis(
+        redis_db.Redis(host="localhost", port=6379, db=1)
+    )
 
     def verify_password(self, plain_password, hashed_password):
         """
@@ -194,7 +201,7 @@ class Auth:
                 detail="Invalid scope for token",
             )
         except JWTError as error:
-            print(error)
+            logger.info("Invalid email verification token: %s", error)
             return HTTPException(
                 status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
                 detail="Invalid token for email verification",
@@ -233,14 +240,14 @@ class Auth:
 
         user = self.redis.get(f"user:{email}")
         if user is None:
-            print("GET USER FROM POSTGRES")
+            logger.debug("User %s loaded from postgres", email)
             user = await repository_users.get_user_by_email(email, db)
             if user is None:
                 raise credentials_exception
             self.redis.set(f"user:{email}", pickle.dumps(user))
             self.redis.expire(f"user:{email}", 900)
         else:
-            print("GET USER FROM CACHE")
+            logger.debug("User %s loaded from cache", email)
             user = pickle.loads(user)
         return user
 
@@ -0,0 +1,135 @@
+import io
+import json
+import time
+import asyncio
+import hashlib
+
+import redis.asyncio as redis
+
+from src.conf.config import settings
+from src.services import metrics
+
+
+ENTRY_KEY = "documents:cache:{}"
+LRU_KEY = "documents:cache:lru"
+SIZE_KEY = "documents:cache:size"
+HITS_KEY = "documents:cache:hits"
+MISSES_KEY = "documents:cache:misses"
+
+redis_client = metrics.instrument_redis(
+    redis.Redis(host=settings.redis_host, port=settings.redis_port, db=settings.redis_db)
+)
+
+
+async def load_file(file) -> str:
+    """
+    The load_file function reads an uploaded file into memory and calculates its
+    SHA-256 in the default executor. The file is read once: pdf_utils reads the
+    loaded content afterwards instead of the spooled upload.
+    Validate the file before, so invalid or too large uploads are not read.
+
+    :param file: The uploaded file
+    :return: The hex digest of the file content
+    :doc-author: Ihor Voitiuk
+    """
+    await file.seek(0)
+    content = await file.read()
+    await file.close()
+    file.file = io.BytesIO(content)
+    digest = await asyncio.get_event_loop().run_in_executor(
+        None, hashlib.sha256, content
+    )
+    return digest.hexdigest()
+
+
+def make_key(kind: str, digests: list, options: dict) -> str:
+    """
+    The make_key function builds the cache key of a document operation from the
+    digests of its input files, the kind of the operation and its options.
+
+    :param kind: str: Kind of the operation, convert_images_to_pdf or compress_pdf
+    :param digests: list: SHA-256 hex digests of the input files in order
+    :param options: dict: Options of the operation
+    :return: The cache key
+    :doc-author: Ihor Voitiuk
+    """
+    payload = json.dumps([kind, digests, options], sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+async def get_result(key: str) -> bytes | None:
+    """
+    The get_result function returns a cached result and marks it as recently used.
+    Every lookup is counted as a hit or a miss.
+
+    :param key: str: The cache key
+    :return: The cached PDF or None
+    :doc-author: Ihor Voitiuk
+    """
+    result = await redis_client.get(ENTRY_KEY.format(key))
+    pipe = redis_client.pipeline()
+    if result is None:
+        pipe.incr(MISSES_KEY)
+    else:
+        pipe.incr(HITS_KEY)
+        pipe.zadd(LRU_KEY, {key: time.time()}, xx=True)
+    await pipe.execute()
+    return result
+
+
+async def put_result(key: str, data: bytes):
+    """
+    The put_result function stores a result in the cache and evicts the least recently
+    used entries while the cache is larger than document_cache_max_bytes.
+
+    :param key: str: The cache key
+    :param data: bytes: The resulting PDF
+    :return: None
+    :doc-author: Ihor Voitiuk
+    """
+    if len(data) > settings.document_cache_max_bytes:
+        return
+
+    pipe = redis_client.pipeline()
+    pipe.set(ENTRY_KEY.format(key), data, nx=True)
+    pipe.zadd(LRU_KEY, {key: time.time()})
+    created, _ = await pipe.execute()
+    if not created:
+        return
+
+    size = await redis_client.incrby(SIZE_KEY, len(data))
+    while size > settings.document_cache_max_bytes:
+        oldest = await redis_client.zpopmin(LRU_KEY)
+        if not oldest:
+            break
+        entry_key = ENTRY_KEY.format(oldest[0][0].decode())
+        pipe = redis_client.pipeline()
+        pipe.strlen(entry_key)
+        pipe.delete(entry_key)
+        entry_size, _ = await pipe.execute()
+        size = await redis_client.decrby(SIZE_KEY, entry_size)
+
+
+async def get_stats() -> dict:
+    """
+    The get_stats function returns the hit ratio and the size of the cache.
+
+    :return: A dictionary with cache indicators
+    :doc-author: Ihor Voitiuk
+    """
+    pipe = redis_client.pipeline()
+    pipe.get(HITS_KEY)
+    pipe.get(MISSES_KEY)
+    pipe.zcard(LRU_KEY)
+    pipe.get(SIZE_KEY)
+    hits, misses, entries, size = await pipe.execute()
+
+    hits, misses = int(hits or 0), int(misses or 0)
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+        "entries": entries,
+        "size_bytes": int(size or 0),
+        "max_bytes": settings.document_cache_max_bytes,
+    }
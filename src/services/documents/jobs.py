@@ -0,0 +1,415 @@
+import io
+import json
+import logging
+import uuid
+import asyncio
+import hashlib
+
+from datetime import datetime
+from time import perf_counter
+
+import redis.asyncio as redis
+from fastapi import HTTPException, status
+from redis.exceptions import RedisError
+from starlette.datastructures import Headers, UploadFile
+
+from src.conf.config import settings
+from src.database.db import DBSession
+from src.repository import documents as repository_documents
+from src.services import metering, metrics
+from src.services.documents import cache, pdf_utils
+
+
+QUEUE_KEY = "documents:jobs:queue"
+PROCESSING_KEY = "documents:jobs:processing:{}"
+WORKERS_KEY = "documents:jobs:workers"
+WORKER_KEY = "documents:jobs:workers:{}"
+JOB_KEY = "documents:jobs:{}"
+INPUT_KEY = "documents:jobs:{}:input"
+RESULT_KEY = "documents:jobs:{}:result"
+
+logger = logging.getLogger(__name__)
+
+redis_client = metrics.instrument_redis(
+    redis.Redis(host=settings.redis_host, port=settings.redis_port, db=settings.redis_db)
+)
+workers = []
+
+
+def queue_full_error() -> HTTPException:
+    """
+    The queue_full_error function returns the error of a job that does not fit
+    in the queue.
+
+    :return: HTTPException: 429 with a Retry-After header
+    :doc-author: Ihor Voitiuk
+    """
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too many documents in the queue, try again later",
+        headers={"Retry-After": "30"},
+    )
+
+
+async def submit_job(
+    kind: str, files: list, options: dict, user_email: str, user_id: int
+) -> str:
+    """
+    The submit_job function stores the uploaded files in Redis and puts a new job
+    in the queue. When the queue already holds document_jobs_queue_size jobs
+    the client is asked to retry later before the files are stored. Jobs that
+    are queued concurrently past the limit are withdrawn after the push.
+
+    :param kind: str: Kind of the job, convert_images_to_pdf or compress_pdf
+    :param files: list: The uploaded files
+    :param options: dict: Options passed to the pdf_utils function
+    :param user_email: str: Email of the user who submitted the job
+    :param user_id: int: Id of the user who submitted the job
+    :return: The id of the job
+    :doc-author: Ihor Voitiuk
+    """
+    job_id = uuid.uuid4().hex
+    job_key = JOB_KEY.format(job_id)
+    input_key = INPUT_KEY.format(job_id)
+    ttl = settings.document_jobs_ttl
+
+    if await redis_client.llen(QUEUE_KEY) >= settings.document_jobs_queue_size:
+        raise queue_full_error()
+
+    contents = [await file.read() for file in files]
+    digests = [hashlib.sha256(content).hexdigest() for content in contents]
+
+    pipe = redis_client.pipeline()
+    pipe.hset(
+        job_key,
+        mapping={
+            "kind": kind,
+            "status": "queued",
+            "progress": 0,
+            "user": user_email,
+            "user_id": user_id,
+            "options": json.dumps(options),
+            "files": json.dumps([[f.filename, f.content_type] for f in files]),
+            "cache_key": cache.make_key(kind, digests, options),
+            "created_at": datetime.utcnow().isoformat(),
+        },
+    )
+    for index, content in enumerate(contents):
+        pipe.hset(input_key, str(index), content)
+    pipe.expire(job_key, ttl)
+    pipe.expire(input_key, ttl)
+    await pipe.execute()
+
+    queue_length = await redis_client.rpush(QUEUE_KEY, job_id)
+    if queue_length > settings.document_jobs_queue_size:
+        await redis_client.lrem(QUEUE_KEY, 1, job_id)
+        await redis_client.delete(job_key, input_key)
+        raise queue_full_error()
+    return job_id
+
+
+async def get_job(job_id: str) -> dict | None:
+    """
+    The get_job function returns the status of a job or None if the job
+    does not exist or has already expired.
+
+    :param job_id: str: The id of the job
+    :return: A dictionary with the job fields
+    :doc-author: Ihor Voitiuk
+    """
+    job = await redis_client.hgetall(JOB_KEY.format(job_id))
+    if not job:
+        return None
+    job = {key.decode(): value.decode() for key, value in job.items()}
+    job["job_id"] = job_id
+    job["progress"] = int(job["progress"])
+    return job
+
+
+async def get_job_result(job_id: str) -> bytes | None:
+    """
+    The get_job_result function returns the PDF produced by a finished job.
+
+    :param job_id: str: The id of the job
+    :return: The resulting PDF or None if it is not ready or expired
+    :doc-author: Ihor Voitiuk
+    """
+    return await redis_client.get(RESULT_KEY.format(job_id))
+
+
+def run_job(kind: str, uploads: list, options: dict):
+    """
+    The run_job function runs the pdf_utils coroutine of a job in its own event loop,
+    so it can be called from an executor thread without blocking the server loop.
+
+    :param kind: str: Kind of the job
+    :param uploads: list: The files of the job
+    :param options: dict: Options passed to the pdf_utils function
+    :return: A tuple of the resulting PDF and a dictionary with file indicators
+    :doc-author: Ihor Voitiuk
+    """
+    if kind == "convert_images_to_pdf":
+        output_stream = asyncio.run(pdf_utils.convert_images_to_pdf(uploads))
+        return output_stream.getvalue(), {}
+
+    (
+        pdf_data,
+        initial_file_size,
+        final_file_size,
+        percentage_reduction,
+    ) = asyncio.run(pdf_utils.compress_pdf(uploads[0], **options))
+    return pdf_data, {
+        "initial_file_size": initial_file_size,
+        "final_file_size": final_file_size,
+        "percentage_reduction": percentage_reduction,
+    }
+
+
+async def fail_job(job_id: str, error: str):
+    """
+    The fail_job function marks a job as failed and deletes its files.
+
+    :param job_id: str: The id of the job
+    :param error: str: The error shown to the client
+    :return: None
+    :doc-author: Ihor Voitiuk
+    """
+    pipe = redis_client.pipeline()
+    pipe.hset(
+        JOB_KEY.format(job_id),
+        mapping={"status": "failed", "progress": 100, "error": error},
+    )
+    pipe.delete(INPUT_KEY.format(job_id))
+    await pipe.execute()
+
+
+async def process_job(job_id: str):
+    """
+    The process_job function loads a queued job from Redis, runs it in the default
+    executor and stores the result with the same time to live as the job.
+    Results of identical jobs are taken from the document cache instead.
+    The user's documents count is updated once the job has succeeded.
+    A job that was started document_jobs_max_attempts times by workers that
+    stopped fails. The files of the job are kept when the worker is cancelled,
+    so the recovered job can run again.
+
+    :param job_id: str: The id of the job
+    :return: None
+    :doc-author: Ihor Voitiuk
+    """
+    job = await get_job(job_id)
+    if job is None or job["status"] not in ("queued", "processing"):
+        return
+
+    started = perf_counter()
+    job_key = JOB_KEY.format(job_id)
+    input_key = INPUT_KEY.format(job_id)
+    attempts = await redis_client.hincrby(job_key, "attempts", 1)
+    if attempts > settings.document_jobs_max_attempts:
+        logger.error("Document job %s failed, its workers stopped", job_id)
+        await fail_job(job_id, "The job was interrupted, submit the document again")
+        return
+    await redis_client.hset(job_key, mapping={"status": "processing", "progress": 10})
+
+    inputs = await redis_client.hgetall(input_key)
+    files = json.loads(job["files"])
+    if len(inputs) != len(files):
+        await fail_job(job_id, "The files of the job have expired")
+        return
+    uploads = [
+        UploadFile(
+            file=io.BytesIO(inputs[str(index).encode()]),
+            size=len(inputs[str(index).encode()]),
+            filename=filename,
+            headers=Headers({"content-type": content_type or ""}),
+        )
+        for index, (filename, content_type) in enumerate(files)
+    ]
+
+    loop = asyncio.get_event_loop()
+    job_status = "cached"
+    try:
+        result = await cache.get_result(job["cache_key"])
+        if result is None:
+            job_status = "done"
+            result, indicators = await loop.run_in_executor(
+                None, run_job, job["kind"], uploads, json.loads(job["options"])
+            )
+            await cache.put_result(job["cache_key"], result)
+        elif job["kind"] == "compress_pdf":
+            (
+                initial_file_size,
+                final_file_size,
+                percentage_reduction,
+            ) = await pdf_utils.operation_with_file_indicators(uploads[0], result)
+            indicators = {
+                "initial_file_size": initial_file_size,
+                "final_file_size": final_file_size,
+                "percentage_reduction": percentage_reduction,
+            }
+        else:
+            indicators = {}
+    except HTTPException as err:
+        await fail_job(job_id, err.detail)
+        metrics.document_job_duration.observe(
+            perf_counter() - started, job["kind"], "failed"
+        )
+        return
+    except Exception as err:
+        await fail_job(job_id, str(err))
+        metrics.document_job_duration.observe(
+            perf_counter() - started, job["kind"], "failed"
+        )
+        return
+
+    pipe = redis_client.pipeline()
+    pipe.delete(input_key)
+    pipe.set(RESULT_KEY.format(job_id), result, ex=settings.document_jobs_ttl)
+    pipe.hset(
+        job_key,
+        mapping={"status": "done", "progress": 100, **indicators},
+    )
+    await pipe.execute()
+    metrics.document_job_duration.observe(
+        perf_counter() - started, job["kind"], job_status
+    )
+
+    db = DBSession()
+    try:
+        await repository_documents.update_documents_count(
+            job["user"], len(uploads), db
+        )
+    finally:
+        db.close()
+    metering.record(int(job["user_id"]), "documents", len(uploads))
+
+
+async def recover_jobs():
+    """
+    The recover_jobs function returns to the queue the jobs of workers that stopped.
+    Every worker takes jobs into its own processing list and keeps a lease that
+    expires document_jobs_lease seconds after its last heartbeat. The jobs of a
+    worker whose lease has expired are moved back one by one, so each of them is
+    recovered once even when several workers recover at the same time.
+
+    :return: None
+    :doc-author: Ihor Voitiuk
+    """
+    for worker_id in await redis_client.smembers(WORKERS_KEY):
+        worker_id = worker_id.decode()
+        if await redis_client.exists(WORKER_KEY.format(worker_id)):
+            continue
+        processing_key = PROCESSING_KEY.format(worker_id)
+        while job_id := await redis_client.lmove(
+            processing_key, QUEUE_KEY, src="RIGHT", dest="LEFT"
+        ):
+            job_id = job_id.decode()
+            logger.warning("Document job %s is queued again, its worker stopped", job_id)
+            job = await get_job(job_id)
+            if job is not None and job["status"] == "processing":
+                await redis_client.hset(
+                    JOB_KEY.format(job_id), mapping={"status": "queued", "progress": 0}
+                )
+        await redis_client.srem(WORKERS_KEY, worker_id)
+
+
+async def keep_alive(worker_id: str):
+    """
+    The keep_alive function renews the lease of a worker three times per
+    document_jobs_lease, also while the worker processes a long job.
+
+    :param worker_id: str: The id of the worker
+    :return: None
+    :doc-author: Ihor Voitiuk
+    """
+    while True:
+        await asyncio.sleep(settings.document_jobs_lease / 3)
+        try:
+            await redis_client.set(
+                WORKER_KEY.format(worker_id), 1, ex=settings.document_jobs_lease
+            )
+        except RedisError as err:
+            logger.warning("Document worker lease is not renewed: %s", err)
+
+
+async def run_worker():
+    """
+    The run_worker function takes jobs from the queue one by one and processes them.
+    A taken job stays in the processing list of the worker until it is finished,
+    so the job of a worker that stopped is recovered once its lease expires.
+    A cancelled worker releases its lease, so its job is recovered at once.
+    Stopped workers are looked for whenever the queue is idle.
+
+    :return: None
+    :doc-author: Ihor Voitiuk
+    """
+    worker_id = uuid.uuid4().hex
+    processing_key = PROCESSING_KEY.format(worker_id)
+    await redis_client.set(
+        WORKER_KEY.format(worker_id), 1, ex=settings.document_jobs_lease
+    )
+    await redis_client.sadd(WORKERS_KEY, worker_id)
+    heartbeat = asyncio.create_task(keep_alive(worker_id))
+    try:
+        while True:
+            job_id = await redis_client.blmove(
+                QUEUE_KEY, processing_key, 5, src="LEFT", dest="RIGHT"
+            )
+            if job_id is None:
+                try:
+                    await recover_jobs()
+                except Exception as err:
+                    logger.exception("Document job recovery failed: %s", err)
+                continue
+            job_id = job_id.decode()
+            try:
+                await process_job(job_id)
+            except Exception as err:
+                logger.exception("Document job failed: %s", err)
+            # A cancelled worker leaves the job in its list, so it is recovered
+            await redis_client.lrem(processing_key, 1, job_id)
+    finally:
+        heartbeat.cancel()
+        try:
+            await redis_client.delete(WORKER_KEY.format(worker_id))
+        except RedisError as err:
+            logger.warning("Document worker lease is not released: %s", err)
+
+
+async def start_workers(count: int = settings.document_jobs_workers):
+    """
+    The start_workers function recovers the jobs of stopped workers and starts
+    the worker pool on the current event loop.
+
+    :param count: int: Number of workers
+    :return: None
+    :doc-author: Ihor Voitiuk
+    """
+    try:
+        await recover_jobs()
+    except Exception as err:
+        logger.exception("Document job recovery failed: %s", err)
+    for _ in range(count):
+        workers.append(asyncio.create_task(run_worker()))
+
+
+async def stop_workers():
+    """
+    The stop_workers function cancels the running workers.
+
+    :return: None
+    :doc-author: Ihor Voitiuk
+    """
+    for worker in workers:
+        worker.cancel()
+    await asyncio.gather(*workers, return_exceptions=True)
+    workers.clear()
+
+
+async def main():
+    await start_workers()
+    await asyncio.gather(*workers)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
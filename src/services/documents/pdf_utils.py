@@ -1,6 +1,4 @@
 import io
-import os
-import shutil
 import tempfile
 import asyncio
 
@@ -9,38 +7,25 @@ from typing import Tuple
 from fastapi import HTTPException
 from PIL import Image
 from PyPDF2 import PdfReader, PdfWriter
+from PyPDF2.generic import NameObject, NumberObject
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.utils import ImageReader
 from reportlab.pdfgen import canvas
 
 
-async def copy_file(file):
-    """
-    The copy_file function takes a file object and copies it to the uploads directory.
-    It returns the path of the copied file.
-
-    :param file: Get the file object from the request
-    :return: The path of the file that was copied
-    :doc-author: Ihor Voitiuk
-    """
-
-    upload_dir = os.path.join(os.getcwd(), "uploads")
-    if not os.path.exists(upload_dir):
-        os.makedirs(upload_dir)
-
-    dest = os.path.join(upload_dir, file.filename)
-
-    with open(dest, "wb") as buffer:
-        await asyncio.get_event_loop().run_in_executor(
-            None, shutil.copyfileobj, file.file, buffer
-        )
-
-    return dest
+MAX_IMAGE_SIZE = 8 * 1024 * 1024  # 8 MB
+MAX_PDF_SIZE = 15 * 1024 * 1024  # 15 MB
+FILE_SIGNATURES = {
+    "image": (b"\xff\xd8\xff", b"\x89PNG\r\n\x1a\n", b"GIF87a", b"GIF89a"),
+    "pdf": (b"%PDF-",),
+}
 
 
 async def check_valid_file(file, file_type):
     """
     The check_valid_file function checks the file size and content type of a given file.
+    The size is the one counted while the upload was streamed and the type is sniffed
+    from the first bytes of the file instead of the content type sent by the client.
 
     :param file: Check the file type and size
     :param file_type: Check the file type and the size of the file
@@ -48,27 +33,21 @@ async def check_valid_file(file, file_type):
     :doc-author: Ihor Voitiuk
     """
 
-    file.file.seek(0, 2)
-    file_size = file.file.tell()
+    file_size = file.size
+    if file_size is None:
+        file.file.seek(0, 2)
+        file_size = file.file.tell()
 
     await file.seek(0)
+    header = await file.read(8)
+    await file.seek(0)
 
-    content_type = file.content_type
-
-    if file_type == "image":
-        if file_size > 8 * 1024 * 1024:
-            # more than 8 MB
-            raise HTTPException(status_code=400, detail="File too large")
-
-        if content_type not in ["image/jpeg", "image/png", "image/gif"]:
-            raise HTTPException(status_code=400, detail="Invalid file type")
-    elif file_type == "pdf":
-        if file_size > 15 * 1024 * 1024:
-            # more than 15 MB
-            raise HTTPException(status_code=400, detail="File too large")
+    max_size = MAX_IMAGE_SIZE if file_type == "image" else MAX_PDF_SIZE
+    if file_size > max_size:
+        raise HTTPException(status_code=413, detail="File too large")
 
-        if content_type not in ["application/pdf"]:
-            raise HTTPException(status_code=400, detail="Invalid file type")
+    if not header.startswith(FILE_SIGNATURES[file_type]):
+        raise HTTPException(status_code=400, detail="Invalid file type")
 
 
 async def operation_with_file_indicators(file, output_file) -> Tuple[int, int, float]:
@@ -76,20 +55,21 @@ async def operation_with_file_indicators(file, output_file) -> Tuple[int, int, f
     The operation_with_file_indicators function is a helper function 
     that calculates the initial and final file sizes of
     the PDF, as well as the percentage reduction. It returns a 
-    tuple containing these values.
+    tuple containing these values. The initial size is the one counted
+    while the upload was streamed, so the file is not scanned again.
     
     :param file: Read the file and get its size
     :param output_file: Pass the output file to the function
     :return: A tuple of three values:
     :doc-author: Ihor Voitiuk
     """
-    initial_pdf_size = 0
-    initial_pdf_size_mb = 0
+    initial_pdf_size = file.size or 0
 
-    if file.file.seekable():
+    if file.size is None and file.file.seekable():
         file.file.seek(0, 2)  # Move the file pointer to the end
         initial_pdf_size = file.file.tell()  # Get the current position, which represents the file size
-        initial_pdf_size_mb = initial_pdf_size / 1048576  # Convert to megabytes
+
+    initial_pdf_size_mb = initial_pdf_size / 1048576  # Convert to megabytes
 
     # Calculate the final file size
     final_file_size = len(output_file)
@@ -130,8 +110,7 @@ async def convert_images_to_pdf(images):
 async def process_image(image, canvas):
     """
     The process_image function takes an image and a canvas as arguments.
-    It then checks to see if the file is valid, copies it to a temporary location,
-    and opens it with PIL. It then calculates the ratio of the image's width and height
+    It then checks to see if the file is valid and opens the uploaded file with PIL. It then calculates the ratio of the image's width and height
     to that of letter size paper (8.5&quot; x 11&quot;). If the image's ratio is greater than that
     of letter size paper, we set new_width equal to pdf_width (8.5&quot;) and calculate new_height
     based on this value; otherwise we set new_height equal to pdf_height (11&quot;) and calculate
@@ -143,8 +122,7 @@ async def process_image(image, canvas):
     :doc-author: Ihor Voitiuk
     """
     await check_valid_file(image, "image")
-    image_path = await copy_file(image)
-    img = Image.open(image_path)
+    img = Image.open(image.file)
 
     width, height = img.size
     pdf_width, pdf_height = letter
@@ -167,11 +145,10 @@ async def process_image(image, canvas):
 
         canvas.drawImage(ImageReader(file_name), 0, 0, pdf_width, pdf_height)
 
-    os.remove(image_path)
     canvas.showPage()
 
 
-async def compress_pdf(file, compression):
+async def compress_pdf(file, compression, dpi=150, quality=75):
     """
     The compress_pdf function takes in a file and a compression option.
     It then checks if the file is valid, and if it is not,
@@ -185,6 +162,8 @@ async def compress_pdf(file, compression):
 
     :param file: Pass the file object to the function
     :param compression: Determine which compression method to use
+    :param dpi: Target resolution of embedded images for lossy compression
+    :param quality: JPEG quality of re-encoded images for lossy compression
     :return: A file object
     :doc-author: Ihor Voitiuk
     """
@@ -196,6 +175,8 @@ async def compress_pdf(file, compression):
         result = await remove_images(file)
     elif compression == "lossless compression":
         result = await apply_lossless_compression(file)
+    elif compression == "lossy compression":
+        result = await apply_lossy_compression(file, dpi, quality)
     else:
         raise HTTPException(status_code=400, detail="Invalid compression option")
 
@@ -214,7 +195,8 @@ async def remove_duplication(file):
     but without duplicated pages
     :doc-author: Ihor Voitiuk
     """
-    input_pdf = io.BytesIO(await file.read())
+    await file.seek(0)
+    input_pdf = file.file
     output_pdf = io.BytesIO()
 
     pdf = PdfReader(input_pdf)
@@ -239,7 +221,8 @@ async def remove_images(file):
     :return: The pdf file without the images
     :doc-author: Ihor Voitiuk
     """
-    input_pdf = io.BytesIO(await file.read())
+    await file.seek(0)
+    input_pdf = file.file
     output_pdf = io.BytesIO()
 
     pdf = PdfReader(input_pdf)
@@ -265,7 +248,8 @@ async def apply_lossless_compression(file):
     :return: A bytestring
     :doc-author: Ihor Voitiuk
     """
-    input_pdf = io.BytesIO(await file.read())
+    await file.seek(0)
+    input_pdf = file.file
     output_pdf = io.BytesIO()
 
     pdf = PdfReader(input_pdf)
@@ -279,3 +263,147 @@ async def apply_lossless_compression(file):
     output_pdf.seek(0)
 
     return output_pdf.getvalue()
+
+
+# Stream filters PyPDF2 can decode into raw samples on its own
+DECODABLE_IMAGE_FILTERS = (
+    "/FlateDecode",
+    "/LZWDecode",
+    "/ASCII85Decode",
+    "/ASCIIHexDecode",
+    "/RunLengthDecode",
+)
+IMAGE_MODES = {"/DeviceRGB": "RGB", "/DeviceGray": "L"}
+
+
+def decode_pdf_image(x_object):
+    """
+    The decode_pdf_image function turns an image XObject into a PIL image.
+    Only 8-bit RGB and grayscale images stored as JPEG or with lossless
+    stream filters are supported; masks, indexed and CMYK images are left
+    untouched, so the function returns None for them.
+
+    :param x_object: The image XObject from the page resources
+    :return: A PIL image or None if the image can not be recompressed
+    :doc-author: Ihor Voitiuk
+    """
+    if x_object.get("/ImageMask") or "/SMask" in x_object or "/Mask" in x_object:
+        return None
+
+    filters = x_object.get("/Filter", [])
+    if not isinstance(filters, list):
+        filters = [filters]
+
+    if filters == ["/DCTDecode"]:
+        img = Image.open(io.BytesIO(x_object._data))
+        return img if img.mode in ("RGB", "L") else None
+
+    mode = IMAGE_MODES.get(x_object.get("/ColorSpace"))
+    if (
+        mode is None
+        or x_object.get("/BitsPerComponent") != 8
+        or any(name not in DECODABLE_IMAGE_FILTERS for name in filters)
+    ):
+        return None
+
+    size = (x_object["/Width"], x_object["/Height"])
+    return Image.frombytes(mode, size, x_object.get_data())
+
+
+def recompress_image(x_object, page_size_inch, dpi, quality):
+    """
+    The recompress_image function downsamples an embedded image to the target DPI
+    and re-encodes it as JPEG in place. The effective resolution is measured
+    against the page size, which is exact for full-page scans and conservative
+    for smaller images. The new stream is kept only when it is smaller.
+
+    :param x_object: The image XObject from the page resources
+    :param page_size_inch: The width and height of the page in inches
+    :param dpi: Target resolution of the image
+    :param quality: JPEG quality of the re-encoded image
+    :return: The number of bytes saved
+    :doc-author: Ihor Voitiuk
+    """
+    img = decode_pdf_image(x_object)
+    if img is None:
+        return 0
+
+    width, height = img.size
+    page_width, page_height = page_size_inch
+    scale = min(1.0, dpi / max(width / page_width, height / page_height))
+    if scale < 1.0:
+        new_size = (max(1, int(width * scale)), max(1, int(height * scale)))
+        img = img.resize(new_size, Image.LANCZOS)
+
+    output = io.BytesIO()
+    img.save(output, format="JPEG", quality=quality, optimize=True)
+    data = output.getvalue()
+
+    initial_size = len(x_object._data)
+    if len(data) >= initial_size:
+        return 0
+
+    x_object._data = data
+    x_object.decoded_self = None
+    x_object[NameObject("/Filter")] = NameObject("/DCTDecode")
+    x_object[NameObject("/Width")] = NumberObject(img.size[0])
+    x_object[NameObject("/Height")] = NumberObject(img.size[1])
+    x_object[NameObject("/ColorSpace")] = NameObject(
+        "/DeviceRGB" if img.mode == "RGB" else "/DeviceGray"
+    )
+    x_object[NameObject("/BitsPerComponent")] = NumberObject(8)
+    x_object.pop("/DecodeParms", None)
+    return initial_size - len(data)
+
+
+async def apply_lossy_compression(file, dpi=150, quality=75):
+    """
+    The apply_lossy_compression function takes a file object and returns
+    the same file with embedded images downsampled to the target DPI and
+    re-encoded as JPEG. Images are processed in parallel in the default executor.
+
+    :param file: Read the file and convert it to a byte stream
+    :param dpi: Target resolution of embedded images
+    :param quality: JPEG quality of re-encoded images
+    :return: A bytestring
+    :doc-author: Ihor Voitiuk
+    """
+    await file.seek(0)
+    input_pdf = file.file
+    output_pdf = io.BytesIO()
+
+    pdf = PdfReader(input_pdf)
+    writer = PdfWriter()
+    loop = asyncio.get_event_loop()
+
+    tasks = []
+    seen = set()
+    for page in pdf.pages:
+        resources = page.get("/Resources")
+        x_objects = resources.get("/XObject") if resources else None
+        if x_objects is not None:
+            page_size_inch = (
+                float(page.mediabox.width) / 72,
+                float(page.mediabox.height) / 72,
+            )
+            for x_object in x_objects.get_object().values():
+                x_object = x_object.get_object()
+                if x_object.get("/Subtype") != "/Image" or id(x_object) in seen:
+                    continue
+                seen.add(id(x_object))
+                tasks.append(
+                    loop.run_in_executor(
+                        None, recompress_image, x_object, page_size_inch, dpi, quality
+                    )
+                )
+
+    await asyncio.gather(*tasks)
+
+    for page in pdf.pages:
+        page.compress_content_streams()
+        writer.add_page(page)
+
+    writer.write(output_pdf)
+    output_pdf.seek(0)
+
+    return output_pdf.getvalue()
@@ -0,0 +1,70 @@
+from fastapi import HTTPException, status
+from starlette.responses import JSONResponse
+
+
+class UploadLimitMiddleware:
+    """
+    ASGI middleware that limits the size of request bodies sent to the given paths.
+    A request whose Content-Length is over the limit is rejected with 413 before
+    its body is received, a malformed Content-Length with 400. Otherwise the body is counted while it is streamed,
+    so chunked uploads are stopped as soon as they cross the limit.
+
+    Attributes:
+    - app (ASGIApp): The wrapped application.
+    - limits (dict): Maximum body size in bytes by path.
+    :doc-author: Ihor Voitiuk
+    """
+
+    def __init__(self, app, limits: dict):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        """
+        The __call__ function checks the Content-Length header and wraps receive
+        with a running byte count for the limited paths.
+
+        :param self: Represent the instance of the class
+        :param scope: The ASGI connection scope
+        :param receive: The ASGI receive channel
+        :param send: The ASGI send channel
+        :return: None
+        :doc-author: Ihor Voitiuk
+        """
+        if scope["type"] != "http" or scope["path"] not in self.limits:
+            await self.app(scope, receive, send)
+            return
+
+        max_size = self.limits[scope["path"]]
+        headers = dict(scope["headers"])
+        content_length = headers.get(b"content-length")
+        response = None
+        if content_length is not None and not content_length.strip().isdigit():
+            response = JSONResponse(
+                {"detail": "Invalid Content-Length header"},
+                status_code=status.HTTP_400_BAD_REQUEST,
+            )
+        elif content_length is not None and int(content_length) > max_size:
+            response = JSONResponse(
+                {"detail": "File too large"},
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            )
+        if response is not None:
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_size:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail="File too large",
+                    )
+            return message
+
+        await self.app(scope, limited_receive, send)
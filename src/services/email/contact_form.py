@@ -0,0 +1,150 @@
+import hashlib
+import logging
+
+import redis.asyncio as redis
+from fastapi import HTTPException, Request, status
+from redis.exceptions import RedisError
+
+from src.conf.config import settings
+from src.services import metrics
+from src.services.email import outbox
+
+
+THROTTLE_KEY = "contact_form:throttle:{}:{}"
+DUPLICATE_KEY = "contact_form:duplicate:{}"
+
+logger = logging.getLogger(__name__)
+
+redis_client = metrics.instrument_redis(
+    redis.Redis(host=settings.redis_host, port=settings.redis_port, db=settings.redis_db)
+)
+
+
+def client_ip(request: Request) -> str:
+    """
+    The client_ip function returns the address of the client. X-Forwarded-For is
+    only read when the request comes from one of the trusted_proxies, then the last
+    address that is not a trusted proxy is the client, as clients can prepend any
+    address to the header.
+
+    :param request: Request: The current request
+    :return: str: The client address
+    :doc-author: Ihor Voitiuk
+    """
+    host = request.client.host if request.client else "unknown"
+    trusted = {proxy.strip() for proxy in settings.trusted_proxies.split(",")}
+    forwarded = request.headers.get("X-Forwarded-For")
+    if host not in trusted or not forwarded:
+        return host
+    for address in reversed(forwarded.split(",")):
+        address = address.strip()
+        if address and address not in trusted:
+            return address
+    return host
+
+
+def message_digest(email: str, name: str, phone: str, message: str) -> str:
+    """
+    The message_digest function returns the hash of a normalized submission,
+    so resubmissions of the same message get the same digest.
+
+    :param email: str: The email of the sender
+    :param name: str: The name of the sender
+    :param phone: str: The phone of the sender
+    :param message: str: The message
+    :return: str: A sha256 hex digest
+    :doc-author: Ihor Voitiuk
+    """
+    content = "\0".join(
+        " ".join(value.split()).lower() for value in (email, name, phone, message)
+    )
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def too_many_requests(detail: str, retry_after: int):
+    """
+    The too_many_requests function returns the 429 error of the contact form.
+
+    :param detail: str: The error message
+    :param retry_after: int: Seconds after which the client may retry
+    :return: An HTTPException
+    :doc-author: Ihor Voitiuk
+    """
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=detail,
+        headers={"Retry-After": str(retry_after)},
+    )
+
+
+async def check_submission(
+    request: Request, email: str, name: str, phone: str, message: str
+) -> bool:
+    """
+    The check_submission function decides whether a contact form submission is sent.
+    While the email outbox holds contact_form_shed_depth emails, submissions are
+    rejected before Redis is touched. Otherwise each IP address and each email may
+    submit a limited number of messages per contact_form_window, and a message that
+    was already submitted within contact_form_duplicate_ttl is not sent again.
+    If Redis is unavailable the submission is let through. A message that is
+    not sent must be released with forget_submission, so it can be sent again.
+
+    :param request: Request: The current request
+    :param email: str: The email of the sender
+    :param name: str: The name of the sender
+    :param phone: str: The phone of the sender
+    :param message: str: The message
+    :return: bool: False if the message is a duplicate
+    :doc-author: Ihor Voitiuk
+    """
+    if outbox.queue.qsize() >= settings.contact_form_shed_depth:
+        raise too_many_requests("Too many messages, try again later", 60)
+
+    window = settings.contact_form_window
+    ip_key = THROTTLE_KEY.format("ip", client_ip(request))
+    email_key = THROTTLE_KEY.format("email", email.strip().lower())
+    try:
+        # The window starts with the first submission. The counter is created
+        # with its time to live in the same transaction, so it always expires
+        pipe = redis_client.pipeline(transaction=True)
+        for key in (ip_key, email_key):
+            pipe.set(key, 0, ex=window, nx=True)
+            pipe.incr(key)
+        _, ip_count, _, email_count = await pipe.execute()
+        if (
+            ip_count > settings.contact_form_ip_limit
+            or email_count > settings.contact_form_email_limit
+        ):
+            raise too_many_requests("Too many messages, try again later", window)
+
+        return bool(
+            await redis_client.set(
+                DUPLICATE_KEY.format(message_digest(email, name, phone, message)),
+                1,
+                nx=True,
+                ex=settings.contact_form_duplicate_ttl,
+            )
+        )
+    except RedisError as err:
+        logger.warning("Contact form checks are skipped: %s", err)
+        return True
+
+
+async def forget_submission(email: str, name: str, phone: str, message: str):
+    """
+    The forget_submission function removes a message from the duplicate check
+    when it could not be sent, so the sender can submit it again.
+
+    :param email: str: The email of the sender
+    :param name: str: The name of the sender
+    :param phone: str: The phone of the sender
+    :param message: str: The message
+    :return: None
+    :doc-author: Ihor Voitiuk
+    """
+    try:
+        await redis_client.delete(
+            DUPLICATE_KEY.format(message_digest(email, name, phone, message))
+        )
+    except RedisError as err:
+        logger.warning("Contact form duplicate check is not released: %s", err)
@@ -1,33 +1,86 @@
-from pathlib import Path
 from datetime import datetime
+from email.message import EmailMessage
+from email.utils import formataddr, formatdate, make_msgid
 
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig, MessageType
-from fastapi_mail.errors import ConnectionErrors
+from fastapi_mail import MessageSchema, MessageType
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
 from pydantic import EmailStr
 
 from src.services.auth import auth_service
+from src.services.email import outbox
+from src.services.email.outbox import conf
 from src.conf.config import settings
 
-conf = ConnectionConfig(
-    MAIL_USERNAME=settings.mail_username,
-    MAIL_PASSWORD=settings.mail_password,
-    MAIL_FROM=EmailStr(settings.mail_username),
-    MAIL_PORT=settings.mail_port,
-    MAIL_SERVER=settings.mail_server,
-    MAIL_FROM_NAME="Rest API App",
-    MAIL_STARTTLS=False,
-    MAIL_SSL_TLS=True,
-    USE_CREDENTIALS=True,
-    VALIDATE_CERTS=True,
-    TEMPLATE_FOLDER=Path(__file__).parent / "templates",
+TEMPLATE_NAMES = (
+    "email_template.html",
+    "email_template_reset_password.html",
+    "email_template_contact_form.html",
 )
 
+environment = Environment(
+    loader=FileSystemLoader(conf.TEMPLATE_FOLDER),
+    bytecode_cache=FileSystemBytecodeCache(),
+    auto_reload=False,
+)
+templates = {}
+
+
+def load_templates():
+    """
+    The load_templates function compiles the email templates once, so messages are
+    rendered with the compiled objects. The compiled bytecode is cached on disk,
+    so later processes skip the compilation as well.
+
+    :return: None
+    :doc-author: Ihor Voitiuk
+    """
+    for template_name in TEMPLATE_NAMES:
+        templates[template_name] = environment.get_template(template_name)
+
+
+def get_template(template_name: str):
+    """
+    The get_template function returns a compiled template, loading it on first use.
+
+    :param template_name: str: The name of the template in the templates folder
+    :return: The compiled Jinja template
+    :doc-author: Ihor Voitiuk
+    """
+    template = templates.get(template_name)
+    if template is None:
+        template = templates[template_name] = environment.get_template(template_name)
+    return template
+
+
+async def prepare_message(message: MessageSchema, template_name: str):
+    """
+    The prepare_message function renders the template of a message and builds the MIME message.
+
+    :param message: MessageSchema: The message with the template data
+    :param template_name: str: The name of the template in the templates folder
+    :return: The MIME message
+    :doc-author: Ihor Voitiuk
+    """
+    mime = EmailMessage()
+    mime["Subject"] = message.subject
+    mime["From"] = formataddr((conf.MAIL_FROM_NAME, conf.MAIL_FROM))
+    mime["To"] = ", ".join(message.recipients)
+    mime["Date"] = formatdate(localtime=True)
+    mime["Message-ID"] = make_msgid()
+    mime.set_content(
+        get_template(template_name).render(**message.template_body),
+        subtype=message.subtype.value,
+        charset=message.charset,
+    )
+    return mime
+
 
 async def send_email(
     email: EmailStr, username: str, host: str, subj: str = "Confirm your email "
 ):
     """
     The send_email function is used to send an email to a user.
+    The email is added to the outbox and delivered by its sender.
         It takes in the following parameters:
             - email: The recipient's email address.
             - username: The recipient's username. This will be displayed in
@@ -41,31 +94,30 @@ async def send_email(
     :param username: str: Fill in the username field in the email template
     :param host: str: Pass the hostname of the server to be used in the email template
     :param subj: str: Specify the subject of the email
-    :return: A coroutine
+    :return: True if the email is added to the outbox
     :doc-author: Ihor Voitiuk
     """
-    try:
-        token_verification = auth_service.create_email_token({"sub": email})
-        message = MessageSchema(
-            subject=subj,
-            recipients=[email],
-            template_body={
-                "host": host,
-                "username": username,
-                "token": token_verification,
-            },
-            subtype=MessageType.html,
-        )
+    token_verification = auth_service.create_email_token({"sub": email})
+    message = MessageSchema(
+        subject=subj,
+        recipients=[email],
+        template_body={
+            "host": host,
+            "username": username,
+            "token": token_verification,
+        },
+        subtype=MessageType.html,
+    )
 
-        fm = FastMail(conf)
-        if subj == "Confirm your email ":
-            await fm.send_message(message, template_name="email_template.html")
-        elif subj == "Reset your password ":
-            await fm.send_message(
-                message, template_name="email_template_reset_password.html"
-            )
-    except ConnectionErrors as err:
-        print(f">>> mail.py {err}")
+    if subj == "Confirm your email ":
+        message = await prepare_message(message, "email_template.html")
+    elif subj == "Reset your password ":
+        message = await prepare_message(
+            message, "email_template_reset_password.html"
+        )
+    else:
+        return False
+    return outbox.enqueue(message)
 
 
 async def send_email_contact_form(
@@ -73,13 +125,14 @@ async def send_email_contact_form(
 ):
     """
     The send_email_contact_form function sends an email to the specified recipient.
+    The email is added to the outbox and delivered by its sender.
 
     :param email: EmailStr: Check if the email is a valid email address
     :param name: str: Get the name of the person who is sending
     :param phone: str: Pass the phone number of the person who filled out the contact form
     :param message: str: Send the message from the contact form
     :param subj: Send a different email if the user is trying to reset their password
-    :return: A coroutine object
+    :return: True if the email is added to the outbox
     :doc-author: Ihor Voitiuk
     """
 
@@ -96,6 +149,7 @@ async def send_email_contact_form(
         subtype=MessageType.html,
     )
 
-    fm = FastMail(conf)
-    if subj == "Contact form":
-        await fm.send_message(message, template_name="email_template_contact_form.html")
+    if subj != "Contact form":
+        return False
+    message = await prepare_message(message, "email_template_contact_form.html")
+    return outbox.enqueue(message)
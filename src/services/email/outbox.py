@@ -0,0 +1,200 @@
+import asyncio
+import logging
+from pathlib import Path
+
+import aiosmtplib
+from fastapi_mail import ConnectionConfig
+from pydantic import EmailStr
+
+from src.conf.config import settings
+
+conf = ConnectionConfig(
+    MAIL_USERNAME=settings.mail_username,
+    MAIL_PASSWORD=settings.mail_password,
+    MAIL_FROM=EmailStr(settings.mail_username),
+    MAIL_PORT=settings.mail_port,
+    MAIL_SERVER=settings.mail_server,
+    MAIL_FROM_NAME="Rest API App",
+    MAIL_STARTTLS=False,
+    MAIL_SSL_TLS=True,
+    USE_CREDENTIALS=True,
+    VALIDATE_CERTS=True,
+    TEMPLATE_FOLDER=Path(__file__).parent / "templates",
+)
+
+logger = logging.getLogger(__name__)
+
+queue = asyncio.Queue(maxsize=settings.mail_queue_size)
+sender = None
+smtp = None
+# The batch being sent and the emails waiting for a retry, sent or logged on stop
+in_flight = []
+retries = {}
+
+
+def enqueue(message, attempts: int = 0) -> bool:
+    """
+    The enqueue function adds a prepared email to the outbox. It does no I/O,
+    the email is delivered by the sender.
+
+    :param message: The MIME message to send
+    :param attempts: int: Number of failed attempts to send the message
+    :return: bool: False if the outbox is full
+    :doc-author: Ihor Voitiuk
+    """
+    try:
+        queue.put_nowait((message, attempts))
+    except asyncio.QueueFull:
+        logger.warning("The outbox is full, %s is dropped", message["Subject"])
+        return False
+    return True
+
+
+async def connect():
+    """
+    The connect function returns the SMTP connection, opening and logging in
+    only if there is no open connection yet.
+
+    :return: An aiosmtplib.SMTP connection
+    :doc-author: Ihor Voitiuk
+    """
+    global smtp
+    if smtp is None or not smtp.is_connected:
+        smtp = aiosmtplib.SMTP(
+            hostname=conf.MAIL_SERVER,
+            port=conf.MAIL_PORT,
+            timeout=conf.TIMEOUT,
+            use_tls=conf.MAIL_SSL_TLS,
+            start_tls=conf.MAIL_STARTTLS,
+            validate_certs=conf.VALIDATE_CERTS,
+        )
+        await smtp.connect()
+        if conf.USE_CREDENTIALS:
+            await smtp.login(conf.MAIL_USERNAME, conf.MAIL_PASSWORD)
+    return smtp
+
+
+async def disconnect():
+    """
+    The disconnect function closes the SMTP connection if it is open.
+
+    :return: None
+    :doc-author: Ihor Voitiuk
+    """
+    global smtp
+    if smtp is not None and smtp.is_connected:
+        try:
+            await smtp.quit()
+        except aiosmtplib.SMTPException:
+            smtp.close()
+    smtp = None
+
+
+def schedule_retry(message, attempts: int, delay: float):
+    """
+    The schedule_retry function puts an email back into the outbox after delay seconds.
+
+    :param message: The MIME message to send
+    :param attempts: int: Number of failed attempts to send the message
+    :param delay: float: Seconds to wait
+    :return: None
+    :doc-author: Ihor Voitiuk
+    """
+
+    def retry():
+        retries.pop(handle, None)
+        enqueue(message, attempts)
+
+    handle = asyncio.get_event_loop().call_later(delay, retry)
+    retries[handle] = (message, attempts)
+
+
+async def send_batch(batch: list, retry: bool = True):
+    """
+    The send_batch function sends a batch of emails over one SMTP connection.
+    When the connection fails it is dropped and the email is put back into
+    the outbox after an exponential backoff, until mail_max_attempts is reached.
+    An email that fails for any other reason is dropped, so it cannot stop the sender.
+    Each email is removed from the batch once it is handled, so a cancelled
+    batch keeps the emails that are not sent yet.
+
+    :param batch: list: Pairs of a message and its number of failed attempts
+    :param retry: bool: Retry failed emails, otherwise they are dropped
+    :return: None
+    :doc-author: Ihor Voitiuk
+    """
+    while batch:
+        message, attempts = batch[0]
+        try:
+            client = await connect()
+            await client.send_message(message)
+        except (aiosmtplib.SMTPException, OSError, asyncio.TimeoutError) as err:
+            await disconnect()
+            attempts += 1
+            if not retry or attempts >= settings.mail_max_attempts:
+                logger.error("%s, %s is dropped", err, message["Subject"])
+            else:
+                schedule_retry(message, attempts, settings.mail_retry_backoff**attempts)
+        except Exception as err:
+            await disconnect()
+            logger.exception("%s, %s is dropped", err, message["Subject"])
+        batch.pop(0)
+
+
+async def run_sender():
+    """
+    The run_sender function sends the emails of the outbox in batches of up to
+    mail_batch_size. The connection is kept open between batches and closed
+    after mail_idle_timeout seconds without emails.
+
+    :return: None
+    :doc-author: Ihor Voitiuk
+    """
+    while True:
+        try:
+            in_flight.append(
+                await asyncio.wait_for(queue.get(), settings.mail_idle_timeout)
+            )
+        except asyncio.TimeoutError:
+            await disconnect()
+            continue
+        while len(in_flight) < settings.mail_batch_size and not queue.empty():
+            in_flight.append(queue.get_nowait())
+        await send_batch(in_flight)
+
+
+async def start():
+    """
+    The start function starts the sender on the current event loop.
+
+    :return: None
+    :doc-author: Ihor Voitiuk
+    """
+    global sender
+    sender = asyncio.create_task(run_sender())
+
+
+async def stop():
+    """
+    The stop function stops the sender and sends the emails left in the outbox
+    once, with the batch that was being sent and the emails waiting for a retry.
+    Emails that still fail are logged as dropped. The SMTP connection is closed.
+
+    :return: None
+    :doc-author: Ihor Voitiuk
+    """
+    if sender is not None:
+        sender.cancel()
+        await asyncio.gather(sender, return_exceptions=True)
+    batch = in_flight[:]
+    in_flight.clear()
+    for handle, item in retries.items():
+        handle.cancel()
+        batch.append(item)
+    retries.clear()
+    while not queue.empty():
+        batch.append(queue.get_nowait())
+    if batch:
+        logger.info("Sending %d emails left in the outbox", len(batch))
+        await send_batch(batch, retry=False)
+    await disconnect()
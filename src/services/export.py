@@ -1,15 +1,15 @@
 import csv
 import json
-from typing import List
+from typing import Iterable
 
-from src.schemas import ContactResponse
 
-
-def export_contacts_to_csv(contacts: List[ContactResponse]):
+def export_contacts_to_csv(contacts: Iterable):
     """
-    The export_contacts_to_csv function takes a list of ContactResponse objects and returns a CSV string.
+    The export_contacts_to_csv function takes a list of contacts and returns a CSV string.
+    Only first_name, last_name, email and phone_number are read, so the rows of
+    repository_contacts.EXPORT_COLUMNS are enough.
     
-    :param contacts: List[ContactResponse]: Specify the type of data that will be passed into the function
+    :param contacts: Iterable: Contacts or rows with the exported fields
     :return: A string containing the csv data
     :doc-author: Ihor Voitiuk
     """
@@ -24,11 +24,13 @@ def export_contacts_to_csv(contacts: List[ContactResponse]):
     return csv_string
 
 
-def export_contacts_to_json(contacts: List[ContactResponse]):
+def export_contacts_to_json(contacts: Iterable):
     """
-    The export_contacts_to_json function takes a list of ContactResponse objects and converts them to JSON.
+    The export_contacts_to_json function takes a list of contacts and converts them to JSON.
+    Only first_name, last_name, email and phone_number are read, so the rows of
+    repository_contacts.EXPORT_COLUMNS are enough.
     
-    :param contacts: List[ContactResponse]: Specify the type of data that will be passed into the function
+    :param contacts: Iterable: Contacts or rows with the exported fields
     :return: A string of json data
     :doc-author: Ihor Voitiuk
     """
@@ -0,0 +1,215 @@
+import asyncio
+import logging
+import time
+
+import redis.asyncio as redis
+from sqlalchemy import text
+
+from src.conf.config import settings
+from src.database.db import DBSession, engine
+from src.services import metrics, watchdog
+from src.services.email import outbox
+
+
+logger = logging.getLogger(__name__)
+
+redis_client = metrics.instrument_redis(
+    redis.Redis(host=settings.redis_host, port=settings.redis_port, db=settings.redis_db)
+)
+prober = None
+
+# The last result of the probes, the endpoints only read it
+status = {
+    "ready": False,
+    "checked_at": None,
+    "checks": {},
+    "pool": {},
+}
+
+
+def select_one():
+    """
+    The select_one function runs SELECT 1 in its own database session.
+
+    :return: None
+    :doc-author: Ihor Voitiuk
+    """
+    with DBSession() as db:
+        db.execute(text("SELECT 1"))
+
+
+async def check_database():
+    """
+    The check_database function checks the database off the event loop.
+
+    :return: None
+    :doc-author: Ihor Voitiuk
+    """
+    await asyncio.get_event_loop().run_in_executor(None, select_one)
+
+
+async def check_redis():
+    """
+    The check_redis function checks that Redis answers PING.
+
+    :return: None
+    :doc-author: Ihor Voitiuk
+    """
+    await redis_client.ping()
+
+
+async def check_mail():
+    """
+    The check_mail function checks that the mail server is configured.
+    A backlog of the email outbox does not make the worker unready,
+    its depth is reported by readiness.
+
+    :return: None
+    :doc-author: Ihor Voitiuk
+    """
+    if not (settings.mail_server and settings.mail_username and settings.mail_password):
+        raise ValueError("Mail server is not configured")
+
+
+async def check_sms():
+    """
+    The check_sms function checks that the Twilio account is configured.
+
+    :return: None
+    :doc-author: Ihor Voitiuk
+    """
+    if not (settings.twilio_account_sid and settings.twilio_auth_token):
+        raise ValueError("Twilio account is not configured")
+
+
+CHECKS = {
+    "database": check_database,
+    "redis": check_redis,
+    "mail": check_mail,
+    "sms": check_sms,
+}
+
+
+async def run_check(check) -> dict:
+    """
+    The run_check function runs one probe within health_timeout. The response
+    is public, so it only names the type of the error, the error is logged.
+
+    :param check: The probe coroutine function
+    :return: dict: The status and latency of the probe, and the error type if it failed
+    :doc-author: Ihor Voitiuk
+    """
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(check(), settings.health_timeout)
+    except Exception as err:
+        logger.warning("Health check %s failed: %r", check.__name__, err)
+        result = {"status": "error", "error": type(err).__name__}
+    else:
+        result = {"status": "ok"}
+    result["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return result
+
+
+def pool_status() -> dict:
+    """
+    The pool_status function returns the connections of the database pool.
+    The saturation is the share of the pool and its overflow that is checked out.
+
+    :return: dict: The pool size, checked out connections and saturation
+    :doc-author: Ihor Voitiuk
+    """
+    pool = engine.pool
+    if not hasattr(pool, "checkedout"):
+        return {}
+    capacity = pool.size() + max(pool._max_overflow, 0)
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(pool.overflow(), 0),
+        "saturation": round(pool.checkedout() / capacity, 2) if capacity else None,
+    }
+
+
+async def probe():
+    """
+    The probe function runs all probes concurrently and updates the status.
+
+    :return: None
+    :doc-author: Ihor Voitiuk
+    """
+    results = await asyncio.gather(*(run_check(check) for check in CHECKS.values()))
+    checks = dict(zip(CHECKS, results))
+    ready = all(result["status"] == "ok" for result in checks.values())
+    if status["ready"] and not ready:
+        failed = [name for name, result in checks.items() if result["status"] != "ok"]
+        logger.warning("Not ready, failed checks: %s", ", ".join(failed))
+    status.update(
+        ready=ready, checked_at=time.time(), checks=checks, pool=pool_status()
+    )
+
+
+async def run_prober():
+    """
+    The run_prober function probes the dependencies every health_interval seconds.
+
+    :return: None
+    :doc-author: Ihor Voitiuk
+    """
+    while True:
+        try:
+            await probe()
+        except Exception as err:
+            logger.exception("Health probe failed: %s", err)
+        await asyncio.sleep(settings.health_interval)
+
+
+def readiness() -> dict:
+    """
+    The readiness function returns the cached status with the last event loop lag
+    of the watchdog and the depth of the email outbox. A status older than three
+    intervals means the prober is stuck, so the worker is not ready.
+
+    :return: dict: The status
+    :doc-author: Ihor Voitiuk
+    """
+    checked_at = status["checked_at"]
+    stale = (
+        checked_at is None
+        or time.time() - checked_at > 3 * settings.health_interval
+    )
+    return {
+        **status,
+        "ready": status["ready"] and not stale,
+        "stale": stale,
+        "loop_lag_ms": round(watchdog.heartbeat["lag"] * 1000, 1),
+        "mail_outbox": {
+            "queued": outbox.queue.qsize(),
+            "max_size": outbox.queue.maxsize,
+        },
+    }
+
+
+async def start():
+    """
+    The start function starts the prober on the current event loop.
+
+    :return: None
+    :doc-author: Ihor Voitiuk
+    """
+    global prober
+    prober = asyncio.create_task(run_prober())
+
+
+async def stop():
+    """
+    The stop function stops the prober.
+
+    :return: None
+    :doc-author: Ihor Voitiuk
+    """
+    global prober
+    if prober is not None:
+        prober.cancel()
+        await asyncio.gather(prober, return_exceptions=True)
+        prober = None
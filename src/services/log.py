@@ -0,0 +1,166 @@
+import json
+import logging
+import random
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from src.conf.config import settings
+
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+request_id = ContextVar("request_id", default=None)
+debug_sampled = ContextVar("debug_sampled", default=None)
+
+queue = SimpleQueue()
+queue_handler = None
+listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formatter that writes every record as one line of JSON.
+    :doc-author: Ihor Voitiuk
+    """
+
+    def format(self, record):
+        """
+        The format function returns the record as a JSON object with the time,
+        level, logger, request id and message.
+
+        :param self: Represent the instance of the class
+        :param record: The log record
+        :return: str: The JSON line
+        :doc-author: Ihor Voitiuk
+        """
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", None),
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class ContextFilter(logging.Filter):
+    """
+    Filter that adds the id of the current request to the records and keeps
+    only a sample of the debug records. The sample is taken per request, so
+    a sampled request keeps all of its debug records.
+    :doc-author: Ihor Voitiuk
+    """
+
+    def filter(self, record):
+        """
+        The filter function adds the request id to the record and decides
+        whether a debug record is logged.
+
+        :param self: Represent the instance of the class
+        :param record: The log record
+        :return: bool: False if the record is dropped
+        :doc-author: Ihor Voitiuk
+        """
+        record.request_id = request_id.get()
+        if record.levelno > logging.DEBUG:
+            return True
+        sampled = debug_sampled.get()
+        if sampled is None:
+            sampled = random.random() < settings.log_debug_sample_rate
+        return sampled
+
+
+def setup():
+    """
+    The setup function sends the records of the application to a queue. A listener
+    thread formats them and writes them to stderr, so the request path never
+    waits for log I/O. In debug mode the SQL statements of SQLAlchemy are logged
+    through the same queue.
+
+    :return: None
+    :doc-author: Ihor Voitiuk
+    """
+    global queue_handler, listener
+    if listener is not None:
+        return
+    handler = logging.StreamHandler()
+    handler.setFormatter(JsonFormatter())
+    queue_handler = QueueHandler(queue)
+    queue_handler.addFilter(ContextFilter())
+    root = logging.getLogger()
+    root.setLevel(settings.log_level.upper())
+    root.addHandler(queue_handler)
+    if settings.debug:
+        logging.getLogger("sqlalchemy.engine").setLevel(logging.INFO)
+    listener = QueueListener(queue, handler, respect_handler_level=True)
+    listener.start()
+
+
+def shutdown():
+    """
+    The shutdown function writes the queued records and stops the listener.
+
+    :return: None
+    :doc-author: Ihor Voitiuk
+    """
+    global queue_handler, listener
+    if listener is None:
+        return
+    logging.getLogger().removeHandler(queue_handler)
+    listener.stop()
+    queue_handler = listener = None
+
+
+class RequestIdMiddleware:
+    """
+    ASGI middleware that gives every HTTP request an id for the log records.
+    The id of the X-Request-ID header is kept, otherwise a new one is generated,
+    and it is returned in the X-Request-ID header of the response.
+
+    Attributes:
+    - app (ASGIApp): The wrapped application.
+    :doc-author: Ihor Voitiuk
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        """
+        The __call__ function sets the request id and the debug sample of the request.
+
+        :param self: Represent the instance of the class
+        :param scope: The ASGI connection scope
+        :param receive: The ASGI receive channel
+        :param send: The ASGI send channel
+        :return: None
+        :doc-author: Ihor Voitiuk
+        """
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        value = Headers(scope=scope).get(REQUEST_ID_HEADER, "")[:64]
+        value = value or uuid.uuid4().hex
+        id_token = request_id.set(value)
+        sampled_token = debug_sampled.set(
+            random.random() < settings.log_debug_sample_rate
+        )
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append(REQUEST_ID_HEADER, value)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_id.reset(id_token)
+            debug_sampled.reset(sampled_token)
@@ -0,0 +1,106 @@
+import asyncio
+import logging
+
+from datetime import date
+from collections import Counter
+
+from src.conf.config import settings
+from src.database.db import DBSession
+from src.repository import usage as repository_usage
+
+
+logger = logging.getLogger(__name__)
+
+
+buffer = Counter()
+flusher = None
+
+
+def record(user_id: int, kind: str, count: int = 1):
+    """
+    The record function adds a usage event to the in-memory buffer. It does no I/O,
+    the buffer is written to the database by the flusher.
+
+    :param user_id: int: Identify the user
+    :param kind: str: Kind of usage, e.g. documents or sms
+    :param count: int: Number of used units
+    :return: None
+    :doc-author: Ihor Voitiuk
+    """
+    buffer[(user_id, date.today(), kind)] += count
+
+
+def write_usage(rows: list):
+    """
+    The write_usage function writes aggregated usage deltas with its own session.
+
+    :param rows: list: The aggregated usage deltas
+    :return: None
+    :doc-author: Ihor Voitiuk
+    """
+    db = DBSession()
+    try:
+        asyncio.run(repository_usage.add_usage(rows, db))
+    finally:
+        db.close()
+
+
+async def flush():
+    """
+    The flush function takes the buffered usage and writes it to the database
+    in the default executor. When the write fails the deltas are put back into
+    the buffer and retried with the next flush.
+
+    :return: None
+    :doc-author: Ihor Voitiuk
+    """
+    global buffer
+    if not buffer:
+        return
+
+    pending, buffer = buffer, Counter()
+    rows = [
+        {"user_id": user_id, "day": day, "kind": kind, "count": count}
+        for (user_id, day, kind), count in pending.items()
+    ]
+    try:
+        await asyncio.get_event_loop().run_in_executor(None, write_usage, rows)
+    except Exception as err:
+        buffer.update(pending)
+        logger.warning("Usage flush failed, %d counters kept: %s", len(pending), err)
+
+
+async def run_flusher():
+    """
+    The run_flusher function flushes the buffer every metering_flush_interval seconds.
+
+    :return: None
+    :doc-author: Ihor Voitiuk
+    """
+    while True:
+        await asyncio.sleep(settings.metering_flush_interval)
+        await flush()
+
+
+async def start():
+    """
+    The start function starts the flusher on the current event loop.
+
+    :return: None
+    :doc-author: Ihor Voitiuk
+    """
+    global flusher
+    flusher = asyncio.create_task(run_flusher())
+
+
+async def stop():
+    """
+    The stop function stops the flusher and writes what is left in the buffer.
+
+    :return: None
+    :doc-author: Ihor Voitiuk
+    """
+    if flusher is not None:
+        flusher.cancel()
+        await asyncio.gather(flusher, return_exceptions=True)
+    await flush()
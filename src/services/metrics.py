@@ -0,0 +1,511 @@
+import logging
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+
+from src.conf.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+JOB_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+registry = []
+
+
+def format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    """
+    The format_labels function formats label names and values in the Prometheus text format.
+
+    :param names: tuple: The label names
+    :param values: tuple: The label values
+    :param extra: str: An already formatted label, e.g. le of a histogram bucket
+    :return: str: The labels in braces or an empty string
+    :doc-author: Ihor Voitiuk
+    """
+    labels = [
+        '{}="{}"'.format(
+            name,
+            str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"),
+        )
+        for name, value in zip(names, values)
+    ]
+    if extra:
+        labels.append(extra)
+    return "{" + ",".join(labels) + "}" if labels else ""
+
+
+class Metric:
+    """
+    Base class of the metrics. A metric keeps its values by label values
+    and registers itself for the /metrics endpoint.
+
+    Attributes:
+    - name (str): The metric name.
+    - documentation (str): The help text.
+    - labelnames (tuple): The label names.
+    :doc-author: Ihor Voitiuk
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.values = {}
+        self.lock = threading.Lock()
+        registry.append(self)
+
+    def samples(self):
+        """
+        The samples function yields the lines of the metric values.
+
+        :param self: Represent the instance of the class
+        :return: The sample lines
+        :doc-author: Ihor Voitiuk
+        """
+        for labels, value in sorted(self.values.items()):
+            yield f"{self.name}{format_labels(self.labelnames, labels)} {value}"
+
+    def render(self) -> str:
+        """
+        The render function returns the metric in the Prometheus text format.
+
+        :param self: Represent the instance of the class
+        :return: str: The HELP, TYPE and sample lines
+        :doc-author: Ihor Voitiuk
+        """
+        with self.lock:
+            lines = [
+                f"# HELP {self.name} {self.documentation}",
+                f"# TYPE {self.name} {self.kind}",
+                *self.samples(),
+            ]
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    """
+    A metric that only goes up.
+    :doc-author: Ihor Voitiuk
+    """
+
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        """
+        The inc function increments the counter of the given label values.
+
+        :param self: Represent the instance of the class
+        :param labels: The label values
+        :param amount: float: The increment
+        :return: None
+        :doc-author: Ihor Voitiuk
+        """
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    """
+    A metric that goes up and down.
+    :doc-author: Ihor Voitiuk
+    """
+
+    kind = "gauge"
+
+    def inc(self, *labels, amount: float = 1):
+        """
+        The inc function increments the gauge of the given label values.
+
+        :param self: Represent the instance of the class
+        :param labels: The label values
+        :param amount: float: The increment, negative to decrement
+        :return: None
+        :doc-author: Ihor Voitiuk
+        """
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount: float = 1):
+        """
+        The dec function decrements the gauge of the given label values.
+
+        :param self: Represent the instance of the class
+        :param labels: The label values
+        :param amount: float: The decrement
+        :return: None
+        :doc-author: Ihor Voitiuk
+        """
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels, value: float):
+        """
+        The set function sets the gauge of the given label values.
+
+        :param self: Represent the instance of the class
+        :param labels: The label values
+        :param value: float: The new value
+        :return: None
+        :doc-author: Ihor Voitiuk
+        """
+        with self.lock:
+            self.values[labels] = value
+
+
+class Histogram(Metric):
+    """
+    A metric that counts observations in buckets. Only the count of the matching
+    bucket is incremented on observe, the cumulative counts are computed on render.
+
+    Attributes:
+    - buckets (tuple): The upper bounds of the buckets.
+    :doc-author: Ihor Voitiuk
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple = (),
+        buckets: tuple = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = buckets
+
+    def observe(self, value: float, *labels):
+        """
+        The observe function adds an observation for the given label values.
+
+        :param self: Represent the instance of the class
+        :param value: float: The observed value
+        :param labels: The label values
+        :return: None
+        :doc-author: Ihor Voitiuk
+        """
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            state = self.values.get(labels)
+            if state is None:
+                state = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def samples(self):
+        """
+        The samples function yields the bucket, sum and count lines of the histogram.
+
+        :param self: Represent the instance of the class
+        :return: The sample lines
+        :doc-author: Ihor Voitiuk
+        """
+        for labels, (counts, total) in sorted(self.values.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                le = format_labels(self.labelnames, labels, f'le="{bound}"')
+                yield f"{self.name}_bucket{le} {cumulative}"
+            labels = format_labels(self.labelnames, labels)
+            yield f"{self.name}_sum{labels} {total}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+def render() -> str:
+    """
+    The render function returns all metrics in the Prometheus text format.
+
+    :return: str: The metrics
+    :doc-author: Ihor Voitiuk
+    """
+    return "\n".join(metric.render() for metric in registry) + "\n"
+
+
+http_requests = Counter(
+    "http_requests_total",
+    "Number of HTTP requests by route and status code.",
+    ("method", "route", "status"),
+)
+http_request_duration = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route.",
+    ("method", "route"),
+)
+http_requests_in_flight = Gauge(
+    "http_requests_in_flight",
+    "Number of HTTP requests being processed.",
+    ("method",),
+)
+db_query_duration = Histogram(
+    "db_query_duration_seconds",
+    "Duration of database queries.",
+    buckets=QUERY_BUCKETS,
+)
+db_queries_per_request = Histogram(
+    "db_queries_per_request",
+    "Number of database queries per HTTP request by route.",
+    ("route",),
+    buckets=COUNT_BUCKETS,
+)
+redis_command_duration = Histogram(
+    "redis_command_duration_seconds",
+    "Duration of Redis commands and pipelines.",
+    ("command",),
+    buckets=QUERY_BUCKETS,
+)
+document_job_duration = Histogram(
+    "document_job_duration_seconds",
+    "Duration of document jobs by kind and status.",
+    ("kind", "status"),
+    buckets=JOB_BUCKETS,
+)
+event_loop_lag = Histogram(
+    "event_loop_lag_seconds",
+    "Delay of the event loop in running a scheduled callback.",
+    buckets=LAG_BUCKETS,
+)
+event_loop_blocked = Counter(
+    "event_loop_blocked_total",
+    "Number of times the event loop was blocked longer than the threshold.",
+)
+
+
+class RequestStats:
+    """
+    Database statistics of the current request.
+
+    Attributes:
+    - scope (dict): The ASGI scope of the request.
+    - queries (int): Number of queries.
+    - query_time (float): Total duration of the queries in seconds.
+    :doc-author: Ihor Voitiuk
+    """
+
+    __slots__ = ("scope", "queries", "query_time")
+
+    def __init__(self, scope: dict = None):
+        self.scope = scope or {}
+        self.queries = 0
+        self.query_time = 0.0
+
+    @property
+    def route(self) -> str:
+        """
+        The route function returns the route template of the request, or its path
+        while the request is not routed yet.
+
+        :param self: Represent the instance of the class
+        :return: str: The route
+        :doc-author: Ihor Voitiuk
+        """
+        route = self.scope.get("route")
+        return route.path if route is not None else self.scope.get("path", "-")
+
+
+request_stats: ContextVar = ContextVar("request_stats", default=None)
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    """
+    The before_cursor_execute function remembers when a query was started.
+    :doc-author: Ihor Voitiuk
+    """
+    conn.info.setdefault("query_start", []).append(perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    """
+    The after_cursor_execute function records the duration of a finished query
+    and logs the query if it took longer than slow_query_ms.
+    :doc-author: Ihor Voitiuk
+    """
+    elapsed = perf_counter() - conn.info["query_start"].pop()
+    db_query_duration.observe(elapsed)
+    stats = request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.query_time += elapsed
+    if elapsed * 1000 >= settings.slow_query_ms:
+        logger.warning(
+            "Slow query %.1f ms on %s: %s",
+            elapsed * 1000,
+            stats.route if stats is not None else "-",
+            statement,
+        )
+
+
+def instrument_engine(engine):
+    """
+    The instrument_engine function times every query of the engine and counts
+    the queries of the current request.
+
+    :param engine: The SQLAlchemy engine
+    :return: The engine
+    :doc-author: Ihor Voitiuk
+    """
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+    return engine
+
+
+@contextmanager
+def count_queries(engine):
+    """
+    The count_queries function collects the statements the engine executes in any
+    thread while the with block runs, so tests can assert the number of queries
+    of an endpoint.
+
+    :param engine: The SQLAlchemy engine
+    :return: A list that receives the statements
+    :doc-author: Ihor Voitiuk
+    """
+    statements = []
+
+    def collect(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", collect)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", collect)
+
+
+def instrument_redis(client):
+    """
+    The instrument_redis function times the commands and pipelines of an asyncio Redis client.
+
+    :param client: The redis.asyncio.Redis client
+    :return: The client
+    :doc-author: Ihor Voitiuk
+    """
+    execute_command = client.execute_command
+    pipeline = client.pipeline
+
+    async def timed_execute_command(*args, **options):
+        started = perf_counter()
+        try:
+            return await execute_command(*args, **options)
+        finally:
+            redis_command_duration.observe(
+                perf_counter() - started, str(args[0]).lower()
+            )
+
+    def timed_pipeline(*args, **kwargs):
+        pipe = pipeline(*args, **kwargs)
+        execute = pipe.execute
+
+        async def timed_execute(*args, **kwargs):
+            started = perf_counter()
+            try:
+                return await execute(*args, **kwargs)
+            finally:
+                redis_command_duration.observe(perf_counter() - started, "pipeline")
+
+        pipe.execute = timed_execute
+        return pipe
+
+    client.execute_command = timed_execute_command
+    client.pipeline = timed_pipeline
+    return client
+
+
+def instrument_sync_redis(client):
+    """
+    The instrument_sync_redis function times the commands of a synchronous Redis client.
+
+    :param client: The redis.Redis client
+    :return: The client
+    :doc-author: Ihor Voitiuk
+    """
+    execute_command = client.execute_command
+
+    def timed_execute_command(*args, **options):
+        started = perf_counter()
+        try:
+            return execute_command(*args, **options)
+        finally:
+            redis_command_duration.observe(
+                perf_counter() - started, str(args[0]).lower()
+            )
+
+    client.execute_command = timed_execute_command
+    return client
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware that records the latency, status code and database queries of
+    every HTTP request by route template and keeps the number of requests in flight.
+    The total time is also returned in the performance header. In debug mode
+    the database time and query count are returned in the Server-Timing header.
+
+    Attributes:
+    - app (ASGIApp): The wrapped application.
+    :doc-author: Ihor Voitiuk
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        """
+        The __call__ function times the request and records its metrics.
+
+        :param self: Represent the instance of the class
+        :param scope: The ASGI connection scope
+        :param receive: The ASGI receive channel
+        :param send: The ASGI send channel
+        :return: None
+        :doc-author: Ihor Voitiuk
+        """
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        started = perf_counter()
+        status_code = 500
+        stats = RequestStats(scope)
+        token = request_stats.set(stats)
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                elapsed = perf_counter() - started
+                headers = MutableHeaders(scope=message)
+                headers.append("performance", str(elapsed))
+                if settings.debug:
+                    db_time = stats.query_time * 1000
+                    headers.append(
+                        "Server-Timing",
+                        f'db;dur={db_time:.1f};desc="{stats.queries} queries", '
+                        f"app;dur={elapsed * 1000:.1f}",
+                    )
+            await send(message)
+
+        http_requests_in_flight.inc(method)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = perf_counter() - started
+            http_requests_in_flight.dec(method)
+            route = scope.get("route")
+            route = route.path if route is not None else "unmatched"
+            http_requests.inc(method, route, status_code)
+            http_request_duration.observe(elapsed, method, route)
+            db_queries_per_request.observe(stats.queries, route)
+            request_stats.reset(token)
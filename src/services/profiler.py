@@ -0,0 +1,226 @@
+import asyncio
+import hmac
+import os
+import sys
+import threading
+import uuid
+from collections import Counter, OrderedDict
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from src.conf.config import settings
+
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_ID_HEADER = "X-Profile-ID"
+KEEP_REQUEST_PROFILES = 20
+WORKING_DIR = os.getcwd()
+
+# One profile at a time per worker, the samples of two profiles would mix
+lock = threading.Lock()
+request_profiles = OrderedDict()
+
+
+def frame_name(frame) -> str:
+    """
+    The frame_name function returns the name of a frame in the collapsed stack,
+    with the file relative to the working directory when it is inside it.
+
+    :param frame: The frame
+    :return: str: The function, file and line of the frame
+    :doc-author: Ihor Voitiuk
+    """
+    code = frame.f_code
+    filename = code.co_filename
+    if filename.startswith(WORKING_DIR):
+        filename = os.path.relpath(filename, WORKING_DIR)
+    return f"{code.co_name} ({filename}:{frame.f_lineno})"
+
+
+def collapse(stacks: Counter) -> str:
+    """
+    The collapse function returns the stacks in the collapsed format of flamegraph.pl
+    and speedscope: one stack per line, frames from the root separated by semicolons,
+    followed by the number of samples.
+
+    :param stacks: Counter: Number of samples by stack
+    :return: str: The collapsed stacks
+    :doc-author: Ihor Voitiuk
+    """
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+class StackSampler:
+    """
+    Sampling profiler that records the stacks of all threads of the worker
+    from a background thread at a fixed interval.
+
+    Attributes:
+    - interval (float): Seconds between the samples.
+    - stacks (Counter): Number of samples by collapsed stack.
+    :doc-author: Ihor Voitiuk
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="profiler", daemon=True)
+
+    def sample(self):
+        """
+        The sample function records the current stack of every thread but the sampler.
+
+        :param self: Represent the instance of the class
+        :return: None
+        :doc-author: Ihor Voitiuk
+        """
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == self.thread.ident:
+                continue
+            frames = []
+            while frame is not None:
+                frames.append(frame_name(frame))
+                frame = frame.f_back
+            frames.append(names.get(thread_id, str(thread_id)))
+            self.stacks[";".join(reversed(frames))] += 1
+
+    def run(self):
+        """
+        The run function samples the threads until the sampler is stopped.
+
+        :param self: Represent the instance of the class
+        :return: None
+        :doc-author: Ihor Voitiuk
+        """
+        while not self.stopped.wait(self.interval):
+            self.sample()
+
+    def start(self):
+        """
+        The start function starts the sampling thread.
+
+        :param self: Represent the instance of the class
+        :return: None
+        :doc-author: Ihor Voitiuk
+        """
+        self.thread.start()
+
+    def stop(self) -> str:
+        """
+        The stop function stops the sampling thread.
+
+        :param self: Represent the instance of the class
+        :return: str: The collapsed stacks
+        :doc-author: Ihor Voitiuk
+        """
+        self.stopped.set()
+        self.thread.join()
+        return collapse(self.stacks)
+
+
+async def profile(seconds: float, interval: float):
+    """
+    The profile function samples the worker for a number of seconds.
+
+    :param seconds: float: Duration of the profile
+    :param interval: float: Seconds between the samples
+    :return: str: The collapsed stacks, None if a profile is already running
+    :doc-author: Ihor Voitiuk
+    """
+    if not lock.acquire(blocking=False):
+        return None
+    try:
+        sampler = StackSampler(interval)
+        sampler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            # Joining the sampling thread would block the event loop
+            stacks = await asyncio.to_thread(sampler.stop)
+    finally:
+        lock.release()
+    return stacks
+
+
+def save_request_profile(profile_id: str, stacks: str):
+    """
+    The save_request_profile function keeps the profile of a request,
+    dropping the oldest profile when KEEP_REQUEST_PROFILES are kept.
+
+    :param profile_id: str: The id of the profile
+    :param stacks: str: The collapsed stacks
+    :return: None
+    :doc-author: Ihor Voitiuk
+    """
+    request_profiles[profile_id] = stacks
+    while len(request_profiles) > KEEP_REQUEST_PROFILES:
+        request_profiles.popitem(last=False)
+
+
+def profile_requested(scope) -> bool:
+    """
+    The profile_requested function checks that the X-Profile header of a request
+    matches profiler_token. Requests are never profiled while the token is empty.
+
+    :param scope: The ASGI connection scope
+    :return: bool: True if the request is to be profiled
+    :doc-author: Ihor Voitiuk
+    """
+    token = Headers(scope=scope).get(PROFILE_HEADER)
+    return bool(
+        settings.profiler_token
+        and token
+        and hmac.compare_digest(token.encode(), settings.profiler_token.encode())
+    )
+
+
+class ProfilerMiddleware:
+    """
+    ASGI middleware that profiles the requests sent with the profiler_token in the
+    X-Profile header. The profile is kept under a new id, returned in the X-Profile-ID
+    header and read by admins from /api/profiler/requests/{profile_id}. The sampler
+    records all threads, so concurrent requests appear in the profile too.
+
+    Attributes:
+    - app (ASGIApp): The wrapped application.
+    :doc-author: Ihor Voitiuk
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        """
+        The __call__ function profiles the request if it is asked for.
+
+        :param self: Represent the instance of the class
+        :param scope: The ASGI connection scope
+        :param receive: The ASGI receive channel
+        :param send: The ASGI send channel
+        :return: None
+        :doc-author: Ihor Voitiuk
+        """
+        if (
+            scope["type"] != "http"
+            or not profile_requested(scope)
+            or not lock.acquire(blocking=False)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)[PROFILE_ID_HEADER] = profile_id
+            await send(message)
+
+        sampler = StackSampler()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            save_request_profile(profile_id, await asyncio.to_thread(sampler.stop))
+            lock.release()
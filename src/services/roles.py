@@ -1,3 +1,5 @@
+import logging
+
 from typing import List
 
 from fastapi import Request, Depends, HTTPException, status
@@ -6,6 +8,9 @@ from src.database.models import User, Role
 from src.services.auth import auth_service
 
 
+logger = logging.getLogger(__name__)
+
+
 class RolesAccess:
     def __init__(self, allowed_roles: List[Role]):
         self.allowed_roles = allowed_roles
@@ -15,7 +20,7 @@ class RolesAccess:
         request: Request,
         current_user: User = Depends(auth_service.get_current_user),
     ):
-        print(current_user.role, self.allowed_roles)
+        logger.debug("Role %s, allowed %s", current_user.role, self.allowed_roles)
         if current_user.role not in self.allowed_roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN, detail="Operation forbidden"
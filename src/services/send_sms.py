@@ -1,3 +1,4 @@
+from twilio.http.async_http_client import AsyncTwilioHttpClient
 from twilio.rest import Client
 
 from src.conf.config import settings
@@ -5,27 +6,61 @@ from src.conf.config import settings
 
 account_sid = settings.twilio_account_sid
 auth_token = settings.twilio_auth_token
-client = Client(account_sid, auth_token)
+client = None
+
+
+def get_client():
+    """
+    The get_client function returns the Twilio client. It is created on first use,
+    so its pooled aiohttp session belongs to the running event loop.
+
+    :return: A Twilio client with an asynchronous HTTP client
+    :doc-author: Ihor Voitiuk
+    """
+    global client
+    if client is None:
+        client = Client(
+            account_sid,
+            auth_token,
+            http_client=AsyncTwilioHttpClient(timeout=settings.sms_send_timeout),
+        )
+    return client
+
 
 async def send_sms(messages: str, from_number: str, to_number: str):
     """
     The send_sms function sends an SMS message to a given phone number.
-    
+    The request is made with Twilio's asynchronous client, so the event loop
+    is not blocked while waiting for the provider.
+
         Args:
             messages (str): The text of the message you want to send, up to 1600 characters in length.
-            from_number (str): A Twilio phone number in E.164 format, like +16175551212 or +442033890530. 
+            from_number (str): A Twilio phone number in E.164 format, like +16175551212 or +442033890530.
                 You can find your Twilio phone numbers here: https://twilio-python-client-demo/console/phone-numbers/incoming
-    
+
     :param messages: str: Pass the message to be sent
     :param from_number: str: Specify the twilio phone number that will be sending the sms message
     :param to_number: str: Specify the number to send the message to
-    :return: A string
+    :return: The Twilio sid of the message
     :doc-author: Ihor Voitiuk
     """
-    message = client.messages.create(
+    message = await get_client().messages.create_async(
         body=messages,
         from_=from_number,
         to=to_number,
     )
 
-    return "Message successfully sent to {to_number}"
+    return message.sid
+
+
+async def close():
+    """
+    The close function closes the pooled connections of the Twilio client.
+
+    :return: None
+    :doc-author: Ihor Voitiuk
+    """
+    global client
+    if client is not None:
+        await client.http_client.close()
+        client = None
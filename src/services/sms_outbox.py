@@ -0,0 +1,186 @@
+import asyncio
+import logging
+
+from src.conf.config import settings
+from src.database.db import DBSession
+from src.repository import sms as repository_sms
+from src.services import send_sms
+
+
+logger = logging.getLogger(__name__)
+
+
+dispatcher = None
+wakeup = asyncio.Event()
+next_send_at = 0.0
+
+
+def run_repository(function, *args):
+    """
+    The run_repository function runs a repository function with its own session.
+    It is called in the default executor, so the event loop is not blocked by the database.
+
+    :param function: The repository coroutine function
+    :param args: The arguments of the function, without the session
+    :return: The result of the function
+    :doc-author: Ihor Voitiuk
+    """
+    db = DBSession()
+    try:
+        return asyncio.run(function(*args, db))
+    finally:
+        db.close()
+
+
+async def repository(function, *args):
+    """
+    The repository function awaits a repository function in the default executor.
+
+    :param function: The repository coroutine function
+    :param args: The arguments of the function, without the session
+    :return: The result of the function
+    :doc-author: Ihor Voitiuk
+    """
+    return await asyncio.get_event_loop().run_in_executor(
+        None, run_repository, function, *args
+    )
+
+
+async def throttle():
+    """
+    The throttle function spaces the requests to the provider so that no more than
+    sms_rate_limit messages are sent per second.
+
+    :return: None
+    :doc-author: Ihor Voitiuk
+    """
+    global next_send_at
+    now = asyncio.get_event_loop().time()
+    next_send_at = max(next_send_at, now)
+    delay = next_send_at - now
+    next_send_at += 1 / settings.sms_rate_limit
+    if delay > 0:
+        await asyncio.sleep(delay)
+
+
+def pause(delay: float):
+    """
+    The pause function holds back all requests to the provider for delay seconds.
+
+    :param delay: float: Seconds to wait
+    :return: None
+    :doc-author: Ihor Voitiuk
+    """
+    global next_send_at
+    next_send_at = max(next_send_at, asyncio.get_event_loop().time() + delay)
+
+
+async def deliver(message, semaphore: asyncio.Semaphore):
+    """
+    The deliver function sends one claimed message to the provider. A failed message
+    is retried with exponential backoff until sms_max_attempts is reached, then it is
+    marked as failed and its quota is given back. When the provider answers with 429
+    all sending is paused and the message is put back without counting the attempt.
+
+    :param message: The claimed message
+    :param semaphore: asyncio.Semaphore: Limit the number of requests to the provider
+    :return: None
+    :doc-author: Ihor Voitiuk
+    """
+    async with semaphore:
+        await throttle()
+        try:
+            sid = await send_sms.send_sms(
+                message.message, message.from_phone, message.to_phone
+            )
+        except Exception as err:
+            error = str(err) or err.__class__.__name__
+            delay = settings.sms_retry_backoff**message.attempts
+            if getattr(err, "status", None) == 429:
+                pause(delay)
+                await repository(repository_sms.defer_sms, message.id, delay)
+            elif message.attempts >= settings.sms_max_attempts:
+                await repository(repository_sms.fail_sms, message, error)
+            else:
+                await repository(repository_sms.retry_sms, message.id, delay, error)
+            return
+
+    await repository(repository_sms.mark_sms_sent, message.id, sid)
+
+
+async def dispatch():
+    """
+    The dispatch function claims due messages from the outbox and delivers them
+    with at most sms_dispatch_concurrency requests to the provider at a time.
+    The lease covers the time the batch waits for the rate limit.
+
+    :return: int: The number of claimed messages
+    :doc-author: Ihor Voitiuk
+    """
+    lease = (
+        2 * settings.sms_send_timeout
+        + settings.sms_dispatch_batch // settings.sms_rate_limit
+    )
+    messages = await repository(
+        repository_sms.claim_sms, settings.sms_dispatch_batch, lease
+    )
+    semaphore = asyncio.Semaphore(settings.sms_dispatch_concurrency)
+    await asyncio.gather(*(deliver(message, semaphore) for message in messages))
+    return len(messages)
+
+
+async def run_dispatcher():
+    """
+    The run_dispatcher function dispatches the outbox until it is cancelled. It waits
+    sms_dispatch_interval seconds between empty batches or until notify is called.
+
+    :return: None
+    :doc-author: Ihor Voitiuk
+    """
+    while True:
+        wakeup.clear()
+        try:
+            if await dispatch():
+                continue
+        except Exception as err:
+            logger.exception("SMS dispatch failed: %s", err)
+        try:
+            await asyncio.wait_for(wakeup.wait(), settings.sms_dispatch_interval)
+        except asyncio.TimeoutError:
+            pass
+
+
+def notify():
+    """
+    The notify function wakes the dispatcher up after a message is added to the outbox.
+
+    :return: None
+    :doc-author: Ihor Voitiuk
+    """
+    wakeup.set()
+
+
+async def start():
+    """
+    The start function starts the dispatcher on the current event loop.
+
+    :return: None
+    :doc-author: Ihor Voitiuk
+    """
+    global dispatcher, wakeup
+    wakeup = asyncio.Event()
+    dispatcher = asyncio.create_task(run_dispatcher())
+
+
+async def stop():
+    """
+    The stop function stops the dispatcher and closes the provider client.
+    Messages that are not sent yet stay in the outbox.
+
+    :return: None
+    :doc-author: Ihor Voitiuk
+    """
+    if dispatcher is not None:
+        dispatcher.cancel()
+        await asyncio.gather(dispatcher, return_exceptions=True)
+    await send_sms.close()
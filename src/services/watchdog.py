@@ -0,0 +1,144 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+
+from src.conf.config import settings
+from src.services import metrics
+
+
+logger = logging.getLogger(__name__)
+
+monitor = None
+watcher = None
+# Updated by the monitor on the event loop, read by the watcher thread
+heartbeat = {"tick": None, "lag": 0.0}
+
+
+async def run_monitor():
+    """
+    The run_monitor function measures the event loop lag: how much later than asked
+    the loop wakes the monitor up every loop_lag_interval seconds. Every wake up is
+    also the heartbeat the watcher checks.
+
+    :return: None
+    :doc-author: Ihor Voitiuk
+    """
+    loop = asyncio.get_event_loop()
+    interval = settings.loop_lag_interval
+    while True:
+        heartbeat["tick"] = time.monotonic()
+        started = loop.time()
+        await asyncio.sleep(interval)
+        lag = max(loop.time() - started - interval, 0.0)
+        heartbeat["lag"] = lag
+        metrics.event_loop_lag.observe(lag)
+
+
+class BlockWatcher:
+    """
+    Thread that reports the event loop as blocked when the heartbeat of the monitor
+    is older than loop_block_threshold_ms. The stack of the event loop thread is
+    logged once per blocking call, so the call that holds the loop can be found.
+
+    Attributes:
+    - loop_thread_id (int): The id of the thread that runs the event loop.
+    :doc-author: Ihor Voitiuk
+    """
+
+    def __init__(self, loop_thread_id: int):
+        self.loop_thread_id = loop_thread_id
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="watchdog", daemon=True)
+
+    def check(self, reported):
+        """
+        The check function reports a blocked event loop.
+
+        :param self: Represent the instance of the class
+        :param reported: The heartbeat that was already reported
+        :return: The heartbeat that is reported now
+        :doc-author: Ihor Voitiuk
+        """
+        tick = heartbeat["tick"]
+        threshold = settings.loop_block_threshold_ms / 1000
+        # The monitor sleeps loop_lag_interval between two heartbeats
+        blocked = time.monotonic() - (tick or 0) - settings.loop_lag_interval
+        if tick is None or tick == reported or blocked < threshold:
+            return reported
+        frame = sys._current_frames().get(self.loop_thread_id)
+        stack = "".join(traceback.format_stack(frame)) if frame else ""
+        metrics.event_loop_blocked.inc()
+        logger.warning(
+            "Event loop blocked for more than %.0f ms:\n%s", blocked * 1000, stack
+        )
+        return tick
+
+    def run(self):
+        """
+        The run function checks the heartbeat until the watcher is stopped.
+
+        :param self: Represent the instance of the class
+        :return: None
+        :doc-author: Ihor Voitiuk
+        """
+        reported = None
+        interval = settings.loop_block_threshold_ms / 1000 / 2
+        while not self.stopped.wait(interval):
+            reported = self.check(reported)
+
+    def start(self):
+        """
+        The start function starts the watcher thread.
+
+        :param self: Represent the instance of the class
+        :return: None
+        :doc-author: Ihor Voitiuk
+        """
+        self.thread.start()
+
+    def stop(self):
+        """
+        The stop function stops the watcher thread.
+
+        :param self: Represent the instance of the class
+        :return: None
+        :doc-author: Ihor Voitiuk
+        """
+        self.stopped.set()
+        self.thread.join()
+
+
+async def start():
+    """
+    The start function starts the lag monitor on the current event loop and,
+    in debug mode, the watcher of blocking calls.
+
+    :return: None
+    :doc-author: Ihor Voitiuk
+    """
+    global monitor, watcher
+    monitor = asyncio.create_task(run_monitor())
+    if settings.debug:
+        watcher = BlockWatcher(threading.get_ident())
+        watcher.start()
+
+
+async def stop():
+    """
+    The stop function stops the lag monitor and the watcher.
+
+    :return: None
+    :doc-author: Ihor Voitiuk
+    """
+    global monitor, watcher
+    if watcher is not None:
+        watcher.stop()
+        watcher = None
+    if monitor is not None:
+        monitor.cancel()
+        await asyncio.gather(monitor, return_exceptions=True)
+        monitor = None
+    heartbeat["tick"] = None
@@ -5,6 +5,8 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # This adds the parent directory of the current file to the Python path
 
+from contextlib import contextmanager
+
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
@@ -13,12 +15,13 @@ from sqlalchemy.orm import sessionmaker
 from main import app
 from src.database.models import Base
 from src.database.db import get_db
+from src.services import metrics
 
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+engine = metrics.instrument_engine(
+    create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -52,6 +55,19 @@ def client(session):
     yield TestClient(app)
 
 
+@pytest.fixture
+def assert_max_queries():
+    # Fails the test if the with block runs more than max_queries statements
+
+    @contextmanager
+    def assert_max_queries(max_queries):
+        with metrics.count_queries(engine) as statements:
+            yield statements
+        assert len(statements) <= max_queries, "\n".join(statements)
+
+    return assert_max_queries
+
+
 @pytest.fixture(scope="module")
 def user():
     return {
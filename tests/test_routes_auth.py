@@ -36,16 +36,17 @@ def test_login_user_not_confirmed(client, user):
     assert data["detail"] == "Email not confirmed"
 
 
-def test_login_user(client, session, user):
+def test_login_user(client, session, user, assert_max_queries):
     get_current_user: User = (
         session.query(User).filter(User.email == user.get("email")).first()
     )
     get_current_user.confirmed = True
     session.commit()
-    response = client.post(
-        "/api/auth/login",
-        data={"username": user.get("email"), "password": user.get("password")},
-    )
+    with assert_max_queries(2):
+        response = client.post(
+            "/api/auth/login",
+            data={"username": user.get("email"), "password": user.get("password")},
+        )
     assert response.status_code == 200, response.text
     data = response.json()
     assert data["token_type"] == "bearer"
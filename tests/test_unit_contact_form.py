@@ -0,0 +1,160 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# This adds the parent directory of the current file to the Python path
+
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import fakeredis.aioredis
+from fastapi import HTTPException
+from redis.exceptions import ConnectionError
+from starlette.requests import Request
+
+from src.conf.config import settings
+from src.services.email import contact_form, outbox
+
+
+def make_request(forwarded: str = None, client: str = "127.0.0.1"):
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+    return Request({"type": "http", "headers": headers, "client": (client, 5000)})
+
+
+class TestContactForm(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.redis = MagicMock()
+        self.redis.pipeline.return_value.execute = AsyncMock(
+            return_value=[None, 2, None, 2]
+        )
+        self.redis.set = AsyncMock(return_value=True)
+        self.redis.delete = AsyncMock()
+        for patcher in (
+            patch.object(contact_form, "redis_client", self.redis),
+            patch.object(outbox, "queue", asyncio.Queue()),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.submission = ("user@example.com", "User", "+380639249861", "Hello")
+
+    def test_client_ip(self):
+        self.assertEqual(contact_form.client_ip(make_request()), "127.0.0.1")
+        # Without a trusted proxy the header is ignored
+        self.assertEqual(
+            contact_form.client_ip(make_request("10.0.0.1, 10.0.0.2")), "127.0.0.1"
+        )
+
+    def test_client_ip_behind_trusted_proxy(self):
+        with patch.object(settings, "trusted_proxies", "10.0.0.9, 10.0.0.8"):
+            # A spoofed address prepended by the client is skipped
+            request = make_request("1.1.1.1, 203.0.113.7, 10.0.0.8", "10.0.0.9")
+            self.assertEqual(contact_form.client_ip(request), "203.0.113.7")
+            request = make_request("1.1.1.1", "192.0.2.1")
+            self.assertEqual(contact_form.client_ip(request), "192.0.2.1")
+
+    def test_message_digest_normalizes(self):
+        self.assertEqual(
+            contact_form.message_digest(*self.submission),
+            contact_form.message_digest(
+                " USER@example.com", "user", "+380639249861", "hello  "
+            ),
+        )
+
+    async def test_check_submission(self):
+        self.assertTrue(
+            await contact_form.check_submission(make_request(), *self.submission)
+        )
+        pipe = self.redis.pipeline.return_value
+        self.redis.pipeline.assert_called_once_with(transaction=True)
+        pipe.set.assert_any_call(
+            "contact_form:throttle:ip:127.0.0.1",
+            0,
+            ex=settings.contact_form_window,
+            nx=True,
+        )
+        pipe.incr.assert_any_call("contact_form:throttle:ip:127.0.0.1")
+        pipe.incr.assert_any_call("contact_form:throttle:email:user@example.com")
+
+    async def test_forget_submission(self):
+        await contact_form.forget_submission(*self.submission)
+        self.redis.delete.assert_awaited_once_with(
+            contact_form.DUPLICATE_KEY.format(
+                contact_form.message_digest(*self.submission)
+            )
+        )
+
+    async def test_check_submission_duplicate(self):
+        self.redis.set.return_value = None
+        self.assertFalse(
+            await contact_form.check_submission(make_request(), *self.submission)
+        )
+
+    async def test_check_submission_throttled(self):
+        self.redis.pipeline.return_value.execute.return_value = [
+            None,
+            2,
+            None,
+            settings.contact_form_email_limit + 1,
+        ]
+        with self.assertRaises(HTTPException) as context:
+            await contact_form.check_submission(make_request(), *self.submission)
+        self.assertEqual(context.exception.status_code, 429)
+        self.redis.set.assert_not_awaited()
+
+    async def test_check_submission_shed(self):
+        with patch.object(settings, "contact_form_shed_depth", 0):
+            with self.assertRaises(HTTPException) as context:
+                await contact_form.check_submission(make_request(), *self.submission)
+        self.assertEqual(context.exception.headers["Retry-After"], "60")
+        self.redis.pipeline.assert_not_called()
+
+    async def test_check_submission_redis_down(self):
+        self.redis.pipeline.return_value.execute.side_effect = ConnectionError()
+        self.assertTrue(
+            await contact_form.check_submission(make_request(), *self.submission)
+        )
+
+
+class TestContactFormWindow(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.redis = fakeredis.aioredis.FakeRedis()
+        for patcher in (
+            patch.object(contact_form, "redis_client", self.redis),
+            patch.object(outbox, "queue", asyncio.Queue()),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.submission = ("user@example.com", "User", "+380639249861", "Hello")
+        self.ip_key = contact_form.THROTTLE_KEY.format("ip", "127.0.0.1")
+
+    async def test_window_starts_with_first_submission(self):
+        await contact_form.check_submission(make_request(), *self.submission)
+        await contact_form.check_submission(make_request(), *self.submission)
+        self.assertEqual(await self.redis.get(self.ip_key), b"2")
+        self.assertEqual(
+            await self.redis.ttl(self.ip_key), settings.contact_form_window
+        )
+
+    async def test_failed_expire_leaves_no_counter(self):
+        # The counter and its expiry are sent together, when the transaction
+        # fails neither is applied, so the sender is not blocked for good
+        pipeline = self.redis.pipeline
+
+        def failing_pipeline(*args, **kwargs):
+            pipe = pipeline(*args, **kwargs)
+            pipe.execute = AsyncMock(side_effect=ConnectionError())
+            return pipe
+
+        with patch.object(self.redis, "pipeline", failing_pipeline):
+            self.assertTrue(
+                await contact_form.check_submission(make_request(), *self.submission)
+            )
+        self.assertFalse(await self.redis.exists(self.ip_key))
+        await contact_form.check_submission(make_request(), *self.submission)
+        self.assertGreater(await self.redis.ttl(self.ip_key), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# This adds the parent directory of the current file to the Python path
+
+import io
+import hashlib
+import tempfile
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from starlette.datastructures import UploadFile
+
+from src.services.documents import cache
+
+
+class TestDocumentCache(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.redis = MagicMock()
+        self.redis.pipeline.return_value.execute = AsyncMock()
+        patcher = patch.object(cache, "redis_client", self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_make_key(self):
+        key = cache.make_key("compress_pdf", ["a"], {"compression": "remove images"})
+        self.assertEqual(
+            key, cache.make_key("compress_pdf", ["a"], {"compression": "remove images"})
+        )
+        self.assertNotEqual(
+            key,
+            cache.make_key("compress_pdf", ["a"], {"compression": "remove duplication"}),
+        )
+        self.assertNotEqual(key, cache.make_key("compress_pdf", ["b"], {}))
+
+    async def test_load_file(self):
+        spooled = tempfile.SpooledTemporaryFile(max_size=1)
+        spooled.write(b"%PDF-1.4")
+        upload = UploadFile(file=spooled, filename="test.pdf")
+        digest = await cache.load_file(upload)
+        self.assertEqual(digest, hashlib.sha256(b"%PDF-1.4").hexdigest())
+        self.assertIsInstance(upload.file, io.BytesIO)
+        self.assertEqual(await upload.read(), b"%PDF-1.4")
+
+    async def test_get_stats(self):
+        self.redis.pipeline.return_value.execute.return_value = [b"3", b"1", 2, b"10"]
+        stats = await cache.get_stats()
+        self.assertEqual(stats["hits"], 3)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["hit_ratio"], 0.75)
+        self.assertEqual(stats["size_bytes"], 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,181 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# This adds the parent directory of the current file to the Python path
+
+import asyncio
+import io
+import threading
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import fakeredis.aioredis
+from fastapi import HTTPException
+from starlette.datastructures import Headers, UploadFile
+
+from src.conf.config import settings
+from src.services.documents import jobs
+
+
+class TestDocumentJobs(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.redis = MagicMock()
+        self.redis.pipeline.return_value.execute = AsyncMock()
+        self.redis.llen = AsyncMock(return_value=0)
+        self.redis.rpush = AsyncMock(return_value=1)
+        self.redis.lrem = AsyncMock()
+        self.redis.delete = AsyncMock()
+        self.redis.hgetall = AsyncMock(return_value={})
+        patcher = patch.object(jobs, "redis_client", self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.upload = UploadFile(
+            file=io.BytesIO(b"%PDF-1.4"),
+            filename="test.pdf",
+            headers=Headers({"content-type": "application/pdf"}),
+        )
+
+    async def test_submit_job(self):
+        job_id = await jobs.submit_job(
+            "compress_pdf", [self.upload], {}, "test@example.com", 1
+        )
+        self.redis.rpush.assert_awaited_once_with(jobs.QUEUE_KEY, job_id)
+        self.redis.lrem.assert_not_awaited()
+
+    async def test_submit_job_queue_full(self):
+        self.redis.rpush.return_value = settings.document_jobs_queue_size + 1
+        with self.assertRaises(HTTPException) as context:
+            await jobs.submit_job(
+                "compress_pdf", [self.upload], {}, "test@example.com", 1
+            )
+        self.assertEqual(context.exception.status_code, 429)
+        self.redis.lrem.assert_awaited_once()
+        self.redis.delete.assert_awaited_once()
+
+    async def test_submit_job_queue_full_before_upload(self):
+        self.redis.llen.return_value = settings.document_jobs_queue_size
+        with self.assertRaises(HTTPException) as context:
+            await jobs.submit_job(
+                "compress_pdf", [self.upload], {}, "test@example.com", 1
+            )
+        self.assertEqual(context.exception.status_code, 429)
+        self.redis.pipeline.assert_not_called()
+        self.redis.rpush.assert_not_awaited()
+
+    async def test_get_job_not_found(self):
+        self.assertIsNone(await jobs.get_job("unknown"))
+
+
+class TestRecoverJobs(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.redis = fakeredis.aioredis.FakeRedis()
+        for module in (jobs, jobs.cache):
+            patcher = patch.object(module, "redis_client", self.redis)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.upload = UploadFile(
+            file=io.BytesIO(b"%PDF-1.4"),
+            filename="test.pdf",
+            headers=Headers({"content-type": "application/pdf"}),
+        )
+
+    async def take_job(self, worker_id: str, lease: bool, **fields) -> str:
+        job_id = await jobs.submit_job(
+            "compress_pdf", [self.upload], {}, "test@example.com", 1
+        )
+        await self.redis.hset(jobs.JOB_KEY.format(job_id), mapping=fields)
+        await self.redis.lmove(
+            jobs.QUEUE_KEY, jobs.PROCESSING_KEY.format(worker_id), "LEFT", "RIGHT"
+        )
+        await self.redis.sadd(jobs.WORKERS_KEY, worker_id)
+        if lease:
+            await self.redis.set(jobs.WORKER_KEY.format(worker_id), 1, ex=60)
+        return job_id
+
+    async def test_jobs_of_stopped_worker_are_queued_again(self):
+        job_id = await self.take_job("stopped", False, status="processing")
+        await jobs.recover_jobs()
+        self.assertEqual(
+            await self.redis.lrange(jobs.QUEUE_KEY, 0, -1), [job_id.encode()]
+        )
+        self.assertEqual(await self.redis.llen(jobs.PROCESSING_KEY.format("stopped")), 0)
+        self.assertFalse(await self.redis.sismember(jobs.WORKERS_KEY, "stopped"))
+        self.assertEqual((await jobs.get_job(job_id))["status"], "queued")
+
+    async def test_jobs_of_live_worker_are_kept(self):
+        # A long job or a job taken a moment ago keeps the lease of its worker
+        job_id = await self.take_job("live", True, status="queued")
+        await jobs.recover_jobs()
+        self.assertEqual(await self.redis.llen(jobs.QUEUE_KEY), 0)
+        self.assertEqual(
+            await self.redis.lrange(jobs.PROCESSING_KEY.format("live"), 0, -1),
+            [job_id.encode()],
+        )
+
+    async def test_job_fails_after_max_attempts(self):
+        job_id = await self.take_job(
+            "stopped", False, attempts=settings.document_jobs_max_attempts
+        )
+        await jobs.process_job(job_id)
+        job = await jobs.get_job(job_id)
+        self.assertEqual(job["status"], "failed")
+        self.assertFalse(await self.redis.exists(jobs.INPUT_KEY.format(job_id)))
+
+    async def test_cancelled_job_is_recovered(self):
+        job_id = await jobs.submit_job(
+            "compress_pdf", [self.upload], {}, "test@example.com", 1
+        )
+        started = threading.Event()
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        def blocked_job(kind, uploads, options):
+            started.set()
+            release.wait(5)
+            raise RuntimeError("released")
+
+        with patch.object(jobs, "run_job", blocked_job):
+            worker = asyncio.create_task(jobs.run_worker())
+            self.assertTrue(await asyncio.to_thread(started.wait, 5))
+            worker.cancel()
+            await asyncio.gather(worker, return_exceptions=True)
+
+        self.assertTrue(await self.redis.exists(jobs.INPUT_KEY.format(job_id)))
+        await jobs.recover_jobs()
+        self.assertEqual(
+            await self.redis.lrange(jobs.QUEUE_KEY, 0, -1), [job_id.encode()]
+        )
+        self.assertEqual((await jobs.get_job(job_id))["status"], "queued")
+
+        await self.redis.lpop(jobs.QUEUE_KEY)
+        with patch.object(jobs, "run_job", return_value=(b"%PDF-1.4", {})), patch.object(
+            jobs.repository_documents, "update_documents_count", AsyncMock()
+        ), patch.object(jobs, "DBSession"), patch.object(jobs, "metering"):
+            await jobs.process_job(job_id)
+        self.assertEqual((await jobs.get_job(job_id))["status"], "done")
+        self.assertEqual(await jobs.get_job_result(job_id), b"%PDF-1.4")
+        self.assertFalse(await self.redis.exists(jobs.INPUT_KEY.format(job_id)))
+
+    async def test_worker_moves_job_to_its_processing_list(self):
+        await self.redis.rpush(jobs.QUEUE_KEY, "job")
+        seen = []
+
+        async def process_job(job_id):
+            (worker_id,) = await self.redis.smembers(jobs.WORKERS_KEY)
+            processing_key = jobs.PROCESSING_KEY.format(worker_id.decode())
+            seen.append(await self.redis.lrange(processing_key, 0, -1))
+            raise asyncio.CancelledError
+
+        with patch.object(jobs, "process_job", process_job):
+            with self.assertRaises(asyncio.CancelledError):
+                await jobs.run_worker()
+        self.assertEqual(seen, [[b"job"]])
+        # A cancelled worker releases its lease and leaves the job to be recovered
+        await jobs.recover_jobs()
+        self.assertEqual(await self.redis.lrange(jobs.QUEUE_KEY, 0, -1), [b"job"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# This adds the parent directory of the current file to the Python path
+
+import asyncio
+import time
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from redis.exceptions import ConnectionError
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool, StaticPool
+
+from src.routes import health as health_routes
+from src.services import health
+from src.services.email import outbox
+
+
+class TestHealth(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        engine = create_engine(
+            "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+        )
+        self.redis = MagicMock()
+        self.redis.ping = AsyncMock(return_value=True)
+        for patcher in (
+            patch.object(health, "DBSession", sessionmaker(bind=engine)),
+            patch.object(health, "redis_client", self.redis),
+            patch.object(health, "status", dict(health.status)),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def test_probe_ready(self):
+        await health.probe()
+        result = health.readiness()
+        self.assertTrue(result["ready"])
+        self.assertFalse(result["stale"])
+        self.assertEqual(
+            {name: check["status"] for name, check in result["checks"].items()},
+            {"database": "ok", "redis": "ok", "mail": "ok", "sms": "ok"},
+        )
+
+    async def test_probe_redis_down(self):
+        self.redis.ping.side_effect = ConnectionError("Connection refused")
+        await health.probe()
+        result = health.readiness()
+        self.assertFalse(result["ready"])
+        self.assertEqual(result["checks"]["redis"]["error"], "ConnectionError")
+        self.assertNotIn("Connection refused", str(result))
+        self.assertEqual(result["checks"]["database"]["status"], "ok")
+
+    async def test_full_outbox_is_ready(self):
+        queue = asyncio.Queue(maxsize=1)
+        queue.put_nowait(None)
+        with patch.object(outbox, "queue", queue):
+            await health.probe()
+            result = health.readiness()
+        self.assertTrue(result["ready"])
+        self.assertEqual(result["mail_outbox"], {"queued": 1, "max_size": 1})
+
+    async def test_stale_status_is_not_ready(self):
+        await health.probe()
+        health.status["checked_at"] = time.time() - 60
+        result = health.readiness()
+        self.assertTrue(result["stale"])
+        self.assertFalse(result["ready"])
+
+    async def test_readiness_endpoint_does_no_io(self):
+        app = FastAPI()
+        app.include_router(health_routes.router, prefix="/api")
+        client = TestClient(app)
+        self.assertEqual(client.get("/api/health/live").json(), {"status": "ok"})
+        self.assertEqual(client.get("/api/health/ready").status_code, 503)
+
+        await health.probe()
+        self.redis.ping.reset_mock()
+        response = client.get("/api/health/ready")
+        self.assertEqual(response.status_code, 200)
+        self.redis.ping.assert_not_called()
+
+    def test_pool_status(self):
+        engine = create_engine("sqlite://", poolclass=QueuePool, pool_size=2, max_overflow=2)
+        with patch.object(health, "engine", engine), engine.connect():
+            self.assertEqual(
+                health.pool_status(),
+                {"size": 2, "checked_out": 1, "overflow": 0, "saturation": 0.25},
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
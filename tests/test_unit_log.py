@@ -0,0 +1,87 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# This adds the parent directory of the current file to the Python path
+
+import json
+import logging
+import unittest
+from unittest.mock import patch
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.conf.config import settings
+from src.services import log
+
+
+def make_record(level=logging.INFO, msg="Hello %s", args=("world",)):
+    return logging.LogRecord("test", level, __file__, 1, msg, args, None)
+
+
+class TestLog(unittest.TestCase):
+    def test_json_formatter(self):
+        record = make_record()
+        record.request_id = "abc"
+        entry = json.loads(log.JsonFormatter().format(record))
+        self.assertEqual(
+            {key: entry[key] for key in ("level", "logger", "request_id", "message")},
+            {"level": "INFO", "logger": "test", "request_id": "abc", "message": "Hello world"},
+        )
+
+    def test_filter_samples_debug_records_per_request(self):
+        context_filter = log.ContextFilter()
+        self.assertTrue(context_filter.filter(make_record()))
+
+        token = log.debug_sampled.set(False)
+        try:
+            self.assertTrue(context_filter.filter(make_record(logging.WARNING)))
+            self.assertFalse(context_filter.filter(make_record(logging.DEBUG)))
+        finally:
+            log.debug_sampled.reset(token)
+
+        with patch.object(settings, "log_debug_sample_rate", 1):
+            self.assertTrue(context_filter.filter(make_record(logging.DEBUG)))
+        with patch.object(settings, "log_debug_sample_rate", 0):
+            self.assertFalse(context_filter.filter(make_record(logging.DEBUG)))
+
+    def test_request_id_middleware(self):
+        app = FastAPI()
+        app.add_middleware(log.RequestIdMiddleware)
+        context_filter = log.ContextFilter()
+
+        @app.get("/")
+        def read_root():
+            record = make_record()
+            context_filter.filter(record)
+            return {"request_id": record.request_id}
+
+        client = TestClient(app)
+        response = client.get("/", headers={"X-Request-ID": "abc"})
+        self.assertEqual(response.headers["X-Request-ID"], "abc")
+        self.assertEqual(response.json(), {"request_id": "abc"})
+
+        response = client.get("/")
+        self.assertEqual(len(response.headers["X-Request-ID"]), 32)
+        self.assertEqual(response.json()["request_id"], response.headers["X-Request-ID"])
+
+    def test_records_are_written_by_listener(self):
+        handler = logging.Handler()
+        records = []
+        handler.emit = records.append
+        self.addCleanup(logging.getLogger().setLevel, logging.getLogger().level)
+        with patch("logging.StreamHandler", return_value=handler):
+            log.setup()
+        try:
+            logging.getLogger("test").warning("Hello %s", "world")
+        finally:
+            log.shutdown()
+        self.assertEqual([record.getMessage() for record in records], ["Hello world"])
+        self.assertIsNone(records[0].request_id)
+        self.assertNotIn(log.queue_handler, logging.getLogger().handlers)
+
+
+if __name__ == "__main__":
+    unittest.main()
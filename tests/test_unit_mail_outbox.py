@@ -0,0 +1,172 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# This adds the parent directory of the current file to the Python path
+
+import asyncio
+import unittest
+from email.message import EmailMessage
+from unittest.mock import AsyncMock, patch
+
+from src.conf.config import settings
+from src.services.email import mail, outbox
+
+
+def make_message(subject: str = "Contact form"):
+    message = EmailMessage()
+    message["Subject"] = subject
+    message["From"] = "app@example.com"
+    message["To"] = "admin@example.com"
+    message.set_content("Hello")
+    return message
+
+
+class TestMailOutbox(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        for patcher in (
+            patch.object(outbox, "queue", asyncio.Queue(maxsize=2)),
+            patch.object(outbox, "smtp", None),
+            patch.object(outbox, "sender", None),
+            patch.object(outbox, "in_flight", []),
+            patch.object(outbox, "retries", {}),
+            patch.object(settings, "mail_retry_backoff", 0),
+            patch.object(settings, "mail_max_attempts", 2),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def test_contact_form_is_queued(self):
+        queued = await mail.send_email_contact_form(
+            "user@example.com", "User", "+380639249861", "Hello"
+        )
+        self.assertTrue(queued)
+        message, attempts = outbox.queue.get_nowait()
+        self.assertEqual((message["Subject"], attempts), ("Contact form", 0))
+        self.assertIn("+380639249861", message.get_content())
+
+    async def test_rendered_mime_message(self):
+        await mail.send_email("user@example.com", "User", "http://localhost/")
+        message, _ = outbox.queue.get_nowait()
+        self.assertEqual(message["Subject"], "Confirm your email ")
+        self.assertEqual(message["To"], "user@example.com")
+        self.assertEqual(
+            message["From"], f"{outbox.conf.MAIL_FROM_NAME} <{outbox.conf.MAIL_FROM}>"
+        )
+        self.assertIsNotNone(message["Date"])
+        self.assertIsNotNone(message["Message-ID"])
+        self.assertEqual(message.get_content_type(), "text/html")
+        self.assertEqual(message.get_content_charset(), "utf-8")
+        self.assertIn("http://localhost/api/auth/confirmed_email/", message.get_content())
+
+    async def test_enqueue_full_outbox(self):
+        self.assertTrue(outbox.enqueue(make_message()))
+        self.assertTrue(outbox.enqueue(make_message()))
+        self.assertFalse(outbox.enqueue(make_message()))
+
+    async def test_send_batch_retries(self):
+        client = AsyncMock()
+        client.send_message.side_effect = [OSError("connection lost"), None]
+        with patch.object(outbox, "connect", AsyncMock(return_value=client)):
+            await outbox.send_batch([(make_message(), 0)])
+            await asyncio.sleep(0.01)
+            batch = [outbox.queue.get_nowait()]
+            self.assertEqual(batch[0][1], 1)
+            await outbox.send_batch(batch)
+        self.assertEqual(client.send_message.await_count, 2)
+        self.assertTrue(outbox.queue.empty())
+
+    async def test_send_batch_drops_after_max_attempts(self):
+        client = AsyncMock()
+        client.send_message.side_effect = OSError("connection lost")
+        with patch.object(outbox, "connect", AsyncMock(return_value=client)):
+            await outbox.send_batch([(make_message(), 1)])
+            await asyncio.sleep(0.01)
+        self.assertTrue(outbox.queue.empty())
+
+    async def test_send_batch_drops_broken_message(self):
+        client = AsyncMock()
+        client.send_message.side_effect = [ValueError("bad header"), None]
+        with patch.object(outbox, "connect", AsyncMock(return_value=client)):
+            with self.assertLogs(outbox.logger, "ERROR"):
+                await outbox.send_batch([(make_message(), 0), (make_message(), 0)])
+        self.assertEqual(client.send_message.await_count, 2)
+        self.assertTrue(outbox.queue.empty())
+        self.assertFalse(outbox.retries)
+
+    async def test_stop_sends_retries_and_queue_once(self):
+        client = AsyncMock()
+        client.send_message.side_effect = OSError("connection lost")
+        with patch.object(settings, "mail_retry_backoff", 60), patch.object(
+            settings, "mail_max_attempts", 5
+        ), patch.object(outbox, "connect", AsyncMock(return_value=client)):
+            await outbox.send_batch([(make_message("retried"), 0)])
+            self.assertEqual(len(outbox.retries), 1)
+            outbox.enqueue(make_message("queued"))
+            with self.assertLogs(outbox.logger) as logs:
+                await outbox.stop()
+        self.assertEqual(client.send_message.await_count, 3)
+        self.assertFalse(outbox.retries)
+        self.assertTrue(outbox.queue.empty())
+        dropped = [line for line in logs.output if "is dropped" in line]
+        self.assertEqual(len(dropped), 2)
+
+
+class TestMailTemplates(unittest.TestCase):
+    def test_templates_are_compiled_once(self):
+        mail.load_templates()
+        self.assertEqual(set(mail.templates), set(mail.TEMPLATE_NAMES))
+        with patch.object(mail.environment, "get_template") as get_template:
+            template = mail.get_template("email_template.html")
+        get_template.assert_not_called()
+        self.assertIs(template, mail.templates["email_template.html"])
+
+
+class TestMailOutboxSMTP(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        try:
+            from aiosmtpd.controller import Controller
+        except ImportError:
+            self.skipTest("aiosmtpd is not installed")
+
+        class Handler:
+            def __init__(self):
+                self.peers = []
+
+            async def handle_DATA(self, server, session, envelope):
+                self.peers.append(session.peer)
+                return "250 OK"
+
+        self.handler = Handler()
+        self.controller = Controller(self.handler, hostname="127.0.0.1", port=0)
+        self.controller.start()
+        self.addCleanup(self.controller.stop)
+        conf = outbox.conf.copy(
+            update={
+                "MAIL_SERVER": "127.0.0.1",
+                "MAIL_PORT": self.controller.server.sockets[0].getsockname()[1],
+                "MAIL_SSL_TLS": False,
+                "USE_CREDENTIALS": False,
+            }
+        )
+        for patcher in (
+            patch.object(outbox, "conf", conf),
+            patch.object(outbox, "queue", asyncio.Queue()),
+            patch.object(outbox, "smtp", None),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def test_sender_reuses_connection(self):
+        await outbox.start()
+        for _ in range(5):
+            outbox.enqueue(make_message())
+        while len(self.handler.peers) < 5:
+            await asyncio.sleep(0.01)
+        await outbox.stop()
+        self.assertEqual(len(set(self.handler.peers)), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# This adds the parent directory of the current file to the Python path
+
+import unittest
+from datetime import date
+from unittest.mock import patch
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.database.models import Base, User
+from src.repository.usage import get_usage
+from src.services import metering
+
+
+class TestMetering(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        engine = create_engine(
+            "sqlite://",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+        )
+        Base.metadata.create_all(bind=engine)
+        self.Session = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+        with self.Session() as db:
+            db.add(User(id=1, email="test@example.com", password="x", avatar="x"))
+            db.commit()
+        patcher = patch.object(metering, "DBSession", self.Session)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        metering.buffer.clear()
+
+    async def test_flush_aggregates_usage(self):
+        metering.record(1, "documents", 3)
+        metering.record(1, "documents")
+        metering.record(1, "sms")
+        await metering.flush()
+        metering.record(1, "sms")
+        await metering.flush()
+
+        self.assertFalse(metering.buffer)
+        with self.Session() as db:
+            rows = await get_usage(1, date.today(), date.today(), db)
+        self.assertEqual(
+            [(row.kind, row.count) for row in rows], [("documents", 4), ("sms", 2)]
+        )
+
+    async def test_flush_keeps_usage_on_error(self):
+        metering.record(1, "documents")
+        with patch.object(metering, "write_usage", side_effect=Exception("down")):
+            await metering.flush()
+        self.assertEqual(sum(metering.buffer.values()), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
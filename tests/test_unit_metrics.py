@@ -0,0 +1,123 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# This adds the parent directory of the current file to the Python path
+
+import unittest
+from unittest.mock import patch
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+from src.conf.config import settings
+from src.services import metrics
+
+
+class TestMetrics(unittest.TestCase):
+    def test_counter_render(self):
+        counter = metrics.Counter("test_total", "Test counter.", ("kind",))
+        metrics.registry.remove(counter)
+        counter.inc('say "hi"')
+        counter.inc('say "hi"', amount=2)
+        self.assertEqual(
+            counter.render(),
+            "# HELP test_total Test counter.\n"
+            "# TYPE test_total counter\n"
+            'test_total{kind="say \\"hi\\""} 3',
+        )
+
+    def test_histogram_render(self):
+        histogram = metrics.Histogram("test_seconds", "Test.", buckets=(0.1, 1.0))
+        metrics.registry.remove(histogram)
+        for value in (0.05, 0.1, 0.5, 2.0):
+            histogram.observe(value)
+        lines = histogram.render().splitlines()[2:]
+        self.assertEqual(
+            lines,
+            [
+                'test_seconds_bucket{le="0.1"} 2',
+                'test_seconds_bucket{le="1.0"} 3',
+                'test_seconds_bucket{le="+Inf"} 4',
+                "test_seconds_sum 2.65",
+                "test_seconds_count 4",
+            ],
+        )
+
+    def test_middleware_records_requests(self):
+        engine = metrics.instrument_engine(
+            create_engine(
+                "sqlite://",
+                connect_args={"check_same_thread": False},
+                poolclass=StaticPool,
+            )
+        )
+        app = FastAPI()
+        app.add_middleware(metrics.MetricsMiddleware)
+
+        @app.get("/items/{item_id}")
+        def read_item(item_id: int):
+            with engine.connect() as conn:
+                for _ in range(3):
+                    conn.execute(text("SELECT 1"))
+            return {"id": item_id}
+
+        client = TestClient(app)
+        for item_id in range(2):
+            response = client.get(f"/items/{item_id}")
+        self.assertIn("performance", response.headers)
+
+        labels = ("GET", "/items/{item_id}", 200)
+        self.assertEqual(metrics.http_requests.values[labels], 2)
+        self.assertEqual(metrics.http_requests_in_flight.values[("GET",)], 0)
+        counts, total = metrics.db_queries_per_request.values[("/items/{item_id}",)]
+        self.assertEqual((sum(counts), total), (2, 6))
+
+    def test_server_timing_and_slow_queries(self):
+        engine = metrics.instrument_engine(
+            create_engine(
+                "sqlite://",
+                connect_args={"check_same_thread": False},
+                poolclass=StaticPool,
+            )
+        )
+        app = FastAPI()
+        app.add_middleware(metrics.MetricsMiddleware)
+
+        @app.get("/slow/{item_id}")
+        def read_slow(item_id: int):
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+                conn.execute(text("SELECT 2"))
+            return {"id": item_id}
+
+        client = TestClient(app)
+        with patch.object(settings, "debug", True), patch.object(
+            settings, "slow_query_ms", 0
+        ), self.assertLogs("src.services.metrics", "WARNING") as logs:
+            response = client.get("/slow/1")
+        self.assertRegex(
+            response.headers["server-timing"],
+            r'^db;dur=[\d.]+;desc="2 queries", app;dur=[\d.]+$',
+        )
+        self.assertEqual(len(logs.output), 2)
+        self.assertIn("/slow/{item_id}: SELECT 2", logs.output[1])
+
+        response = client.get("/slow/2")
+        self.assertNotIn("server-timing", response.headers)
+
+    def test_count_queries(self):
+        engine = create_engine("sqlite://")
+        with metrics.count_queries(engine) as statements:
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 2"))
+        self.assertEqual(statements, ["SELECT 1"])
+
+
+if __name__ == "__main__":
+    unittest.main()
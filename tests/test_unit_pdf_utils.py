@@ -0,0 +1,104 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# This adds the parent directory of the current file to the Python path
+
+import io
+import unittest
+
+from PIL import Image
+from PyPDF2 import PdfReader
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+from fastapi import HTTPException
+from starlette.datastructures import Headers, UploadFile
+
+from src.services.documents import pdf_utils
+
+
+def make_upload(data, filename="scan.pdf", content_type="application/pdf"):
+    return UploadFile(
+        file=io.BytesIO(data),
+        filename=filename,
+        headers=Headers({"content-type": content_type}),
+    )
+
+
+def make_scanned_pdf(width=1700, height=2200):
+    image = Image.effect_noise((width, height), 40).convert("RGB")
+    output = io.BytesIO()
+    c = canvas.Canvas(output, pagesize=letter)
+    c.drawImage(ImageReader(image), 0, 0, *letter)
+    c.showPage()
+    c.save()
+    return output.getvalue()
+
+
+class TestPdfUtils(unittest.IsolatedAsyncioTestCase):
+    async def test_lossy_compression_downsamples_images(self):
+        data = make_scanned_pdf()
+        upload = make_upload(data)
+
+        (
+            result,
+            initial_file_size,
+            final_file_size,
+            percentage_reduction,
+        ) = await pdf_utils.compress_pdf(upload, "lossy compression", dpi=100)
+
+        self.assertLess(len(result), len(data))
+        self.assertLess(final_file_size, initial_file_size)
+        self.assertGreater(percentage_reduction, 0)
+
+        page = PdfReader(io.BytesIO(result)).pages[0]
+        x_object = list(page["/Resources"]["/XObject"].values())[0].get_object()
+        self.assertEqual(x_object["/Filter"], "/DCTDecode")
+        self.assertEqual(x_object["/Width"], 850)
+        self.assertEqual(x_object["/Height"], 1100)
+
+    async def test_lossy_compression_keeps_low_resolution_images(self):
+        data = make_scanned_pdf(width=170, height=220)
+        upload = make_upload(data)
+
+        result, *_ = await pdf_utils.compress_pdf(upload, "lossy compression")
+
+        page = PdfReader(io.BytesIO(result)).pages[0]
+        x_object = list(page["/Resources"]["/XObject"].values())[0].get_object()
+        self.assertEqual(x_object["/Width"], 170)
+        self.assertEqual(x_object["/Height"], 220)
+
+    async def test_file_indicators_use_streamed_size(self):
+        upload = make_upload(b"x" * 2048)
+        upload.size = 2048
+        upload.file.seek(0)
+
+        indicators = await pdf_utils.operation_with_file_indicators(upload, b"x" * 512)
+
+        self.assertEqual(indicators, (2048 / 1048576, 512 / 1048576, 75))
+        self.assertEqual(upload.file.tell(), 0)
+
+    async def test_check_valid_file_sniffs_content(self):
+        upload = make_upload(b"GIF89a fake pdf", content_type="application/pdf")
+
+        with self.assertRaises(HTTPException) as context:
+            await pdf_utils.check_valid_file(upload, "pdf")
+        self.assertEqual(context.exception.status_code, 400)
+
+        png = make_upload(b"\x89PNG\r\n\x1a\n...", content_type="text/plain")
+        await pdf_utils.check_valid_file(png, "image")
+        self.assertEqual(png.file.tell(), 0)
+
+    async def test_check_valid_file_too_large(self):
+        upload = make_upload(b"%PDF-1.4")
+        upload.size = pdf_utils.MAX_PDF_SIZE + 1
+
+        with self.assertRaises(HTTPException) as context:
+            await pdf_utils.check_valid_file(upload, "pdf")
+        self.assertEqual(context.exception.status_code, 413)
+
+
+if __name__ == "__main__":
+    unittest.main()
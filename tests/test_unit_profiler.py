@@ -0,0 +1,89 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# This adds the parent directory of the current file to the Python path
+
+import time
+import unittest
+from unittest.mock import patch
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.conf.config import settings
+from src.routes import profiler as profiler_routes
+from src.services import log, profiler
+
+
+def busy_loop(seconds: float):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def make_app():
+    app = FastAPI()
+    app.add_middleware(profiler.ProfilerMiddleware)
+    app.add_middleware(log.RequestIdMiddleware)
+    app.include_router(profiler_routes.router, prefix="/api")
+    app.dependency_overrides[profiler_routes.access_profile] = lambda: None
+
+    @app.get("/busy")
+    def busy():
+        busy_loop(0.1)
+        return {}
+
+    return app
+
+
+class TestProfiler(unittest.TestCase):
+    def setUp(self):
+        patcher = patch.object(profiler, "request_profiles", profiler.OrderedDict())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_sampler_collapses_stacks(self):
+        sampler = profiler.StackSampler(0.001)
+        sampler.start()
+        busy_loop(0.1)
+        lines = sampler.stop().splitlines()
+        stack, count = lines[0].rsplit(" ", 1)
+        self.assertTrue(stack.startswith("MainThread;"))
+        self.assertIn(";busy_loop (tests/test_unit_profiler.py:", stack)
+        self.assertGreater(int(count), 10)
+        self.assertNotIn("profiler;", "".join(lines))
+
+    def test_profile_endpoint(self):
+        client = TestClient(make_app())
+        response = client.get("/api/profiler/", params={"seconds": 0.05})
+        self.assertEqual(response.status_code, 200, response.text)
+        self.assertRegex(response.text.splitlines()[0], r"^\S.* \d+$")
+
+        with profiler.lock:
+            response = client.get("/api/profiler/", params={"seconds": 0.05})
+        self.assertEqual(response.status_code, 409)
+
+    def test_profile_request_with_header(self):
+        client = TestClient(make_app())
+        with patch.object(settings, "profiler_token", ""):
+            response = client.get("/busy", headers={"X-Profile": ""})
+        self.assertNotIn("X-Profile-ID", response.headers)
+
+        with patch.object(settings, "profiler_token", "secret"):
+            response = client.get("/busy", headers={"X-Profile": "guess"})
+            self.assertNotIn("X-Profile-ID", response.headers)
+            response = client.get(
+                "/busy", headers={"X-Profile": "secret", "X-Request-ID": "chosen"}
+            )
+            client.get("/busy")
+        profile_id = response.headers["X-Profile-ID"]
+        self.assertNotEqual(profile_id, "chosen")
+        self.assertEqual(list(profiler.request_profiles), [profile_id])
+        response = client.get(f"/api/profiler/requests/{profile_id}")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("busy_loop", response.text)
+
+if __name__ == "__main__":
+    unittest.main()
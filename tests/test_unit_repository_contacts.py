@@ -6,15 +6,22 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 # This adds the parent directory of the current file to the Python path
 
 
+import json
 import unittest
 import datetime
 from unittest.mock import MagicMock
 
-from sqlalchemy.orm import Session
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
 
-from src.database.models import Contact
-from src.schemas import ContactModel
+from src.database.models import Base, Contact
+from src.routes.contacts import rows_response
+from src.services.export import export_contacts_to_csv, export_contacts_to_json
+from src.schemas import ContactModel, ContactResponse
 from src.repository.contacts import (
+    EXPORT_COLUMNS,
+    RESPONSE_COLUMNS,
     get_contact_by_id,
     get_contacts,
     create_contact,
@@ -147,6 +154,24 @@ class TestNotes(unittest.IsolatedAsyncioTestCase):
 
         self.assertEqual(contacts_list[1], contacts)
 
+    async def test_search_contacts_columns(self):
+        self.session.query().filter().all.return_value = []
+        self.session.query.reset_mock()
+        await search_contacts(
+            db=self.session,
+            last_name="doe",
+            email="JANE@example.com",
+            columns=RESPONSE_COLUMNS,
+        )
+        self.session.query.assert_called_once_with(*RESPONSE_COLUMNS)
+        conditions = self.session.query().filter.call_args.args
+        self.assertEqual(len(conditions), 2)
+        self.assertEqual(conditions[0].right.value, "Doe")
+        self.assertEqual(conditions[1].right.value, "jane@example.com")
+
+    async def test_search_contacts_without_parameters(self):
+        self.assertIsNone(await search_contacts(db=self.session))
+
     async def test_birthday_contacts(self):
         contacts_list = [
             Contact(
@@ -184,5 +209,44 @@ class TestNotes(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(contacts[-1].birthday, end_day)
 
 
+class TestContactRows(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=engine)
+        self.session = sessionmaker(bind=engine)()
+        self.addCleanup(self.session.close)
+        self.session.add(
+            Contact(
+                first_name="Max",
+                last_name="Prosck",
+                email="max@gmail.com",
+                phone_number="+380735637222",
+                birthday=datetime.date(2000, 4, 22),
+                description="Hello World! Ehoo...",
+                created_at=datetime.datetime(2023, 5, 1, 12, 30, 15, 250),
+            )
+        )
+        self.session.commit()
+
+    async def test_rows_response_matches_response_model(self):
+        contacts = await get_contacts(10, 0, self.session)
+        rows = await get_contacts(10, 0, self.session, columns=RESPONSE_COLUMNS)
+        expected = jsonable_encoder(
+            [ContactResponse.from_orm(contact) for contact in contacts]
+        )
+        self.assertEqual(json.loads(rows_response(rows).body), expected)
+
+    async def test_export_columns(self):
+        rows = await get_contacts(10, 0, self.session, columns=EXPORT_COLUMNS)
+        self.assertEqual(
+            rows[0]._fields, ("first_name", "last_name", "email", "phone_number")
+        )
+        self.assertEqual(len(self.session.identity_map), 0)
+
+        contacts = await get_contacts(10, 0, self.session)
+        self.assertEqual(export_contacts_to_csv(rows), export_contacts_to_csv(contacts))
+        self.assertEqual(export_contacts_to_json(rows), export_contacts_to_json(contacts))
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -5,13 +5,16 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # This adds the parent directory of the current file to the Python path
 
+import asyncio
 import datetime
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import MagicMock
 
-from sqlalchemy.orm import Session
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
 import pytest
 
-from src.database.models import User
+from src.database.models import Base, Document, User
 from src.repository.documents import get_user_by_email, update_documents_count
 
 
@@ -45,10 +48,34 @@ async def test_get_user_by_email(session, user):
 @pytest.mark.asyncio
 async def test_update_documents_count(session, user):
     email = "TestEmail@example.com"
-    session.query().filter().first.return_value = user
+    session.execute().scalar_one_or_none.return_value = 2
     document_count = await update_documents_count(email, 2, db=session)
     assert document_count == 2
 
 
+def test_update_documents_count_concurrent(tmp_path, user):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'documents.db'}",
+        connect_args={"check_same_thread": False, "timeout": 30},
+    )
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+    email = user.email
+    with Session() as db:
+        db.add(user)
+        db.commit()
+
+    def upload(times):
+        with Session() as db:
+            for _ in range(times):
+                asyncio.run(update_documents_count(email, 1, db))
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(upload, [25] * 8))
+
+    with Session() as db:
+        assert db.query(Document.total_count).scalar() == 200
+
+
 if __name__ == "__main__":
     pytest.main()
@@ -0,0 +1,239 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# This adds the parent directory of the current file to the Python path
+
+import asyncio
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from src.conf.config import settings
+from src.database.models import (
+    Base,
+    Contact,
+    MessageSMS,
+    TotalSMS,
+    User,
+    UserTotalSMS,
+)
+from src.repository.sms import (
+    create_broadcast,
+    create_sms,
+    get_broadcast_progress,
+    get_sms_history,
+    release_sms,
+    reserve_sms,
+)
+from src.schemas import SendSMSModel, SMSBroadcastModel
+
+
+@pytest.fixture
+def Session(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'sms.db'}",
+        connect_args={"check_same_thread": False, "timeout": 30},
+    )
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+    with Session() as db:
+        for user_id in range(1, 5):
+            db.add(
+                User(
+                    id=user_id,
+                    email=f"user{user_id}@example.com",
+                    password="secret",
+                    avatar="http://avatars.example.com/profile/1",
+                )
+            )
+        db.commit()
+    return Session
+
+
+def test_reserve_sms_concurrent(Session):
+    def send(user_id):
+        with Session() as db:
+            total_sms = asyncio.run(reserve_sms(user_id, db))
+            db.commit()
+            return total_sms
+
+    with patch.object(settings, "sms_limit", 30), patch.object(
+        settings, "sms_user_limit", 10
+    ), ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(send, [1, 2, 3, 4] * 15))
+
+    assert len([result for result in results if not isinstance(result, str)]) == 30
+    with Session() as db:
+        assert db.query(TotalSMS.total_send_sms).scalar() == 30
+        user_totals = [row.total_send_sms for row in db.query(UserTotalSMS)]
+        assert sum(user_totals) == 30
+        assert max(user_totals) <= 10
+
+
+def test_release_sms(Session):
+    with Session() as db:
+        total_sms = asyncio.run(reserve_sms(1, db))
+        db.commit()
+        assert total_sms.total_send_sms == 1
+        asyncio.run(release_sms(1, total_sms.id, db))
+        assert db.query(TotalSMS.total_send_sms).scalar() == 0
+        assert db.query(UserTotalSMS.total_send_sms).scalar() == 0
+
+
+def test_reserve_sms_user_limit(Session):
+    with Session() as db, patch.object(settings, "sms_user_limit", 1):
+        assert not isinstance(asyncio.run(reserve_sms(1, db)), str)
+        db.commit()
+        assert asyncio.run(reserve_sms(1, db)) == (
+            "Your limit for sending messages has been reached!"
+        )
+        assert db.query(TotalSMS.total_send_sms).scalar() == 1
+
+
+def test_reserve_sms_user_limit_resets_daily(Session):
+    with Session() as db, patch.object(settings, "sms_user_limit", 1):
+        db.add(
+            UserTotalSMS(
+                user_id=1,
+                day=datetime.date.today() - datetime.timedelta(days=1),
+                total_send_sms=1,
+            )
+        )
+        db.commit()
+        assert not isinstance(asyncio.run(reserve_sms(1, db)), str)
+        db.commit()
+        user_total = db.query(UserTotalSMS).one()
+        assert (user_total.day, user_total.total_send_sms) == (
+            datetime.date.today(),
+            1,
+        )
+
+
+def test_create_sms_failure_releases_reservation(Session):
+    body = SendSMSModel()
+    with Session() as db:
+        total_sms = asyncio.run(reserve_sms(1, db))
+        with patch.object(
+            MessageSMS.__table__, "insert", side_effect=RuntimeError("insert failed")
+        ), pytest.raises(RuntimeError):
+            asyncio.run(create_sms(body, "user1@example.com", total_sms, db))
+        db.rollback()
+        assert not db.query(TotalSMS.total_send_sms).scalar()
+        assert db.query(UserTotalSMS).count() == 0
+
+
+@pytest.fixture
+def contacts(Session):
+    today = datetime.date.today()
+    with Session() as db:
+        for contact_id, days in enumerate([3, 5, 30], start=1):
+            db.add(
+                Contact(
+                    id=contact_id,
+                    first_name="first",
+                    last_name="last",
+                    email=f"contact{contact_id}@example.com",
+                    phone_number=f"+38063000000{contact_id}",
+                    birthday=today + datetime.timedelta(days=days),
+                )
+            )
+        db.commit()
+
+
+def test_create_broadcast_segment(Session, contacts):
+    body = SMSBroadcastModel(segment="birthdays")
+    with Session() as db:
+        broadcast = asyncio.run(create_broadcast(body, 1, db))
+        assert broadcast.total == 2
+        phones = db.query(MessageSMS.to_phone).order_by(MessageSMS.id).all()
+        assert [phone for phone, in phones] == ["+380630000001", "+380630000002"]
+        assert db.query(TotalSMS.total_send_sms).scalar() == 2
+        _, progress = asyncio.run(get_broadcast_progress(broadcast.id, 1, db))
+        assert progress == {"queued": 2}
+        assert asyncio.run(get_broadcast_progress(broadcast.id, 2, db)) is None
+
+
+def test_create_broadcast_user_limit(Session, contacts):
+    body = SMSBroadcastModel(contact_ids=[1, 2, 3])
+    with Session() as db, patch.object(settings, "sms_user_limit", 2):
+        assert asyncio.run(create_broadcast(body, 1, db)) == (
+            "Your limit for sending messages has been reached!"
+        )
+        assert db.query(MessageSMS).count() == 0
+        assert not db.query(TotalSMS.total_send_sms).scalar()
+
+
+def test_get_sms_history_keyset(Session):
+    created_at = datetime.datetime(2023, 5, 1, 12)
+    with Session() as db:
+        for number in range(10):
+            db.add(
+                MessageSMS(
+                    message=f"message {number}",
+                    from_phone="+14302335529",
+                    to_phone="+380639249861",
+                    user_id=1 if number != 5 else 2,
+                    created_at=created_at + datetime.timedelta(days=number // 2),
+                )
+            )
+        db.commit()
+
+        pages, before = [], None
+        while True:
+            page = asyncio.run(get_sms_history(1, 4, None, None, before, db))
+            if not page:
+                break
+            pages.append([message.id for message in page])
+            before = (page[-1].created_at, page[-1].id)
+        assert pages == [[10, 9, 8, 7], [5, 4, 3, 2], [1]]
+
+        page = asyncio.run(
+            get_sms_history(
+                1,
+                10,
+                created_at + datetime.timedelta(days=1),
+                created_at + datetime.timedelta(days=3),
+                None,
+                db,
+            )
+        )
+        assert [message.id for message in page] == [5, 4, 3]
+
+
+def test_create_sms_query_count(Session):
+    body = SendSMSModel()
+    statements = []
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with Session() as db:
+        total_sms = asyncio.run(reserve_sms(1, db))
+        db.add_all(
+            MessageSMS(
+                message="history",
+                from_phone=body.from_phone,
+                to_phone=body.to_phone,
+                user_id=1,
+            )
+            for _ in range(200)
+        )
+        db.commit()
+
+        engine = db.get_bind()
+        event.listen(engine, "before_cursor_execute", count_statement)
+        try:
+            sms = asyncio.run(create_sms(body, "user1@example.com", total_sms, db))
+        finally:
+            event.remove(engine, "before_cursor_execute", count_statement)
+
+        assert sms.status == "queued"
+        assert len(statements) <= 2
+        assert not any("FROM messages_sms" in statement for statement in statements)
+        assert db.get(User, 1).messagesms.count() == 201
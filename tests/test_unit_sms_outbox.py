@@ -0,0 +1,214 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# This adds the parent directory of the current file to the Python path
+
+import asyncio
+import unittest
+from unittest.mock import patch
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.conf.config import settings
+from src.database.models import Base, MessageSMS, TotalSMS, User, UserTotalSMS
+from src.repository.sms import create_sms, reserve_sms
+from src.schemas import SendSMSModel
+from src.services import send_sms, sms_outbox
+
+
+class RateLimited(Exception):
+    status = 429
+
+
+class FakeProvider:
+    def __init__(self, failures: int, error=ConnectionError("provider unavailable")):
+        self.failures = failures
+        self.error = error
+        self.sent = []
+
+    async def __call__(self, messages, from_number, to_number):
+        await asyncio.sleep(0)
+        if self.failures:
+            self.failures -= 1
+            raise self.error
+        self.sent.append(to_number)
+        return f"SM{len(self.sent)}"
+
+
+class FakeTwilio:
+    """
+    A local server that answers the Messages endpoint of Twilio with the given statuses
+    and records the client port of every request.
+    """
+
+    def __init__(self, statuses: list):
+        self.statuses = statuses
+        self.requests = []
+        self.app = web.Application()
+        self.app.router.add_post(
+            "/2010-04-01/Accounts/{account_sid}/Messages.json", self.create_message
+        )
+
+    async def create_message(self, request):
+        form = await request.post()
+        self.requests.append(request.transport.get_extra_info("peername")[1])
+        status = self.statuses.pop(0) if self.statuses else 201
+        if status == 429:
+            return web.json_response(
+                {"code": 20429, "message": "Too Many Requests", "status": 429},
+                status=429,
+            )
+        return web.json_response(
+            {"sid": f"SM{len(self.requests)}", "to": form["To"], "status": "queued"},
+            status=status,
+        )
+
+
+class TestSMSOutbox(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        engine = create_engine(
+            "sqlite://",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+        )
+        Base.metadata.create_all(bind=engine)
+        self.Session = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+        with self.Session() as db:
+            db.add(User(id=1, email="test@example.com", password="x", avatar="x"))
+            db.commit()
+        for patcher in (
+            patch.object(sms_outbox, "DBSession", self.Session),
+            patch.object(settings, "sms_retry_backoff", 0),
+            patch.object(settings, "sms_max_attempts", 3),
+            patch.object(settings, "sms_rate_limit", 1000),
+            patch.object(sms_outbox, "next_send_at", 0.0),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def queue_sms(self, count: int = 1):
+        body = SendSMSModel(
+            message="Hello", from_phone="+10000000000", to_phone="+380000000001"
+        )
+        with self.Session() as db:
+            for _ in range(count):
+                total_sms = await reserve_sms(1, db)
+                sms = await create_sms(body, "test@example.com", total_sms, db)
+                self.assertEqual(sms.status, "queued")
+
+    async def test_dispatch_sends_queued_sms(self):
+        await self.queue_sms(3)
+        provider = FakeProvider(failures=0)
+        with patch.object(sms_outbox.send_sms, "send_sms", provider):
+            self.assertEqual(await sms_outbox.dispatch(), 3)
+            self.assertEqual(await sms_outbox.dispatch(), 0)
+
+        self.assertEqual(len(provider.sent), 3)
+        with self.Session() as db:
+            statuses = [(row.status, row.attempts) for row in db.query(MessageSMS)]
+            self.assertEqual(statuses, [("sent", 1)] * 3)
+            self.assertEqual(db.query(MessageSMS.provider_sid).count(), 3)
+
+    async def test_dispatch_retries_failed_sms(self):
+        await self.queue_sms()
+        provider = FakeProvider(failures=1)
+        with patch.object(sms_outbox.send_sms, "send_sms", provider):
+            await sms_outbox.dispatch()
+            with self.Session() as db:
+                message = db.query(MessageSMS).one()
+                self.assertEqual(message.status, "queued")
+                self.assertEqual(message.error, "provider unavailable")
+            await sms_outbox.dispatch()
+
+        with self.Session() as db:
+            message = db.query(MessageSMS).one()
+            self.assertEqual((message.status, message.attempts), ("sent", 2))
+
+    async def test_dispatch_fails_sms_and_releases_quota(self):
+        await self.queue_sms()
+        provider = FakeProvider(failures=settings.sms_max_attempts)
+        with patch.object(sms_outbox.send_sms, "send_sms", provider):
+            for _ in range(settings.sms_max_attempts + 1):
+                await sms_outbox.dispatch()
+
+        self.assertFalse(provider.sent)
+        with self.Session() as db:
+            message = db.query(MessageSMS).one()
+            self.assertEqual(message.status, "failed")
+            self.assertEqual(message.attempts, settings.sms_max_attempts)
+            self.assertEqual(db.query(TotalSMS.total_send_sms).scalar(), 0)
+            self.assertEqual(db.query(UserTotalSMS.total_send_sms).scalar(), 0)
+
+    async def test_dispatch_defers_rate_limited_sms(self):
+        await self.queue_sms()
+        provider = FakeProvider(failures=1, error=RateLimited("Too Many Requests"))
+        with patch.object(sms_outbox.send_sms, "send_sms", provider):
+            await sms_outbox.dispatch()
+            with self.Session() as db:
+                message = db.query(MessageSMS).one()
+                self.assertEqual((message.status, message.attempts), ("queued", 0))
+            await sms_outbox.dispatch()
+
+        with self.Session() as db:
+            message = db.query(MessageSMS).one()
+            self.assertEqual((message.status, message.attempts), ("sent", 1))
+
+    async def start_twilio(self, statuses: list) -> FakeTwilio:
+        twilio = FakeTwilio(statuses)
+        server = TestServer(twilio.app)
+        await server.start_server()
+        self.addAsyncCleanup(server.close)
+        self.addAsyncCleanup(send_sms.close)
+        send_sms.get_client().api.base_url = str(server.make_url("/"))
+        return twilio
+
+    async def test_dispatch_with_twilio_client(self):
+        await self.queue_sms(3)
+        twilio = await self.start_twilio([201, 201, 201])
+        with patch.object(settings, "sms_dispatch_concurrency", 1):
+            self.assertEqual(await sms_outbox.dispatch(), 3)
+
+        with self.Session() as db:
+            sids = sorted(row.provider_sid for row in db.query(MessageSMS))
+            self.assertEqual(sids, ["SM1", "SM2", "SM3"])
+        # The pooled session sends every request over the same connection
+        self.assertEqual(len(twilio.requests), 3)
+        self.assertEqual(len(set(twilio.requests)), 1)
+
+    async def test_twilio_rate_limit_pauses_sending(self):
+        await self.queue_sms()
+        twilio = await self.start_twilio([429, 201])
+        loop = asyncio.get_event_loop()
+        with patch.object(settings, "sms_retry_backoff", 10):
+            await sms_outbox.dispatch()
+        self.assertGreater(sms_outbox.next_send_at - loop.time(), 5)
+        with self.Session() as db:
+            message = db.query(MessageSMS).one()
+            self.assertEqual((message.status, message.attempts), ("queued", 0))
+            self.assertEqual(db.query(TotalSMS.total_send_sms).scalar(), 1)
+            message.next_attempt_at = None
+            db.commit()
+
+        sms_outbox.next_send_at = 0.0
+        await sms_outbox.dispatch()
+        with self.Session() as db:
+            message = db.query(MessageSMS).one()
+            self.assertEqual((message.status, message.attempts), ("sent", 1))
+        self.assertEqual(len(twilio.requests), 2)
+
+    async def test_throttle_spaces_requests(self):
+        loop = asyncio.get_event_loop()
+        with patch.object(settings, "sms_rate_limit", 20):
+            started = loop.time()
+            await asyncio.gather(*(sms_outbox.throttle() for _ in range(5)))
+        self.assertGreaterEqual(loop.time() - started, 0.19)
+
+
+if __name__ == "__main__":
+    unittest.main()
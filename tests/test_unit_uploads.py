@@ -0,0 +1,69 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# This adds the parent directory of the current file to the Python path
+
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from fastapi import HTTPException
+
+from src.routes.documents import check_images_count
+from src.services.documents.uploads import UploadLimitMiddleware
+
+
+async def call(middleware, content_length: bytes) -> list:
+    scope = {
+        "type": "http",
+        "path": "/upload",
+        "headers": [(b"content-length", content_length)],
+    }
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await middleware(scope, receive, send)
+    return messages
+
+
+class TestUploadLimitMiddleware(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.app = AsyncMock()
+        self.middleware = UploadLimitMiddleware(self.app, {"/upload": 100})
+
+    async def test_malformed_content_length(self):
+        messages = await call(self.middleware, b"abc")
+        self.assertEqual(messages[0]["status"], 400)
+        self.app.assert_not_awaited()
+
+    async def test_negative_content_length(self):
+        messages = await call(self.middleware, b"-1")
+        self.assertEqual(messages[0]["status"], 400)
+
+    async def test_content_length_over_limit(self):
+        messages = await call(self.middleware, b"101")
+        self.assertEqual(messages[0]["status"], 413)
+        self.app.assert_not_awaited()
+
+    async def test_content_length_within_limit(self):
+        await call(self.middleware, b"100")
+        self.app.assert_awaited_once()
+
+
+class TestImagesCount(unittest.TestCase):
+    def test_too_many_images(self):
+        with patch("src.routes.documents.settings.document_max_images", 2):
+            check_images_count([object(), object()])
+            with self.assertRaises(HTTPException) as context:
+                check_images_count([object(), object(), object()])
+        self.assertEqual(context.exception.status_code, 413)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# This adds the parent directory of the current file to the Python path
+
+import asyncio
+import time
+import unittest
+from unittest.mock import patch
+
+from src.conf.config import settings
+from src.services import metrics, watchdog
+
+
+def blocking_call(seconds: float):
+    time.sleep(seconds)
+
+
+class TestWatchdog(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        for patcher in (
+            patch.object(settings, "loop_lag_interval", 0.01),
+            patch.object(settings, "loop_block_threshold_ms", 50),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def test_monitor_measures_lag(self):
+        _, lag = metrics.event_loop_lag.values.get((), ([], 0))
+        await watchdog.start()
+        try:
+            await asyncio.sleep(0.05)
+            blocking_call(0.1)
+            await asyncio.sleep(0.05)
+        finally:
+            await watchdog.stop()
+        _, total = metrics.event_loop_lag.values[()]
+        self.assertGreaterEqual(total - lag, 0.09)
+        self.assertIsNone(watchdog.watcher)
+
+    async def test_watcher_logs_blocking_stack(self):
+        blocked = metrics.event_loop_blocked.values.get((), 0)
+        with patch.object(settings, "debug", True), self.assertLogs(
+            "src.services.watchdog", "WARNING"
+        ) as logs:
+            await watchdog.start()
+            try:
+                await asyncio.sleep(0.05)
+                blocking_call(0.3)
+                await asyncio.sleep(0.05)
+            finally:
+                await watchdog.stop()
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn("in blocking_call", logs.output[0])
+        self.assertEqual(metrics.event_loop_blocked.values[()], blocked + 1)
+
+    async def test_watcher_ignores_short_steps(self):
+        with patch.object(settings, "debug", True), patch.object(
+            watchdog.logger, "warning"
+        ) as warning:
+            await watchdog.start()
+            try:
+                for _ in range(5):
+                    blocking_call(0.005)
+                    await asyncio.sleep(0.01)
+            finally:
+                await watchdog.stop()
+        warning.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()